@@ -2,13 +2,29 @@ from telegram import Update
 from telegram.ext import ContextTypes, MessageHandler, filters
 from app.services.prediction_service import PredictionService
 from app.database.crud import get_or_create_user
+from app.bot.keyboards import get_main_menu_keyboard, get_feedback_keyboard
 from app.utils.logger import logger
+from collections import OrderedDict
 import asyncio
+import time
 
 prediction_service = PredictionService()
 
+# Фото из одного альбома приходят отдельными апдейтами; собираем их
+# по media_group_id и анализируем одним батчем
+MEDIA_GROUP_WAIT = 1.5
+# Ограничения буфера: альбом Telegram - до 10 фото; группы, чья задача
+# не забрала фото (например, упала), удаляются по истечении TTL
+MEDIA_GROUP_MAX_GROUPS = 256
+MEDIA_GROUP_MAX_PHOTOS = 10
+MEDIA_GROUP_TTL = 60
+_media_groups = OrderedDict()
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle photo messages"""
+    if update.message.media_group_id and collect_media_group(update, context):
+        return
+    
     user = update.effective_user
     db = context.bot_data['db']
     
@@ -27,28 +43,40 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     try:
-        # Get the photo file
-        photo_file = await update.message.photo[-1].get_file()
-        
-        # Download photo
-        photo_bytes = await photo_file.download_as_bytearray()
-        
-        # Update status
-        await processing_msg.edit_text("🔍 Анализирую свечные паттерны...")
+        photo = update.message.photo[-1]
         
         # Get user settings
         settings = db_user.settings if db_user.settings else {}
         
-        # Analyze image
-        await processing_msg.edit_text("🤖 Запускаю ML модели...")
-        
-        result = await prediction_service.analyze_image(
-            image_bytes=bytes(photo_bytes),
+        # The same Telegram file was already analyzed: skip the download
+        result = await prediction_service.analyze_cached(
+            file_unique_id=photo.file_unique_id,
             user_id=db_user.id,
             db=db,
             user_settings=settings
         )
         
+        if result is None:
+            # Get the photo file
+            photo_file = await photo.get_file()
+            
+            # Download photo
+            photo_bytes = await photo_file.download_as_bytearray()
+            
+            # Update status
+            await processing_msg.edit_text("🔍 Анализирую свечные паттерны...")
+            
+            # Analyze image
+            await processing_msg.edit_text("🤖 Запускаю ML модели...")
+            
+            result = await prediction_service.analyze_image(
+                image_bytes=bytes(photo_bytes),
+                user_id=db_user.id,
+                db=db,
+                user_settings=settings,
+                file_unique_id=photo.file_unique_id
+            )
+        
         # Format response
         if 'error' in result:
             await processing_msg.edit_text(result['error'])
@@ -77,4 +105,105 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await processing_msg.edit_text(
             f"❌ Ошибка при обработке изображения: {str(e)}\n"
             "Попробуйте другое изображение или обратитесь в поддержку."
-        )
\ No newline at end of file
+        )
+
+def collect_media_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Buffer an album photo; the first photo of a group schedules the batch
+    
+    Returns False when the buffer is full: the photo is then handled alone.
+    """
+    group_id = update.message.media_group_id
+    now = time.monotonic()
+    
+    # Drop groups whose batch task never collected them
+    while _media_groups and next(iter(_media_groups.values()))[0] < now - MEDIA_GROUP_TTL:
+        _media_groups.popitem(last=False)
+    
+    if group_id not in _media_groups:
+        if len(_media_groups) >= MEDIA_GROUP_MAX_GROUPS:
+            return False
+        _media_groups[group_id] = (now, [update])
+        context.application.create_task(handle_media_group(group_id, context))
+        return True
+    
+    updates = _media_groups[group_id][1]
+    if len(updates) >= MEDIA_GROUP_MAX_PHOTOS:
+        return False
+    updates.append(update)
+    return True
+
+async def handle_media_group(group_id, context: ContextTypes.DEFAULT_TYPE):
+    """Analyze all photos of a media group with a single combined report"""
+    # Wait for the remaining photos of the album to arrive
+    await asyncio.sleep(MEDIA_GROUP_WAIT)
+    _, updates = _media_groups.pop(group_id, (None, []))
+    updates = sorted(updates, key=lambda u: u.message.message_id)
+    if not updates:
+        return
+    
+    first = updates[0]
+    user = first.effective_user
+    db = context.bot_data['db']
+    
+    # Get or create user
+    db_user = get_or_create_user(
+        db, 
+        telegram_id=user.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name
+    )
+    
+    # Send processing message
+    processing_msg = await first.message.reply_text(
+        f"⏳ Загружаю и обрабатываю {len(updates)} изображений..."
+    )
+    
+    try:
+        photos = [u.message.photo[-1] for u in updates]
+        
+        # Get user settings
+        settings = db_user.settings if db_user.settings else {}
+        
+        # Telegram files that were already analyzed skip the download
+        file_unique_ids = [photo.file_unique_id for photo in photos]
+        cached = prediction_service.lookup_cached(file_unique_ids, settings)
+        pending = [i for i, result in enumerate(cached) if result is None]
+        images = [None] * len(photos)
+        
+        if pending:
+            # Download photos in parallel
+            photo_files = await asyncio.gather(*(photos[i].get_file() for i in pending))
+            photo_bytes = await asyncio.gather(*(f.download_as_bytearray() for f in photo_files))
+            for i, data in zip(pending, photo_bytes):
+                images[i] = bytes(data)
+            
+            # Analyze images
+            await processing_msg.edit_text("🤖 Запускаю ML модели...")
+        
+        # Cached and analyzed photos are saved in one transaction
+        results = await prediction_service.analyze_batch(
+            images=images,
+            user_id=db_user.id,
+            db=db,
+            user_settings=settings,
+            file_unique_ids=file_unique_ids,
+            cached=cached
+        )
+        
+        # Send combined report
+        await first.message.reply_text(
+            prediction_service.format_batch_response(results),
+            parse_mode='Markdown',
+            reply_markup=get_main_menu_keyboard()
+        )
+        
+        # Delete processing message
+        await processing_msg.delete()
+        
+    except Exception as e:
+        logger.error(f"Media group handling error: {e}")
+        await processing_msg.edit_text(
+            f"❌ Ошибка при обработке изображений: {str(e)}\n"
+            "Попробуйте другие изображения или обратитесь в поддержку."
+        )
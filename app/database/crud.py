@@ -26,6 +26,9 @@ def get_or_create_user(db: Session, telegram_id: int, username: str = None,
         db.commit()
     return user
 
+def get_user_by_telegram_id(db: Session, telegram_id: int):
+    return db.query(User).filter(User.telegram_id == telegram_id).first()
+
 def create_prediction(db: Session, user_id: int, image_path: str, timeframe: str, 
                      indicators: list, prediction: str, confidence: float,
                      take_profit: float, stop_loss: float, support: float,
@@ -58,6 +61,39 @@ def create_prediction(db: Session, user_id: int, image_path: str, timeframe: str
     db.refresh(prediction_record)
     return prediction_record
 
+def create_predictions(db: Session, user_id: int, predictions: list):
+    """Insert several predictions (dicts with create_prediction fields) in one transaction"""
+    records = [
+        Prediction(
+            user_id=user_id,
+            image_path=p['image_path'],
+            timeframe=p['timeframe'],
+            indicators=p['indicators'],
+            prediction=p['prediction'],
+            confidence=p['confidence'],
+            take_profit=p['take_profit'],
+            stop_loss=p['stop_loss'],
+            support_level=p['support'],
+            resistance_level=p['resistance'],
+            pivot_point=p['pivot']
+        )
+        for p in predictions
+    ]
+    db.add_all(records)
+    
+    # Update statistics
+    stats = db.query(BotStatistics).first()
+    if not stats:
+        stats = BotStatistics()
+        db.add(stats)
+    stats.total_predictions = (stats.total_predictions or 0) + len(records)
+    stats.daily_requests = (stats.daily_requests or 0) + len(records)
+    
+    db.commit()
+    for record in records:
+        db.refresh(record)
+    return records
+
 def update_prediction_feedback(db: Session, prediction_id: int, 
                              actual_result: str, feedback: str = None):
     prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
@@ -1,16 +1,22 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, File, Form, Header, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.database.session import get_db
-from app.database.crud import get_bot_statistics
+from app.database.crud import get_bot_statistics, get_user_by_telegram_id
+from app.utils.config import config
 from app.utils.logger import logger
+import secrets
 import threading
 from app.bot.telegram_bot import TradingBot
+from app.bot.handlers.photo_handler import prediction_service
 
 bot = None
 bot_thread = None
 
+MAX_BATCH_SIZE = 10
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -32,6 +38,7 @@ async def lifespan(app: FastAPI):
     if bot and bot.application:
         await bot.application.shutdown()
         await bot.application.stop()
+    prediction_service.executor.shutdown(wait=False)
     logger.info("Application shutdown complete")
 
 app = FastAPI(
@@ -58,6 +65,7 @@ async def root():
         "endpoints": {
             "health": "/health",
             "stats": "/stats",
+            "analyze_batch": "/analyze/batch",
             "docs": "/docs"
         }
     }
@@ -75,12 +83,64 @@ async def get_stats(db: Session = Depends(get_db)):
         stats = get_bot_statistics(db)
         return {
             "status": "success",
-            "data": stats
+            "data": stats,
+            "cache": prediction_service.cache.stats(),
+            "prefilter": prediction_service.get_prefilter_stats()
         }
     except Exception as e:
         logger.error(f"Stats error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def require_api_key(x_api_key: Optional[str] = Header(None)):
+    """Only clients with the configured API key may run analyses"""
+    if not config.API_KEY or not x_api_key or not secrets.compare_digest(x_api_key, config.API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+@app.post("/analyze/batch", dependencies=[Depends(require_api_key)])
+async def analyze_batch(
+    telegram_id: int = Form(...),
+    files: List[UploadFile] = File(...),
+    timeframe: Optional[str] = Form(None),
+    sensitivity: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    if len(files) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Too many images, max {MAX_BATCH_SIZE}")
+    
+    # Reject oversized uploads before reading them into memory
+    max_bytes = config.API_MAX_UPLOAD_BYTES
+    if any(f.size is not None and f.size > max_bytes for f in files):
+        raise HTTPException(status_code=413, detail=f"Image too large, max {max_bytes} bytes")
+    
+    # Analyses are recorded only for existing bot users
+    user = get_user_by_telegram_id(db, telegram_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="Unknown user")
+    
+    images = []
+    for f in files:
+        # Bounded read: the declared size may be missing
+        data = await f.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image too large, max {max_bytes} bytes")
+        images.append(data)
+    
+    try:
+        settings = dict(user.settings or {})
+        if timeframe:
+            settings['timeframe'] = timeframe
+        if sensitivity:
+            settings['sensitivity'] = sensitivity
+        
+        results = await prediction_service.analyze_batch(images, user.id, db, settings)
+        return {
+            "status": "success",
+            "data": results
+        }
+    except Exception as e:
+        logger.error(f"Batch analysis error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/version")
 async def get_version():
     return {
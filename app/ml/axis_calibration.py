@@ -0,0 +1,201 @@
+"""
+Калибровка ценовой оси: отображение строк пикселей в цены
+
+Метки делений ценовой оси находятся проекцией полосы оси, привязываются к
+горизонтальным линиям сетки и распознаются OCR (pytesseract, если
+установлен). По ним подбирается линейная или логарифмическая шкала.
+"""
+import hashlib
+import re
+from collections import OrderedDict
+import cv2
+import numpy as np
+from app.utils.logger import logger
+
+try:
+    import pytesseract
+except ImportError:  # OCR необязателен: без него цены остаются в единицах графика
+    pytesseract = None
+
+_NUMBER_RE = re.compile(r'-?\d[\d\s,]*(?:\.\d+)?')
+
+
+def price_digits(price):
+    """Decimal places for a price level: 2 from 100 up, more for smaller (forex-like) prices"""
+    if not price:
+        return 2
+    return max(2, 4 - int(np.floor(np.log10(abs(price)))))
+
+
+class AxisCalibration:
+    """Fitted pixel row -> price transform"""
+
+    def __init__(self, slope, intercept, log_scale=False):
+        self.slope = slope
+        self.intercept = intercept
+        self.log_scale = log_scale
+
+    def to_price(self, rows):
+        """Vectorized transform of frame rows (any array shape) to prices"""
+        values = self.slope * np.asarray(rows, dtype=np.float64) + self.intercept
+        return np.exp(values) if self.log_scale else values
+
+    def apply(self, candles, plot_top, plot_height):
+        """Convert OHLC fields of a candle array from plot units to prices in place
+
+        Plot units are 0 at the bottom and 1 at the top of the plot area whose
+        first frame row is plot_top.
+        """
+        fields = ['open', 'high', 'low', 'close']
+        units = np.stack([candles[field] for field in fields])
+        prices = self.to_price(plot_top + (1.0 - units) * plot_height)
+        for field, values in zip(fields, prices):
+            candles[field] = values
+        return candles
+
+
+class PriceAxisCalibrator:
+    """Finds tick labels on the price axis and fits a pixel -> price mapping"""
+
+    def __init__(self, cache_size=64, min_axis_width=20, min_ticks=3):
+        self.cache_size = cache_size
+        self.min_axis_width = min_axis_width
+        self.min_ticks = min_ticks
+        self._cache = OrderedDict()
+
+    @property
+    def available(self):
+        return pytesseract is not None
+
+    def _axis_strip(self, frame, roi):
+        """Price axis strip next to the plot: right side first, then left"""
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi or (0, 0, int(width * 0.88), height)
+        if width - x1 >= self.min_axis_width:
+            return frame[y0:y1, x1:], y0
+        if x0 >= self.min_axis_width:
+            return frame[y0:y1, :x0], y0
+        return None, y0
+
+    def _tick_bands(self, gray):
+        """Row bands (top, bottom) that contain axis label text"""
+        background = int(np.median(gray))
+        text = np.abs(gray.astype(np.int16) - background) > 60
+        rows = text.any(axis=1).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], rows, [0])))
+        tops = np.flatnonzero(edges == 1)
+        bottoms = np.flatnonzero(edges == -1)
+        band_height = bottoms - tops
+        keep = (band_height >= 5) & (band_height <= max(6, gray.shape[0] // 10))
+        return tops[keep], bottoms[keep], text
+
+    @staticmethod
+    def _grid_rows(plot_gray):
+        """Rows of horizontal grid lines inside the plot"""
+        edges = np.abs(np.diff(plot_gray.astype(np.int16), axis=0)) > 10
+        rows = np.flatnonzero(edges.mean(axis=1) > 0.3) + 1
+        if len(rows) == 0:
+            return rows
+        # A line of thickness t gives edge rows [top, top + t]: keep its center
+        groups = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1)
+        return np.array([(group[0] + max(group[0], group[-1] - 1)) / 2.0 for group in groups])
+
+    @staticmethod
+    def _snap(centers, grid_rows, tolerance):
+        """Move label centers to the nearest grid line when it is close enough"""
+        if len(grid_rows) == 0:
+            return centers
+        pos = np.clip(np.searchsorted(grid_rows, centers), 1, len(grid_rows) - 1)
+        left, right = grid_rows[pos - 1], grid_rows[pos]
+        nearest = np.where(centers - left <= right - centers, left, right)
+        if len(grid_rows) == 1:
+            nearest = np.full_like(centers, grid_rows[0])
+        return np.where(np.abs(nearest - centers) <= tolerance, nearest, centers)
+
+    @staticmethod
+    def _read_number(image):
+        text = pytesseract.image_to_string(
+            image, config='--psm 7 -c tessedit_char_whitelist=0123456789.,-'
+        )
+        match = _NUMBER_RE.search(text)
+        if not match:
+            return None
+        try:
+            return float(re.sub(r'[\s,]', '', match.group()))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _fit(rows, values):
+        """Linear or log-linear least squares fit; None if the axis is not monotonic"""
+        linear = np.polyfit(rows, values, 1)
+        linear_error = np.abs(np.polyval(linear, rows) - values).mean() / np.abs(values).mean()
+        best = AxisCalibration(linear[0], linear[1]), linear_error
+
+        if (values > 0).all():
+            log_values = np.log(values)
+            log = np.polyfit(rows, log_values, 1)
+            log_error = np.abs(np.exp(np.polyval(log, rows)) - values).mean() / values.mean()
+            if log_error < 0.5 * linear_error:
+                best = AxisCalibration(log[0], log[1], log_scale=True), log_error
+
+        calibration, error = best
+        # Price must grow upwards (smaller row) and labels must fit the scale
+        if calibration.slope >= 0 or error > 0.01:
+            return None
+        return calibration
+
+    def calibrate(self, frame, roi=None, layout_signature=None):
+        """Fit the price axis of an RGB frame; returns AxisCalibration or None"""
+        strip, strip_top = self._axis_strip(frame, roi)
+        if strip is None:
+            return None
+
+        strip_gray = cv2.cvtColor(np.ascontiguousarray(strip), cv2.COLOR_RGB2GRAY)
+        key = None
+        if layout_signature is not None:
+            # Same platform, same zoom and same labels -> same calibration
+            digest = hashlib.md5(strip_gray[::2, ::2].tobytes()).hexdigest()
+            key = (frame.shape[:2], layout_signature, digest)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        calibration = self._detect(frame, roi, strip_gray, strip_top)
+        if key is not None and calibration is not None:
+            self._cache[key] = calibration
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return calibration
+
+    def _detect(self, frame, roi, strip_gray, strip_top):
+        if not self.available:
+            return None
+
+        tops, bottoms, text = self._tick_bands(strip_gray)
+        if len(tops) < self.min_ticks:
+            return None
+
+        # Tick rows: label centers snapped to the plot grid lines
+        centers = (tops + bottoms) / 2.0
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            plot_gray = cv2.cvtColor(np.ascontiguousarray(frame[y0:y1, x0:x1]), cv2.COLOR_RGB2GRAY)
+            centers = self._snap(centers, self._grid_rows(plot_gray), tolerance=(bottoms - tops).max())
+
+        rows, values = [], []
+        for top, bottom, center in zip(tops, bottoms, centers):
+            cols = np.flatnonzero(text[top:bottom].any(axis=0))
+            label = strip_gray[max(0, top - 2):bottom + 2, max(0, cols[0] - 2):cols[-1] + 3]
+            try:
+                value = self._read_number(label)
+            except Exception as e:
+                logger.warning(f"Axis OCR error: {e}")
+                return None
+            if value is not None:
+                rows.append(strip_top + center)
+                values.append(value)
+
+        if len(values) < self.min_ticks:
+            return None
+        return self._fit(np.array(rows), np.array(values))
@@ -0,0 +1,59 @@
+"""
+Компактное представление свечей: один структурированный NumPy массив
+вместо списка словарей на всем пути изображение -> фичи
+"""
+import numpy as np
+
+COLOR_UNKNOWN = 0
+COLOR_GREEN = 1
+COLOR_RED = 2
+
+COLOR_NAMES = np.array(['unknown', 'green', 'red'])
+
+CANDLE_DTYPE = np.dtype([
+    ('x', np.int32),
+    ('y', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+    ('area', np.float32),
+    ('color', np.int8),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+])
+
+
+def empty_candles(size=0):
+    """Allocate a candle array; OHLC fields stay NaN until extracted"""
+    candles = np.zeros(size, dtype=CANDLE_DTYPE)
+    for field in ('open', 'high', 'low', 'close'):
+        candles[field] = np.nan
+    return candles
+
+
+def color_names(candles):
+    """Human readable color names ('green', 'red', 'unknown') for each candle"""
+    return COLOR_NAMES[candles['color']]
+
+
+def to_dicts(candles):
+    """Convert to the legacy list-of-dicts form (debugging / JSON output only)"""
+    names = color_names(candles)
+    return [
+        {
+            'x': int(c['x']),
+            'y': int(c['y']),
+            'width': int(c['width']),
+            'height': int(c['height']),
+            'center_x': int(c['x'] + c['width'] // 2),
+            'center_y': int(c['y'] + c['height'] // 2),
+            'color': str(name),
+            'area': float(c['area']),
+            'open': float(c['open']),
+            'high': float(c['high']),
+            'low': float(c['low']),
+            'close': float(c['close'])
+        }
+        for c, name in zip(candles, names)
+    ]
@@ -1,33 +1,66 @@
-import pandas as pd
-import numpy as np
+from app.ml.feature_pipeline import feature_pipeline
+from app.ml.indicator_engine import indicator_engine
+from app.ml.levels import level_engine
 
 class FeatureExtractor:
     def __init__(self):
         pass
     
     def extract_features(self, ohlc_data, selected_indicators=None):
-        """Упрощенная версия для тестирования"""
-        if not ohlc_data:
+        """Упрощенная версия для тестирования
+        
+        ohlc_data - структурированный массив свечей (см. app.ml.candles),
+        колонки читаются как представления без копирования
+        """
+        if ohlc_data is None or len(ohlc_data) == 0:
             return self._get_default_features()
         
         features = {}
+        closes = ohlc_data['close']
         
         # Базовые фичи
-        if len(ohlc_data) >= 2:
-            features['price_change'] = ohlc_data[-1]['close'] - ohlc_data[-2]['close']
-            features['price_change_pct'] = features['price_change'] / ohlc_data[-2]['close'] * 100
+        if len(closes) >= 2:
+            features['price_change'] = closes[-1] - closes[-2]
+            features['price_change_pct'] = features['price_change'] / closes[-2] * 100
         
         # Простые индикаторы
-        closes = [c['close'] for c in ohlc_data[-20:]]
-        if len(closes) >= 10:
-            features['sma_10'] = np.mean(closes[-10:])
-            features['sma_20'] = np.mean(closes[-20:]) if len(closes) >= 20 else np.mean(closes)
+        window = closes[-20:]
+        if len(window) >= 10:
+            features['sma_10'] = window[-10:].mean()
+            features['sma_20'] = window.mean()
         
-        # Всегда добавляем значения по умолчанию
+        # Значения по умолчанию, затем выбранные пользователем индикаторы
+        # (пока не прогреты - остаются значения по умолчанию)
         features.update(self._get_default_features())
+        if selected_indicators is None:
+            selected_indicators = ['RSI', 'MACD']
+        features.update(indicator_engine.latest(ohlc_data, selected_indicators))
+        
+        # Колонки обучающей матрицы (тот же конвейер, что и при обучении),
+        # только для графиков не короче WARMUP_CANDLES свечей
+        row = feature_pipeline.latest(ohlc_data)
+        if row is not None:
+            features.update(zip(feature_pipeline.names, row.tolist()))
+        
+        # Расстояние до уровней поддержки/сопротивления
+        features.update(self._level_features(ohlc_data))
         
         return features
     
+    def _level_features(self, ohlc_data):
+        """Distance from the last close to chart levels, in percent of the close"""
+        levels = level_engine.analyze(ohlc_data)
+        close = ohlc_data['close'][-1]
+        if levels is None or close == 0:
+            return {}
+        
+        return {
+            'support_dist_pct': (close - levels['support']) / close * 100,
+            'resistance_dist_pct': (levels['resistance'] - close) / close * 100,
+            'pivot_dist_pct': (close - levels['pivot']) / close * 100,
+            'level_count': len(levels['levels'])
+        }
+    
     def _get_default_features(self):
         """Возвращает значения по умолчанию"""
         return {
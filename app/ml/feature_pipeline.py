@@ -0,0 +1,207 @@
+"""
+Единый конвейер фичей для обучения и сервиса
+
+Список FEATURES декларативно задает колонки матрицы, на которой обучаются
+модели (models/train_model.py): имя, функция и параметры. Все функции
+векторные и работают с колоночным OHLC (структурированный массив свечей,
+dict массивов или DataFrame) любой длины - от обучающей выборки в 10k строк
+до окна свечей с графика, - поэтому фичи в сервисе считаются тем же
+кодом, что и при обучении.
+
+Рекурсивные индикаторы (EMA в MACD, сглаживание Уайлдера в RSI и ATR)
+зависят от начала ряда, поэтому строка по короткому окну отличается от
+обучающей строки на той же свече. latest() отдает фичи только для окон не
+короче WARMUP_CANDLES.
+"""
+import functools
+import hashlib
+import inspect
+import math
+import numpy as np
+import pandas as pd
+from app.ml import indicator_engine, indicator_kernels
+from app.ml import talib_compat as ta
+from app.ml.indicator_engine import IndicatorSeries
+
+# Свечей истории, после которых фичи окна отличаются от обучающих строк на тех
+# же свечах меньше чем на 1% стандартного отклонения колонки
+# (tests/test_feature_parity.py); на 60 свечах расхождение MACD - до 14%
+WARMUP_CANDLES = 120
+
+
+# Feature functions: IndicatorSeries -> float64 array of len(close)
+
+def returns(series):
+    out = np.full(len(series.close), np.nan)
+    out[1:] = series.close[1:] / series.close[:-1] - 1
+    return out
+
+
+def volatility(series, period):
+    """Sample standard deviation of returns over the window (pandas rolling().std())"""
+    out = np.full(len(series.close), np.nan)
+    if period > 1:
+        out[1:] = ta.rolling_std(returns(series)[1:], period) * math.sqrt(period / (period - 1))
+    return out
+
+
+def rsi(series, period):
+    return series.rsi(period)
+
+
+def macd(series, fast, slow, signal):
+    return series.macd(fast, slow, signal)[0]
+
+
+def macd_hist(series, fast, slow, signal):
+    return series.macd(fast, slow, signal)[2]
+
+
+def _bollinger(series, period, nbdev):
+    middle = series.sma(period)
+    band = nbdev * series.std(period)
+    return middle, band
+
+
+def bb_position(series, period, nbdev):
+    """Position of the close inside the bands, 0.5 when the bands collapse"""
+    middle, band = _bollinger(series, period, nbdev)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position = np.where(band > 0, (series.close - middle + band) / (2 * band), 0.5)
+    position[np.isnan(band)] = np.nan
+    return position
+
+
+def bb_width(series, period, nbdev):
+    middle, band = _bollinger(series, period, nbdev)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 2 * band / middle
+
+
+def stoch_k(series, fastk_period, slowk_period, slowd_period):
+    return series.slow_stochastic(fastk_period, slowk_period, slowd_period)[0]
+
+
+def atr(series, period):
+    return series.atr(period)
+
+
+def volume_ratio(series, period):
+    """Volume over its SMA; 1.0 for chart candles and sources that carry no volume"""
+    if series.volume is None or np.isnan(series.volume).all():
+        return np.ones(len(series.close))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return series.volume / ta.sma(series.volume, period)
+
+
+def _candle_parts(series):
+    body = np.abs(series.close - series.open)
+    lower_shadow = np.minimum(series.open, series.close) - series.low
+    upper_shadow = series.high - np.maximum(series.open, series.close)
+    return body, lower_shadow, upper_shadow
+
+
+def is_hammer(series):
+    """Bullish hammer: long lower shadow, almost no upper shadow"""
+    body, lower_shadow, upper_shadow = _candle_parts(series)
+    hammer = (lower_shadow > 2 * body) & (upper_shadow < body * 0.3) & (series.close > series.open)
+    return hammer.astype(np.float64)
+
+
+def is_doji(series):
+    """Body under 10% of the candle range"""
+    body = np.abs(series.close - series.open)
+    total_range = series.high - series.low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        doji = (body / total_range < 0.1) & (total_range > 0)
+    return doji.astype(np.float64)
+
+
+# Колонки обучающей матрицы: (имя, функция, параметры), порядок важен
+FEATURES = (
+    ('returns', returns, {}),
+    ('volatility', volatility, {'period': 20}),
+    ('rsi', rsi, {'period': 14}),
+    ('macd', macd, {'fast': 12, 'slow': 26, 'signal': 9}),
+    ('macd_hist', macd_hist, {'fast': 12, 'slow': 26, 'signal': 9}),
+    ('bb_position', bb_position, {'period': 20, 'nbdev': 2}),
+    ('bb_width', bb_width, {'period': 20, 'nbdev': 2}),
+    ('stoch_k', stoch_k, {'fastk_period': 5, 'slowk_period': 3, 'slowd_period': 3}),
+    ('atr', atr, {'period': 14}),
+    ('volume_ratio', volume_ratio, {'period': 20}),
+    ('is_hammer', is_hammer, {}),
+    ('is_doji', is_doji, {}),
+)
+
+
+# Модули, через которые считаются фичи (индикаторы и их ядра); их исходники
+# входят в версию набора фичей вместе с модулями самих функций
+DEPENDENCIES = (ta, indicator_engine, indicator_kernels)
+
+
+class FeaturePipeline:
+    """Computes the declared feature columns from one columnar OHLC array"""
+
+    def __init__(self, features=FEATURES, dependencies=DEPENDENCIES):
+        self.features = features
+        self.names = [name for name, _, _ in features]
+        self.dependencies = dependencies
+
+    @staticmethod
+    def _source(obj):
+        """Source of a feature function or module, bytecode when the source is unavailable"""
+        try:
+            return inspect.getsource(obj)
+        except (OSError, TypeError):
+            return obj.__code__.co_code.hex() if hasattr(obj, '__code__') else obj.__name__
+    
+    def _modules(self):
+        """Modules of the feature functions and the declared dependencies, in a stable order"""
+        modules = [inspect.getmodule(func) for _, func, _ in self.features] + list(self.dependencies)
+        return list({module.__name__: module for module in modules if module is not None}.values())
+    
+    @functools.cached_property
+    def version(self):
+        """Short hash of the feature set: names, function sources, params and module sources
+        
+        A changed feature body, or a changed helper it calls (private helpers
+        of its module, talib_compat, the indicator engine and kernels), gives
+        a new version, so stores keyed by it (models/feature_store.py)
+        recompute instead of serving stale rows. Computed once, from the
+        sources as they were when first asked.
+        """
+        spec = repr((
+            [(name, self._source(func), sorted(params.items())) for name, func, params in self.features],
+            [(module.__name__, self._source(module)) for module in self._modules()]
+        ))
+        return hashlib.sha1(spec.encode()).hexdigest()[:12]
+
+    def transform(self, ohlc):
+        """(len(ohlc), n_features) float64 matrix, NaN rows during indicator warm-up"""
+        series = IndicatorSeries(ohlc)
+        matrix = np.empty((len(series.close), len(self.features)))
+        for column, (_, func, params) in enumerate(self.features):
+            matrix[:, column] = func(series, **params)
+        return matrix
+
+    def transform_frame(self, df):
+        """Feature columns as a DataFrame with the index of df"""
+        return pd.DataFrame(self.transform(df), index=df.index, columns=self.names)
+
+    def latest(self, ohlc, warmup=WARMUP_CANDLES):
+        """Feature row of the last candle
+        
+        None for windows shorter than warmup candles (their recursive
+        indicators still differ from the training rows) and while any
+        feature is NaN.
+        """
+        if len(ohlc) == 0 or len(ohlc) < warmup:
+            return None
+        row = self.transform(ohlc)[-1]
+        if np.isnan(row).any():
+            return None
+        return row
+
+
+# Создаем глобальный инстанс
+feature_pipeline = FeaturePipeline()
@@ -2,52 +2,374 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import math
+from collections import OrderedDict
+from app.ml.candles import empty_candles, COLOR_GREEN, COLOR_RED, COLOR_UNKNOWN
+from app.ml.ohlc_extractor import ProjectionOHLCExtractor
+from app.ml.axis_calibration import PriceAxisCalibrator
+from app.utils.config import config
 from app.utils.logger import logger
 
+# Профили предобработки: шумоподавление, параметры Canny/Hough и
+# разрешение детекции. target_pixels=None - бюджет из конфига.
+PREPROCESSING_PROFILES = {
+    'fast': {
+        'denoise': 'gaussian',
+        'target_pixels': 800_000,
+        'canny': (50, 150),
+        'hough_threshold': 40,
+        'min_line_length': 20,
+        'max_line_gap': 10
+    },
+    'balanced': {
+        'denoise': 'bilateral_downscaled',
+        'target_pixels': 1_500_000,
+        'canny': (50, 150),
+        'hough_threshold': 50,
+        'min_line_length': 30,
+        'max_line_gap': 10
+    },
+    'accurate': {
+        'denoise': 'bilateral',
+        'target_pixels': None,
+        'canny': (50, 150),
+        'hough_threshold': 50,
+        'min_line_length': 30,
+        'max_line_gap': 10
+    }
+}
+
+# Профиль по умолчанию для пользовательской настройки чувствительности
+SENSITIVITY_PROFILES = {
+    'low': 'fast',
+    'medium': 'balanced',
+    'high': 'accurate'
+}
+
+DEFAULT_PROFILE = 'accurate'
+
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, target_pixels=None, max_pixels=None):
         self.min_chart_area = 1000
         self.candle_min_area = 50
         self.candle_max_area = 500
+        self.target_pixels = target_pixels or config.IMAGE_TARGET_PIXELS
+        self.max_pixels = max_pixels or config.IMAGE_MAX_PIXELS
+        self.area_scale = 1.0
+        self.ohlc_extractor = ProjectionOHLCExtractor()
+        
+        # Pre-filter thresholds (see looks_like_chart)
+        self.thumbnail_size = 256
+        self.prefilter_min_colored = 0.002
+        self.prefilter_max_colored = 0.5
+        self.prefilter_min_column_runs = 5
+        self.prefilter_min_row_span = 0.1
+        self.prefilter_min_background = 0.2
+        
+        # Plot-area ROI detection, cached per (resolution, layout signature)
+        self.roi_enabled = config.ROI_ENABLED
+        self.roi_scan_width = 480
+        self.roi_line_fraction = 0.6
+        self.roi_margin = 0.02
+        self.roi_cache_size = 64
+        self._roi_cache = OrderedDict()
+        
+        # Price-axis calibration needs the uncropped frame and the plot ROI
+        # of the last preprocessed image
+        self.axis_calibrator = PriceAxisCalibrator()
+        self.last_frame = None
+        self.last_roi = None
+        self.last_layout = None
+        # Lower edge of the price plot inside the cropped image (volume panes start below)
+        self.last_plot_bottom = None
+        
+        # Scratch buffers reused across requests while the image shape matches.
+        # ImageProcessor lives one per worker, so buffers are never shared.
+        self._buffers = {}
+    
+    def _buffer(self, name, shape, dtype=np.uint8):
+        """Return a reusable scratch array of the given shape"""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
+    
+    def _open_image(self, image_bytes):
+        """Open image lazily and reject it before decoding if it is too large"""
+        # Image.open only parses the header, nothing is allocated yet
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+        
+        if width * height > self.max_pixels:
+            raise ValueError(
+                f"Изображение слишком большое ({width}x{height}). "
+                f"Максимум {self.max_pixels // 1_000_000} Мп."
+            )
+        return image
+    
+    def decode_image(self, image_bytes, target_pixels=None):
+        """Decode image bytes into an RGB PIL image within the pixel budget"""
+        target_pixels = min(target_pixels or self.target_pixels, self.target_pixels)
+        image = self._open_image(image_bytes)
+        width, height = image.size
+        self.area_scale = 1.0
+        
+        if width * height > target_pixels:
+            scale = math.sqrt(target_pixels / (width * height))
+            target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            
+            # For JPEG this selects DCT scaling (1/2, 1/4, 1/8) so the
+            # full-resolution bitmap is never decoded
+            image.draft('RGB', target_size)
+            image = image.convert('RGB')
+            
+            # Finish the remaining non power-of-two reduction
+            if image.width * image.height > target_pixels:
+                image = image.resize(target_size, Image.BILINEAR)
+            
+            # Candle area limits are given for source resolution
+            self.area_scale = image.width * image.height / (width * height)
+            return image
+        
+        return image.convert('RGB')
+        
+    def thumbnail(self, image_bytes, size=None):
+        """Small RGB thumbnail decoded at reduced resolution, for cheap checks"""
+        size = size or self.thumbnail_size
+        image = self._open_image(image_bytes)
+        image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        image.thumbnail((size, size), Image.BILINEAR)
+        return image
+    
+    def perceptual_hash(self, thumbnail, hash_size=8):
+        """dHash of the downscaled gray image, stable across re-encoding"""
+        aspect = round(thumbnail.width / thumbnail.height, 1)
+        image = thumbnail.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        pixels = np.asarray(image, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+        return f"{aspect}:{np.packbits(bits).tobytes().hex()}"
+    
+    def looks_like_chart(self, thumbnail):
+        """Fast pre-filter on a thumbnail: reject selfies, memes and text screenshots
+        
+        A candlestick chart has a dominant flat background, a noticeable share
+        of saturated red/green pixels, many separate colored column runs
+        (vertical projection) and colored rows spread over the plot height
+        (horizontal projection).
+        """
+        rgb = np.asarray(thumbnail, dtype=np.int16)
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        
+        green = (g - r > 40) & (g - b > 20)
+        red = (r - g > 40) & (r - b > 20)
+        colored = green | red
+        
+        colored_ratio = colored.mean()
+        if not (self.prefilter_min_colored <= colored_ratio <= self.prefilter_max_colored):
+            return False
+        
+        # Vertical projection: count runs of columns that contain candle pixels
+        columns = colored.any(axis=0).astype(np.int8)
+        column_runs = int(columns[0]) + np.count_nonzero(np.diff(columns) == 1)
+        if column_runs < self.prefilter_min_column_runs:
+            return False
+        
+        # Horizontal projection: candles span a good part of the plot height
+        if colored.any(axis=1).mean() < self.prefilter_min_row_span:
+            return False
+        
+        # Flat chart background dominates the quantized gray histogram
+        gray = np.asarray(thumbnail.convert('L'))
+        histogram = np.bincount((gray >> 3).ravel(), minlength=32)
+        return histogram.max() / gray.size >= self.prefilter_min_background
+    
+    def layout_signature(self, img_np):
+        """Cheap platform layout fingerprint: quantized colors of the border strips
+        
+        Toolbars, axis panels and side panels stay the same between screenshots
+        of one platform, while the plot contents change.
+        """
+        height, width = img_np.shape[:2]
+        strip_h = max(1, height // 30)
+        strip_w = max(1, width // 30)
+        strips = (
+            img_np[:strip_h, ::8], img_np[-strip_h:, ::8],
+            img_np[::8, :strip_w], img_np[::8, -strip_w:]
+        )
+        return tuple(
+            int(v) >> 4
+            for strip in strips
+            for v in strip.reshape(-1, 3).mean(axis=0)
+        )
+    
+    def _separator_lines(self, gray, axis):
+        """Positions of long straight lines along the given axis (0 - rows, 1 - columns)"""
+        edges = np.abs(np.diff(gray.astype(np.int16), axis=axis)) > 20
+        fraction = edges.mean(axis=1 - axis)
+        return np.flatnonzero(fraction > self.roi_line_fraction) + 1
+    
+    def detect_plot_roi(self, img_np):
+        """Locate the plotting rectangle as (x0, y0, x1, y1) in image coordinates
+        
+        The candle-colored pixels give the core of the plot; the ROI is then
+        widened to the nearest separator lines (axis boundaries, panel borders)
+        around it. Returns None when no plot area can be found.
+        """
+        plot = self._locate_plot(img_np)
+        return plot[0] if plot else None
+    
+    def _locate_plot(self, img_np):
+        """(roi, plot bottom row) of the price plot, None when no plot area is found
+        
+        Panes below the price plot (volume, oscillators) are split off at a
+        separator line crossing an empty band of the colored rows: the price
+        plot is the top pane. The ROI keeps a small margin around the plot,
+        the bottom row is the exact separator.
+        """
+        height, width = img_np.shape[:2]
+        step = max(1, width // self.roi_scan_width)
+        small = np.ascontiguousarray(img_np[::step, ::step])
+        
+        rgb = small.astype(np.int16)
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        colored = ((g - r > 40) & (g - b > 20)) | ((r - g > 40) & (r - b > 20))
+        
+        rows = np.flatnonzero(colored.any(axis=1))
+        cols = np.flatnonzero(colored.any(axis=0))
+        if len(rows) == 0 or len(cols) == 0:
+            return None
+        
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        h_lines = self._separator_lines(gray, axis=0)
+        v_lines = self._separator_lines(gray, axis=1)
+        
+        # Keep the top pane: cut at the first separator inside a gap of colored rows
+        gaps = np.flatnonzero(np.diff(rows) > 1)
+        for gap in gaps:
+            if ((h_lines > rows[gap]) & (h_lines <= rows[gap + 1])).any():
+                rows = rows[:gap + 1]
+                cols = np.flatnonzero(colored[:rows[-1] + 1].any(axis=0))
+                break
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        
+        # Widen to the enclosing separator lines, otherwise to the image border
+        above, below = h_lines[h_lines < top], h_lines[h_lines > bottom]
+        before, after = v_lines[v_lines < left], v_lines[v_lines > right]
+        top = above[-1] if len(above) else 0
+        bottom = below[0] if len(below) else gray.shape[0]
+        left = before[-1] if len(before) else 0
+        right = after[0] if len(after) else gray.shape[1]
         
-    def preprocess_image(self, image_bytes):
-        """Preprocess image for analysis"""
+        # Back to full resolution with a small margin so boundary lines stay inside
+        margin_y, margin_x = int(height * self.roi_margin), int(width * self.roi_margin)
+        x0 = max(0, left * step - margin_x)
+        y0 = max(0, top * step - margin_y)
+        x1 = min(width, right * step + margin_x)
+        y1 = min(height, bottom * step + margin_y)
+        
+        if (x1 - x0) * (y1 - y0) < self.min_chart_area:
+            return None
+        return (int(x0), int(y0), int(x1), int(y1)), int(min(height, bottom * step))
+    
+    def crop_to_plot(self, img_np):
+        """Crop the RGB image to the plot area, reusing cached ROIs for known layouts"""
+        self.last_frame, self.last_roi, self.last_layout = img_np, None, None
+        self.last_plot_bottom = None
+        if not self.roi_enabled:
+            return img_np
+        
+        self.last_layout = self.layout_signature(img_np)
+        key = (img_np.shape[1], img_np.shape[0], self.last_layout)
+        if key in self._roi_cache:
+            self._roi_cache.move_to_end(key)
+            roi, plot_bottom = self._roi_cache[key]
+        else:
+            plot = self._locate_plot(img_np)
+            if plot is None:
+                return img_np
+            roi, plot_bottom = plot
+            self._roi_cache[key] = plot
+            if len(self._roi_cache) > self.roi_cache_size:
+                self._roi_cache.popitem(last=False)
+        
+        self.last_roi = roi
+        x0, y0, x1, y1 = roi
+        self.last_plot_bottom = plot_bottom - y0
+        return img_np[y0:y1, x0:x1]
+    
+    @staticmethod
+    def get_profile(profile=None):
+        """Resolve a profile name (or an explicit profile dict) to its parameters"""
+        if isinstance(profile, dict):
+            return profile
+        return PREPROCESSING_PROFILES.get(profile or DEFAULT_PROFILE, PREPROCESSING_PROFILES[DEFAULT_PROFILE])
+    
+    def _denoise(self, gray, method):
+        """Apply the profile denoiser; returns a scratch buffer or gray itself"""
+        if method == 'none':
+            return gray
+        
+        dst = self._buffer('filtered', gray.shape)
+        if method == 'gaussian':
+            return cv2.GaussianBlur(gray, (3, 3), 0, dst=dst)
+        
+        if method == 'bilateral_downscaled':
+            # Bilateral filter at half resolution costs ~1/8 of the full one
+            height, width = gray.shape
+            small = cv2.resize(gray, (max(1, width // 2), max(1, height // 2)), interpolation=cv2.INTER_AREA)
+            small = cv2.bilateralFilter(small, 5, 75, 75)
+            return cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
+        
+        # Full bilateral filter (cannot run in place)
+        return cv2.bilateralFilter(gray, 9, 75, 75, dst=dst)
+    
+    def preprocess_image(self, image_bytes, profile=None):
+        """Preprocess image for analysis
+        
+        Returns a uint8 gray image and the RGB image, both cropped to the
+        plot area. The gray image is a scratch buffer, valid until the next
+        call on this processor.
+        """
         try:
+            params = self.get_profile(profile)
+            
             # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            image = image.convert('RGB')
-            img_np = np.array(image)
+            image = self.decode_image(image_bytes, target_pixels=params['target_pixels'])
+            img_np = self.crop_to_plot(np.asarray(image))
+            shape = img_np.shape[:2]
             
             # Convert to grayscale
-            gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-            
-            # Enhance contrast
-            gray = cv2.equalizeHist(gray)
+            gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY, dst=self._buffer('gray', shape))
             
-            # Apply bilateral filter to reduce noise
-            gray = cv2.bilateralFilter(gray, 9, 75, 75)
+            # Enhance contrast (in place)
+            cv2.equalizeHist(gray, dst=gray)
             
-            # Normalize
-            gray = gray / 255.0
+            # Reduce noise with the profile denoiser
+            filtered = self._denoise(gray, params['denoise'])
             
-            return gray, img_np
+            return filtered, img_np
         except Exception as e:
             logger.error(f"Image preprocessing error: {e}")
             raise
     
-    def detect_chart_grid(self, gray_image):
+    def detect_chart_grid(self, gray_image, profile=None):
         """Detect chart grid using line detection"""
+        params = self.get_profile(profile)
+        low, high = params['canny']
+        
         # Edge detection
-        edges = cv2.Canny(gray_image, 50, 150, apertureSize=3)
+        edges = cv2.Canny(gray_image, low, high, self._buffer('edges', gray_image.shape), apertureSize=3)
         
         # Detect lines using Hough Transform
         lines = cv2.HoughLinesP(
             edges, 
             1, 
             np.pi/180, 
-            threshold=50, 
-            minLineLength=30, 
-            maxLineGap=10
+            threshold=params['hough_threshold'], 
+            minLineLength=params['min_line_length'], 
+            maxLineGap=params['max_line_gap']
         )
         
         if lines is not None:
@@ -55,8 +377,7 @@ class ImageProcessor:
             horizontal = 0
             vertical = 0
             
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
+            for x1, y1, x2, y2 in lines.reshape(-1, 4):
                 angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
                 
                 if abs(angle) < 10 or abs(angle - 180) < 10:  # Horizontal
@@ -71,108 +392,141 @@ class ImageProcessor:
     def detect_candles(self, gray_image, color_image):
         """Detect candlesticks in the image"""
         # Threshold to binary
-        _, binary = cv2.threshold((gray_image * 255).astype(np.uint8), 
-                                 127, 255, cv2.THRESH_BINARY_INV)
+        _, binary = cv2.threshold(gray_image, 127, 255, cv2.THRESH_BINARY_INV,
+                                  dst=self._buffer('binary', gray_image.shape))
         
-        # Find contours
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
-                                      cv2.CHAIN_APPROX_SIMPLE)
+        # Label connected components; stats rows are [x, y, w, h, area]
+        n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        stats = stats[1:]  # drop background
+        x = stats[:, cv2.CC_STAT_LEFT]
+        y = stats[:, cv2.CC_STAT_TOP]
+        w = stats[:, cv2.CC_STAT_WIDTH]
+        h = stats[:, cv2.CC_STAT_HEIGHT]
+        area = stats[:, cv2.CC_STAT_AREA]
         
-        candles = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filter by area (candle size)
-            if self.candle_min_area < area < self.candle_max_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Calculate aspect ratio (candles are usually tall and thin)
-                aspect_ratio = h / w if w > 0 else 0
-                
-                if aspect_ratio > 1.5:  # Typical candle aspect ratio
-                    # Get color at the center
-                    center_x = x + w // 2
-                    center_y = y + h // 2
-                    
-                    if 0 <= center_x < color_image.shape[1] and 0 <= center_y < color_image.shape[0]:
-                        color = color_image[center_y, center_x]
-                        
-                        # Determine if it's green (bullish) or red (bearish) candle
-                        is_green = self._is_green_candle(color)
-                        is_red = self._is_red_candle(color)
-                        
-                        candles.append({
-                            'x': x,
-                            'y': y,
-                            'width': w,
-                            'height': h,
-                            'center_x': center_x,
-                            'center_y': center_y,
-                            'color': 'green' if is_green else 'red' if is_red else 'unknown',
-                            'area': area
-                        })
+        # Filter by area (candle size) and aspect ratio (candles are tall and thin)
+        keep = (
+            (area > self.candle_min_area * self.area_scale) &
+            (area < self.candle_max_area * self.area_scale) &
+            (h > 1.5 * w)
+        )
+        idx = np.flatnonzero(keep)
+        if len(idx) == 0:
+            return empty_candles()
+        
+        colors = self._mean_component_colors(labels, color_image, idx + 1, x[idx], y[idx], w[idx], h[idx])
+        
+        # Determine if it's green (bullish) or red (bearish) candle
+        color_codes = np.where(
+            self._is_green_candle(colors), COLOR_GREEN,
+            np.where(self._is_red_candle(colors), COLOR_RED, COLOR_UNKNOWN)
+        )
         
         # Sort candles by x position (left to right)
-        candles.sort(key=lambda c: c['x'])
+        order = np.argsort(x[idx], kind='stable')
+        idx = idx[order]
+        
+        candles = empty_candles(len(idx))
+        candles['x'] = x[idx]
+        candles['y'] = y[idx]
+        candles['width'] = w[idx]
+        candles['height'] = h[idx]
+        candles['area'] = area[idx]
+        candles['color'] = color_codes[order]
         
         return candles
     
+    def _mean_component_colors(self, labels, color_image, component_ids, x, y, w, h):
+        """Mean color of each component, gathered from its bounding box only"""
+        # Flat pixel coordinates of all bounding boxes, built without a Python loop
+        sizes = w * h
+        owner = np.repeat(np.arange(len(component_ids)), sizes)
+        offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        rows = y[owner] + offsets // w[owner]
+        cols = x[owner] + offsets % w[owner]
+        
+        # Keep only pixels that belong to the component itself (not neighbours in the box)
+        inside = labels[rows, cols] == component_ids[owner]
+        owner, rows, cols = owner[inside], rows[inside], cols[inside]
+        
+        pixels = color_image[rows, cols].astype(np.float64)
+        counts = np.bincount(owner, minlength=len(component_ids))
+        sums = np.stack([
+            np.bincount(owner, weights=pixels[:, c], minlength=len(component_ids))
+            for c in range(3)
+        ], axis=1)
+        return sums / np.maximum(counts, 1)[:, None]
+    
     def _is_green_candle(self, color):
-        """Check if color represents a green candle"""
-        r, g, b = color
+        """Check if color (or an array of colors) represents a green candle"""
+        r, g, b = np.moveaxis(np.asarray(color), -1, 0)
         # Green candles: higher green value
-        return g > r and g > b and g > 100
+        return (g > r) & (g > b) & (g > 100)
     
     def _is_red_candle(self, color):
-        """Check if color represents a red candle"""
-        r, g, b = color
+        """Check if color (or an array of colors) represents a red candle"""
+        r, g, b = np.moveaxis(np.asarray(color), -1, 0)
         # Red candles: higher red value
-        return r > g and r > b and r > 100
+        return (r > g) & (r > b) & (r > 100)
     
     def extract_ohlc_from_candles(self, candles, image_height):
-        """Extract OHLC data from detected candles"""
-        if not candles:
+        """Fill OHLC fields of the candle array in place and return it"""
+        if candles is None or len(candles) == 0:
             return None
         
-        ohlc_data = []
+        # Convert y position to price (assuming higher y = lower price)
+        # This is a simplification - real implementation needs scale calibration
+        top = candles['y'].astype(np.float64)
+        height = candles['height'].astype(np.float64)
         
-        for candle in candles:
-            # Convert y position to price (assuming higher y = lower price)
-            # This is a simplification - real implementation needs scale calibration
-            high_price = candle['y'] / image_height
-            low_price = (candle['y'] + candle['height']) / image_height
-            
-            # For simplicity, assume body is middle 60% of candle
-            body_start = candle['y'] + candle['height'] * 0.2
-            body_end = candle['y'] + candle['height'] * 0.8
-            
-            if candle['color'] == 'green':
-                open_price = body_start / image_height
-                close_price = body_end / image_height
-            else:  # red candle
-                open_price = body_end / image_height
-                close_price = body_start / image_height
-            
-            ohlc_data.append({
-                'open': open_price,
-                'high': high_price,
-                'low': low_price,
-                'close': close_price,
-                'color': candle['color']
-            })
+        # For simplicity, assume body is middle 60% of candle
+        body_start = (top + height * 0.2) / image_height
+        body_end = (top + height * 0.8) / image_height
+        is_green = candles['color'] == COLOR_GREEN
         
-        return ohlc_data
+        candles['high'] = top / image_height
+        candles['low'] = (top + height) / image_height
+        candles['open'] = np.where(is_green, body_start, body_end)
+        candles['close'] = np.where(is_green, body_end, body_start)
+        
+        return candles
+    
+    def extract_ohlc_by_projection(self, color_image):
+        """Real OHLC (wicks and bodies) from per-column projections of the plot area
+        
+        The scan stops at the bottom of the last plot ROI, so a volume pane
+        inside the crop margin is not read as candles.
+        """
+        return self.ohlc_extractor.extract(color_image, bottom=self.last_plot_bottom)
+    
+    def calibrate_axis(self):
+        """Price-axis calibration of the last preprocessed frame, None if the axis is unreadable"""
+        if self.last_frame is None:
+            return None
+        if self.last_layout is None:
+            self.last_layout = self.layout_signature(self.last_frame)
+        return self.axis_calibrator.calibrate(self.last_frame, self.last_roi, self.last_layout)
+    
+    def extract_prices(self, color_image, calibration):
+        """OHLC of the last preprocessed plot in axis prices
+        
+        calibration comes from calibrate_axis() on the same frame; callers
+        skip the extraction when it is None.
+        """
+        candles = self.extract_ohlc_by_projection(color_image)
+        if len(candles):
+            plot_top = self.last_roi[1] if self.last_roi else 0
+            calibration.apply(candles, plot_top, color_image.shape[0])
+        return candles
     
     def prepare_for_cnn(self, gray_image):
         """Prepare image for CNN model"""
-        # Resize to 64x64
+        # Resize to 64x64 while still uint8
         resized = cv2.resize(gray_image, (64, 64))
         
-        # Add channel dimension
-        if len(resized.shape) == 2:
-            resized = np.expand_dims(resized, axis=-1)
-        
-        # Normalize
-        resized = resized.astype(np.float32)
+        # Normalize: only the final small tensor becomes float32
+        tensor = resized.astype(np.float32)
+        tensor *= 1.0 / 255.0
         
-        return np.expand_dims(resized, axis=0)
\ No newline at end of file
+        # Add batch and channel dimensions
+        return tensor.reshape(1, 64, 64, 1)
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Векторный движок технических индикаторов: полные ряды NumPy по массиву свечей
+
+Ряды считаются TA-Lib-совместимыми функциями (app.ml.talib_compat) - теми
+же, что используются при обучении моделей, - с прогревом NaN.
+"""
+import numpy as np
+from app.ml import talib_compat as ta
+
+
+def _field(ohlc, name):
+    """Column of a candle array (or a mapping of arrays) as float64"""
+    return np.asarray(ohlc[name], dtype=np.float64)
+
+
+def has_field(ohlc, name):
+    """Whether a candle array / mapping / DataFrame has the column"""
+    names = getattr(getattr(ohlc, 'dtype', None), 'names', None)
+    return name in names if names is not None else name in ohlc
+
+
+class IndicatorSeries:
+    """Indicator series for one OHLC array with memoized intermediates
+
+    EMA(26) is shared by EMA and MACD, SMA(20) by SMA and Bollinger, so
+    every intermediate is computed at most once.
+    """
+
+    def __init__(self, ohlc):
+        self.close = _field(ohlc, 'close')
+        self._ohlc = ohlc
+        self._memo = {}
+
+    def _get(self, key, func, *args):
+        if key not in self._memo:
+            self._memo[key] = func(*args)
+        return self._memo[key]
+
+    @property
+    def high(self):
+        return self._get('high', _field, self._ohlc, 'high')
+
+    @property
+    def low(self):
+        return self._get('low', _field, self._ohlc, 'low')
+
+    @property
+    def open(self):
+        return self._get('open', _field, self._ohlc, 'open')
+
+    @property
+    def volume(self):
+        """Volume column, None for chart candles without volume"""
+        if not has_field(self._ohlc, 'volume'):
+            return None
+        return self._get('volume', _field, self._ohlc, 'volume')
+
+    def sma(self, period):
+        return self._get(('sma', period), ta.sma, self.close, period)
+
+    def ema(self, period):
+        return self._get(('ema', period), ta.ema, self.close, period)
+
+    def std(self, period):
+        return self._get(('std', period), ta.rolling_std, self.close, period)
+
+    def rsi(self, period):
+        return self._get(('rsi', period), ta.RSI, self.close, period)
+
+    def macd(self, fast, slow, signal):
+        return self._get(('macd', fast, slow, signal),
+                         lambda: ta.macd(self.close, fast, slow, signal, slow_ema=self.ema(slow)))
+
+    def stochastic(self, period, smooth):
+        return self._get(('stoch', period, smooth), ta.STOCHF, self.high, self.low, self.close, period, smooth)
+
+    def slow_stochastic(self, fastk_period, slowk_period, slowd_period):
+        return self._get(('slow_stoch', fastk_period, slowk_period, slowd_period), ta.STOCH,
+                         self.high, self.low, self.close, fastk_period, slowk_period, ta.SMA_TYPE,
+                         slowd_period)
+
+    def atr(self, period):
+        return self._get(('atr', period), ta.ATR, self.high, self.low, self.close, period)
+
+
+class IndicatorEngine:
+    """Computes the selected indicators as full arrays from one OHLC array"""
+
+    # Названия индикаторов из пользовательских настроек
+    SUPPORTED = ('RSI', 'MACD', 'SMA', 'EMA', 'Bollinger', 'Stochastic', 'ATR')
+
+    def __init__(self, rsi_period=14, sma_periods=(10, 20), ema_periods=(12, 26),
+                 macd_periods=(12, 26, 9), bb_period=20, bb_std=2,
+                 stoch_period=14, stoch_smooth=3, atr_period=14):
+        self.rsi_period = rsi_period
+        self.sma_periods = sma_periods
+        self.ema_periods = ema_periods
+        self.macd_periods = macd_periods
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        self.stoch_period = stoch_period
+        self.stoch_smooth = stoch_smooth
+        self.atr_period = atr_period
+
+    def compute(self, ohlc, selected=None):
+        """Return {name: array} for the selected indicators (all when None)"""
+        series = IndicatorSeries(ohlc)
+        selected = self.SUPPORTED if selected is None else selected
+        out = {}
+
+        if 'SMA' in selected:
+            for period in self.sma_periods:
+                out[f'sma_{period}'] = series.sma(period)
+
+        if 'EMA' in selected:
+            for period in self.ema_periods:
+                out[f'ema_{period}'] = series.ema(period)
+
+        if 'RSI' in selected:
+            out['rsi'] = series.rsi(self.rsi_period)
+
+        if 'MACD' in selected:
+            out['macd'], out['macd_signal'], out['macd_hist'] = series.macd(*self.macd_periods)
+
+        if 'Bollinger' in selected:
+            middle = series.sma(self.bb_period)
+            band = self.bb_std * series.std(self.bb_period)
+            out['bb_upper'] = middle + band
+            out['bb_middle'] = middle
+            out['bb_lower'] = middle - band
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bb_position = np.where(band > 0, (series.close - middle + band) / (2 * band), 0.5)
+                out['bb_width'] = 2 * band / middle
+            bb_position[np.isnan(band)] = np.nan
+            out['bb_position'] = bb_position
+
+        if 'Stochastic' in selected:
+            out['stoch_k'], out['stoch_d'] = series.stochastic(self.stoch_period, self.stoch_smooth)
+
+        if 'ATR' in selected:
+            out['atr'] = series.atr(self.atr_period)
+            out['atr_pct'] = out['atr'] / series.close * 100
+
+        return out
+
+    def latest(self, ohlc, selected=None):
+        """Last non-warm-up value of every selected indicator"""
+        return {
+            name: float(values[-1])
+            for name, values in self.compute(ohlc, selected).items()
+            if len(values) and not np.isnan(values[-1])
+        }
+
+
+# Создаем глобальный инстанс
+indicator_engine = IndicatorEngine()
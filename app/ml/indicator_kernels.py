@@ -0,0 +1,141 @@
+"""
+Последовательные ядра индикаторов с подключаемым бэкендом
+
+Рекурсивное сглаживание (EMA, Уайлдер) и скользящие min/max не
+векторизуются полностью. Если установлен Numba, используются
+JIT-ядра (компиляция кешируется на диске, cache=True), иначе -
+реализации на NumPy/SciPy. Бэкенд выбирается INDICATOR_BACKEND
+("auto", "numba", "numpy") или set_backend().
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from app.utils.config import config
+from app.utils.logger import logger
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # без SciPy сглаживание бэкенда numpy - цикл Python
+    lfilter = None
+
+try:
+    from numba import njit
+except ImportError:  # Numba необязателен
+    njit = None
+
+BACKENDS = ('numba', 'numpy')
+
+
+# NumPy / SciPy kernels
+
+def _smooth_numpy(x, alpha, seed):
+    if lfilter is None:
+        return _smooth_loop(x, alpha, seed)
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * seed])
+    return y
+
+
+def _rolling_max_numpy(x, period):
+    return sliding_window_view(x, period).max(axis=1)
+
+
+def _rolling_min_numpy(x, period):
+    return sliding_window_view(x, period).min(axis=1)
+
+
+# Numba kernels
+
+def _smooth_loop(x, alpha, seed):
+    y = np.empty(len(x))
+    prev = seed
+    for i in range(len(x)):
+        prev = alpha * x[i] + (1.0 - alpha) * prev
+        y[i] = prev
+    return y
+
+
+def _rolling_extreme_loop(x, period, sign):
+    """Monotonic deque of indices; sign=1 for max, -1 for min"""
+    n = len(x)
+    out = np.empty(n - period + 1)
+    window = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    for i in range(n):
+        while tail > head and sign * x[window[tail - 1]] <= sign * x[i]:
+            tail -= 1
+        window[tail] = i
+        tail += 1
+        if window[head] <= i - period:
+            head += 1
+        if i >= period - 1:
+            out[i - period + 1] = x[window[head]]
+    return out
+
+
+if njit is not None:
+    _smooth_numba = njit(cache=True)(_smooth_loop)
+    _rolling_extreme_numba = njit(cache=True)(_rolling_extreme_loop)
+
+
+def _rolling_max_numba(x, period):
+    return _rolling_extreme_numba(x, period, 1.0)
+
+
+def _rolling_min_numba(x, period):
+    return _rolling_extreme_numba(x, period, -1.0)
+
+
+_KERNELS = {
+    'numpy': (_smooth_numpy, _rolling_max_numpy, _rolling_min_numpy),
+    'numba': (_smooth_numba, _rolling_max_numba, _rolling_min_numba) if njit is not None else None
+}
+_active = {'backend': None}
+
+
+def set_backend(name='auto'):
+    """Select the kernel backend; "auto" prefers Numba when it is installed"""
+    if name == 'auto':
+        name = 'numba' if njit is not None else 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown indicator backend: {name}")
+    if _KERNELS[name] is None:
+        raise ValueError("Numba is not installed, indicator backend 'numba' is unavailable")
+
+    _active['backend'] = name
+    logger.info(f"Indicator kernels backend: {name}")
+    return name
+
+
+def get_backend():
+    if _active['backend'] is None:
+        set_backend(config.INDICATOR_BACKEND)
+    return _active['backend']
+
+
+def _kernels():
+    return _KERNELS[get_backend()]
+
+
+def smooth(x, alpha, seed):
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t - 1], with y[-1] = seed"""
+    if len(x) == 0:
+        return np.empty(0)
+    return _kernels()[0](np.asarray(x, dtype=np.float64), float(alpha), float(seed))
+
+
+def rolling_max(x, period):
+    """Max over each full window, len(x) - period + 1 values"""
+    return _kernels()[1](np.asarray(x, dtype=np.float64), period)
+
+
+def rolling_min(x, period):
+    """Min over each full window, len(x) - period + 1 values"""
+    return _kernels()[2](np.asarray(x, dtype=np.float64), period)
+
+
+def warmup():
+    """Compile (or load from the on-disk cache) the JIT kernels ahead of the first request"""
+    x = np.arange(8, dtype=np.float64)
+    smooth(x, 0.5, 0.0)
+    rolling_max(x, 3)
+    rolling_min(x, 3)
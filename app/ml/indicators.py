@@ -1,37 +1,35 @@
 import pandas as pd
 import numpy as np
+from app.ml import indicator_kernels as kernels
+from app.ml import talib_compat as ta
+
+def as_prices(data, field='close'):
+    """Цены из массива свечей (поле без копирования) или из обычной последовательности"""
+    data = np.asarray(data)
+    if data.dtype.names is not None:
+        return data[field]
+    return data.astype(np.float64, copy=False)
 
 class SimpleIndicators:
-    """Упрощенные реализации технических индикаторов"""
+    """Упрощенные реализации технических индикаторов
+    
+    Скалярные обертки над векторными рядами: возвращают последнее значение.
+    EMA и MACD здесь, как и раньше, начинаются с первой цены (без SMA-прогрева
+    TA-Lib).
+    """
     
     @staticmethod
     def rsi(prices, period=14):
         """RSI индикатор"""
-        if len(prices) < period:
+        prices = as_prices(prices)
+        if len(prices) <= period:
             return 50.0
-        
-        deltas = np.diff(prices)
-        seed = deltas[:period]
-        up = seed[seed >= 0].sum() / period
-        down = -seed[seed < 0].sum() / period
-        
-        for i in range(period, len(deltas)):
-            delta = deltas[i]
-            if delta >= 0:
-                up = (up * (period - 1) + delta) / period
-                down = (down * (period - 1)) / period
-            else:
-                up = (up * (period - 1)) / period
-                down = (down * (period - 1) - delta) / period
-        
-        if down == 0:
-            return 100.0
-        rs = up / down
-        return 100.0 - (100.0 / (1.0 + rs))
+        return ta.RSI(prices, period)[-1]
     
     @staticmethod
     def sma(prices, period):
         """Простое скользящее среднее"""
+        prices = as_prices(prices)
         if len(prices) < period:
             return np.mean(prices) if len(prices) > 0 else 0
         return np.mean(prices[-period:])
@@ -39,20 +37,15 @@ class SimpleIndicators:
     @staticmethod
     def ema(prices, period):
         """Экспоненциальное скользящее среднее"""
+        prices = as_prices(prices)
         if len(prices) < period:
             return np.mean(prices) if len(prices) > 0 else 0
-        
-        alpha = 2 / (period + 1)
-        ema_val = prices[0]
-        
-        for price in prices[1:]:
-            ema_val = price * alpha + ema_val * (1 - alpha)
-        
-        return ema_val
+        return SimpleIndicators._ema_series(prices, period)[-1]
     
     @staticmethod
     def macd(prices, fast=12, slow=26, signal=9):
         """MACD индикатор"""
+        prices = as_prices(prices)
         if len(prices) < slow:
             return 0, 0, 0
         
@@ -67,19 +60,13 @@ class SimpleIndicators:
     
     @staticmethod
     def _ema_series(data, period):
-        """Вспомогательная функция для расчета EMA ряда"""
-        alpha = 2 / (period + 1)
-        ema_vals = np.zeros_like(data, dtype=float)
-        ema_vals[0] = data[0]
-        
-        for i in range(1, len(data)):
-            ema_vals[i] = data[i] * alpha + ema_vals[i-1] * (1 - alpha)
-        
-        return ema_vals
+        """Вспомогательная функция для расчета EMA ряда (рекурсивный фильтр)"""
+        return kernels.smooth(data, 2 / (period + 1), data[0])
     
     @staticmethod
     def bollinger_bands(prices, period=20, std_dev=2):
         """Полосы Боллинджера"""
+        prices = as_prices(prices)
         if len(prices) < period:
             sma = np.mean(prices) if len(prices) > 0 else 0
             return sma, sma, sma
@@ -0,0 +1,104 @@
+"""
+Уровни поддержки/сопротивления и пивоты по массиву свечей (app.ml.candles)
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FIBONACCI_RATIOS = (0.382, 0.618, 1.0)
+
+
+class LevelEngine:
+    """Vectorized swing-point, level-clustering and pivot computations.
+
+    * swing highs/lows - candles whose high (low) is the extreme of the
+      window of `order` candles on each side, found with one sliding window;
+    * levels - swing prices sorted once and split where the gap between
+      neighbours exceeds the tolerance (a histogram with adaptive bins),
+      so clustering is O(n log n);
+    * pivots - classic and Fibonacci pivots over the chart's range.
+    """
+
+    def __init__(self, order=2, cluster_tolerance=0.015, max_levels=6):
+        self.order = order
+        # Max gap inside one level, as a fraction of the chart's price range
+        self.cluster_tolerance = cluster_tolerance
+        self.max_levels = max_levels
+
+    def swing_points(self, ohlc):
+        """Indices of swing highs and swing lows"""
+        window = 2 * self.order + 1
+        if len(ohlc) < window:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        highs = sliding_window_view(ohlc['high'], window)
+        lows = sliding_window_view(ohlc['low'], window)
+        # argmax returns the first extreme, so flat tops count only once
+        swing_highs = np.flatnonzero(highs.argmax(axis=1) == self.order) + self.order
+        swing_lows = np.flatnonzero(lows.argmin(axis=1) == self.order) + self.order
+        return swing_highs, swing_lows
+
+    def cluster_levels(self, prices, tolerance):
+        """Cluster prices into levels: returns (level prices, touch counts) by price"""
+        if len(prices) == 0:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+
+        prices = np.sort(prices)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(prices) > tolerance) + 1))
+        touches = np.diff(np.concatenate((starts, [len(prices)])))
+        levels = np.add.reduceat(prices, starts) / touches
+        return levels, touches
+
+    @staticmethod
+    def pivots(high, low, close):
+        """Classic and Fibonacci pivot points"""
+        pivot = (high + low + close) / 3
+        span = high - low
+        classic = {
+            'pivot': pivot,
+            'r1': 2 * pivot - low, 's1': 2 * pivot - high,
+            'r2': pivot + span, 's2': pivot - span,
+            'r3': high + 2 * (pivot - low), 's3': low - 2 * (high - pivot)
+        }
+        fibonacci = {'pivot': pivot}
+        for i, ratio in enumerate(FIBONACCI_RATIOS, 1):
+            fibonacci[f'r{i}'] = pivot + ratio * span
+            fibonacci[f's{i}'] = pivot - ratio * span
+        return {'classic': classic, 'fibonacci': fibonacci}
+
+    def analyze(self, ohlc):
+        """Support, resistance, clustered levels and pivots for a candle array
+
+        Returns None when there are not enough candles for swing detection.
+        """
+        if ohlc is None or len(ohlc) < 2 * self.order + 1:
+            return None
+
+        high = float(ohlc['high'].max())
+        low = float(ohlc['low'].min())
+        close = float(ohlc['close'][-1])
+
+        swing_highs, swing_lows = self.swing_points(ohlc)
+        swings = np.concatenate((ohlc['high'][swing_highs], ohlc['low'][swing_lows]))
+        levels, touches = self.cluster_levels(swings, self.cluster_tolerance * (high - low))
+
+        # Strongest levels first, then nearest support below / resistance above
+        strongest = np.argsort(-touches, kind='stable')[:self.max_levels]
+        levels, touches = levels[strongest], touches[strongest]
+        below, above = levels < close, levels > close
+        support = float(levels[below].max()) if below.any() else low
+        resistance = float(levels[above].min()) if above.any() else high
+
+        return {
+            'support': support,
+            'resistance': resistance,
+            'pivot': (high + low + close) / 3,
+            'levels': [
+                {'price': float(price), 'touches': int(count)}
+                for price, count in sorted(zip(levels, touches), reverse=True)
+            ],
+            'pivots': self.pivots(high, low, close)
+        }
+
+
+# Создаем глобальный инстанс
+level_engine = LevelEngine()
@@ -0,0 +1,158 @@
+"""
+Извлечение OHLC по проекциям столбцов: реальные тени и тела свечей
+вместо допущения "тело = средние 60% bounding box"
+"""
+import numpy as np
+from app.ml.candles import empty_candles, COLOR_GREEN, COLOR_RED
+
+
+class ProjectionOHLCExtractor:
+    """Vectorized OHLC extraction from per-column color masks of the plot area.
+
+    Every run of adjacent columns containing candle-colored pixels is one
+    candle. Touching candles are split where the column color flips and, for
+    runs much wider than a typical candle, at the column where the colored
+    extent changes (the seam between two bodies). Row counts inside each run
+    come from a single cumulative sum over the mask, so all candles are
+    measured at once:
+
+    * wick extent (high/low) - first/last row with any colored pixel;
+    * body extent (open/close) - first/last row whose colored width covers
+      most of the run width.
+
+    Prices are returned in plot units (0 at the bottom of the image, 1 at the
+    top) so that higher on screen means higher price.
+    """
+
+    def __init__(self, min_column_pixels=2, body_fill=0.6, min_height=3):
+        self.min_column_pixels = min_column_pixels
+        self.body_fill = body_fill
+        self.min_height = min_height
+
+    @staticmethod
+    def color_masks(color_image):
+        """Boolean green/red candle masks for an RGB image"""
+        rgb = color_image.astype(np.int16)
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        green = (g - r > 40) & (g - b > 20)
+        red = (r - g > 40) & (r - b > 20)
+        return green, red
+
+    @staticmethod
+    def _first_true(mask):
+        """Index of the first True along axis 0 (columns without True give -1)"""
+        return np.where(mask.any(axis=0), mask.argmax(axis=0), -1)
+
+    @staticmethod
+    def _last_true(mask):
+        """Index of the last True along axis 0 (columns without True give -1)"""
+        return np.where(mask.any(axis=0), mask.shape[0] - 1 - mask[::-1].argmax(axis=0), -1)
+
+    @staticmethod
+    def _column_runs(active, is_green):
+        """(starts, ends) of active column runs, split where the column color flips"""
+        edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+        flips = np.flatnonzero(active[1:] & active[:-1] & (is_green[1:] != is_green[:-1])) + 1
+        starts = np.sort(np.concatenate((np.flatnonzero(edges == 1), flips)))
+        ends = np.sort(np.concatenate((np.flatnonzero(edges == -1), flips)))
+        return starts, ends
+
+    def _split_wide_runs(self, starts, ends, top, bottom):
+        """Split runs spanning several candle widths into single candles
+
+        The typical width is the lower quartile of the widths of tall enough
+        runs; a run is cut into the nearest whole number of them. Each cut
+        goes to the column nearest the even split where the colored extent
+        (top/bottom row) changes: the seam between two touching bodies; wick
+        columns lie half a candle away from it.
+        """
+        widths = ends - starts
+        tall = (bottom[starts] - top[starts] + 1) >= self.min_height
+        if tall.sum() < 2:
+            return starts, ends
+        reference = np.percentile(widths[tall], 25)
+        parts = np.floor(widths / reference + 0.5).astype(np.int64)
+        wide = np.flatnonzero(parts > 1)
+        if len(wide) == 0:
+            return starts, ends
+
+        seams = np.zeros(len(top), dtype=bool)
+        seams[1:] = (top[1:] != top[:-1]) | (bottom[1:] != bottom[:-1])
+        radius = max(1, int(reference // 3))
+        cuts = []
+        for i in wide:
+            for k in range(1, parts[i]):
+                guess = starts[i] + int(round(k * widths[i] / parts[i]))
+                window = np.arange(max(starts[i] + 1, guess - radius), min(ends[i], guess + radius + 1))
+                candidates = window[seams[window]]
+                cuts.append(candidates[np.abs(candidates - guess).argmin()] if len(candidates) else guess)
+
+        cuts = np.unique(cuts)
+        return np.sort(np.concatenate((starts, cuts))), np.sort(np.concatenate((ends, cuts)))
+
+    def extract(self, color_image, bottom=None):
+        """Extract a candle array with real OHLC values from the plot image
+
+        bottom is the lower edge (row) of the price plot: rows from it down,
+        e.g. a volume pane below the plot, are not scanned. Prices stay
+        relative to the full image height.
+        """
+        height = color_image.shape[0]
+        green, red = self.color_masks(color_image[:bottom])
+        colored = green | red
+
+        # Column runs: consecutive columns that contain candle pixels
+        active = colored.sum(axis=0) >= self.min_column_pixels
+        starts, ends = self._column_runs(active, green.sum(axis=0) >= red.sum(axis=0))
+        if len(starts) == 0:
+            return empty_candles()
+        starts, ends = self._split_wide_runs(starts, ends, self._first_true(colored), self._last_true(colored))
+
+        # Per-row colored width inside every run: (H, n_runs) from one cumsum
+        cumulative = np.zeros((colored.shape[0], colored.shape[1] + 1), dtype=np.int32)
+        np.cumsum(colored, axis=1, out=cumulative[:, 1:])
+        row_width = cumulative[:, ends] - cumulative[:, starts]
+        run_width = ends - starts
+
+        green_count = np.cumsum(green.sum(axis=0))
+        red_count = np.cumsum(red.sum(axis=0))
+        green_count = np.concatenate(([0], green_count))
+        red_count = np.concatenate(([0], red_count))
+        green_in_run = green_count[ends] - green_count[starts]
+        red_in_run = red_count[ends] - red_count[starts]
+
+        # Wick: any colored pixel; body: rows that fill most of the run width
+        wick_rows = row_width > 0
+        body_rows = row_width >= np.maximum(1, np.ceil(run_width * self.body_fill))
+        high_row = self._first_true(wick_rows)
+        low_row = self._last_true(wick_rows)
+        body_top = self._first_true(body_rows)
+        body_bottom = self._last_true(body_rows)
+
+        # Doji / wick-only runs: collapse the body to the middle of the wick
+        no_body = body_top < 0
+        middle = (high_row + low_row) // 2
+        body_top = np.where(no_body, middle, body_top)
+        body_bottom = np.where(no_body, middle, body_bottom)
+
+        keep = (low_row - high_row + 1) >= self.min_height
+        idx = np.flatnonzero(keep)
+
+        candles = empty_candles(len(idx))
+        candles['x'] = starts[idx]
+        candles['y'] = high_row[idx]
+        candles['width'] = run_width[idx]
+        candles['height'] = (low_row - high_row + 1)[idx]
+        candles['area'] = (green_in_run + red_in_run)[idx]
+        is_green = green_in_run[idx] >= red_in_run[idx]
+        candles['color'] = np.where(is_green, COLOR_GREEN, COLOR_RED)
+
+        # Pixel rows -> plot units, higher on screen = higher price
+        def to_price(row):
+            return (height - row[idx]) / height
+
+        candles['high'] = to_price(high_row)
+        candles['low'] = to_price(low_row + 1)
+        candles['open'] = np.where(is_green, to_price(body_bottom + 1), to_price(body_top))
+        candles['close'] = np.where(is_green, to_price(body_top), to_price(body_bottom + 1))
+        return candles
@@ -2,78 +2,148 @@
 Упрощенный предсказатель без TensorFlow для обратной совместимости
 """
 import numpy as np
+from app.ml.axis_calibration import price_digits
 from app.utils.logger import logger
 
+# Множитель уровней и срок действия сигнала (минуты) по таймфрейму
+TIMEFRAME_MULTIPLIER = {'1m': 0.5, '5m': 1.0, '15m': 1.5, '30m': 2.0, '1h': 2.5, '4h': 3.0, '1d': 4.0}
+EXPIRATION_MINUTES = {'1m': 5, '5m': 15, '15m': 45, '30m': 90, '1h': 180, '4h': 720, '1d': 1440}
+
+
+def risk_levels(direction, confidence, timeframe):
+    """take_profit / stop_loss in percent; direction and confidence may be arrays (backtests)"""
+    multiplier = TIMEFRAME_MULTIPLIER.get(timeframe, 1.0)
+    confidence = np.asarray(confidence, dtype=np.float64)
+    sideways = np.asarray(direction) == 'SIDEWAYS'
+    take_profit = np.where(sideways, 0.5 * multiplier, 1.5 * multiplier * confidence)
+    stop_loss = np.where(sideways, 0.3 * multiplier, 0.8 * multiplier * (1 - confidence * 0.5))
+    return take_profit, stop_loss
+
+
 class PricePredictor:
     def __init__(self):
         logger.info("Using mock predictor (TensorFlow disabled)")
         
-    def predict(self, image_data, timeframe='5m', indicators=None, sensitivity='medium'):
-        """Мок-предсказатель для тестирования"""
-        try:
-            # Простое детерминированное предсказание на основе хеша
-            import hashlib
-            seed = int(hashlib.md5(str(image_data.shape).encode()).hexdigest()[:8], 16)
-            np.random.seed(seed % 1000)
-            
-            directions = ['UP', 'DOWN', 'SIDEWAYS']
-            direction = np.random.choice(directions, p=[0.4, 0.4, 0.2])
-            confidence = np.random.uniform(0.6, 0.9)
-            
-            # Расчет уровней
-            base_price = 100
-            timeframe_multiplier = {'1m': 0.5, '5m': 1.0, '15m': 1.5, '30m': 2.0, '1h': 2.5, '4h': 3.0, '1d': 4.0}
-            multiplier = timeframe_multiplier.get(timeframe, 1.0)
-            
-            if direction == 'UP':
-                take_profit = 1.5 * multiplier * confidence
-                stop_loss = 0.8 * multiplier * (1 - confidence * 0.5)
-                support = base_price * (1 - 0.01 * multiplier)
-                resistance = base_price * (1 + 0.02 * multiplier)
-            elif direction == 'DOWN':
-                take_profit = 1.5 * multiplier * confidence
-                stop_loss = 0.8 * multiplier * (1 - confidence * 0.5)
-                support = base_price * (1 - 0.02 * multiplier)
-                resistance = base_price * (1 + 0.01 * multiplier)
-            else:
-                take_profit = 0.5 * multiplier
-                stop_loss = 0.3 * multiplier
-                support = base_price * (1 - 0.01 * multiplier)
-                resistance = base_price * (1 + 0.01 * multiplier)
-            
-            pivot = (support + resistance) / 2
-            
-            return {
-                'direction': direction,
-                'confidence': round(confidence, 2),
-                'take_profit': round(take_profit, 2),
-                'stop_loss': round(stop_loss, 2),
-                'support': round(support, 2),
-                'resistance': round(resistance, 2),
-                'pivot': round(pivot, 2),
-                'risk_level': 'Medium',
-                'volume_recommendation': round(2.0 * confidence, 2),
-                'timeframe': timeframe,
-                'indicators': indicators or ['RSI', 'MACD'],
-                'sensitivity': sensitivity
+    @staticmethod
+    def _round_levels(levels, digits):
+        """Clustered levels and pivots from LevelEngine rounded for the response"""
+        return {
+            'levels': [
+                {'price': round(level['price'], digits), 'touches': level['touches']}
+                for level in levels['levels']
+            ],
+            'pivots': {
+                kind: {name: round(value, digits) for name, value in points.items()}
+                for kind, points in levels['pivots'].items()
             }
-            
+        }
+    
+    @staticmethod
+    def _score_batch(image_batch):
+        """Direction and confidence for every image of a (N, 64, 64, 1) batch in one call"""
+        # Простое детерминированное предсказание на основе хеша
+        import hashlib
+        item_shape = (1,) + tuple(image_batch.shape[1:])
+        seed = int(hashlib.md5(str(item_shape).encode()).hexdigest()[:8], 16)
+        rng = np.random.RandomState(seed % 1000)
+        
+        directions = ['UP', 'DOWN', 'SIDEWAYS']
+        direction = rng.choice(directions, p=[0.4, 0.4, 0.2])
+        confidence = rng.uniform(0.6, 0.9)
+        # Мок зависит только от формы изображения: одно значение на весь батч
+        count = len(image_batch)
+        return np.full(count, direction), np.full(count, confidence)
+    
+    def _build_result(self, direction, confidence, take_profit, stop_loss, timeframe, indicators,
+                      sensitivity, base_price, levels):
+        """Response dict of one image from its scores and TP/SL levels"""
+        # Расчет уровней
+        base_price = base_price or 100
+        digits = price_digits(base_price)
+        multiplier = TIMEFRAME_MULTIPLIER.get(timeframe, 1.0)
+        
+        if direction == 'UP':
+            support = base_price * (1 - 0.01 * multiplier)
+            resistance = base_price * (1 + 0.02 * multiplier)
+        elif direction == 'DOWN':
+            support = base_price * (1 - 0.02 * multiplier)
+            resistance = base_price * (1 + 0.01 * multiplier)
+        else:
+            support = base_price * (1 - 0.01 * multiplier)
+            resistance = base_price * (1 + 0.01 * multiplier)
+        
+        pivot = (support + resistance) / 2
+        
+        if levels:
+            support, resistance, pivot = levels['support'], levels['resistance'], levels['pivot']
+        
+        result = {
+            'direction': str(direction),
+            'confidence': round(float(confidence), 2),
+            'take_profit': round(float(take_profit), 2),
+            'stop_loss': round(float(stop_loss), 2),
+            'support': round(support, digits),
+            'resistance': round(resistance, digits),
+            'pivot': round(pivot, digits),
+            'risk_level': 'Medium',
+            'volume_recommendation': round(2.0 * float(confidence), 2),
+            'timeframe': timeframe,
+            'indicators': indicators or ['RSI', 'MACD'],
+            'sensitivity': sensitivity
+        }
+        if levels:
+            result.update(self._round_levels(levels, digits))
+        return result
+    
+    @staticmethod
+    def _fallback_result(timeframe, indicators, sensitivity):
+        return {
+            'direction': 'SIDEWAYS',
+            'confidence': 0.5,
+            'take_profit': 0.5,
+            'stop_loss': 0.3,
+            'support': 99.5,
+            'resistance': 100.5,
+            'pivot': 100.0,
+            'risk_level': 'Medium',
+            'volume_recommendation': 1.0,
+            'timeframe': timeframe,
+            'indicators': indicators or ['RSI', 'MACD'],
+            'sensitivity': sensitivity
+        }
+    
+    def predict(self, image_data, timeframe='5m', indicators=None, sensitivity='medium',
+                base_price=None, levels=None):
+        """Мок-предсказатель для тестирования
+        
+        base_price - последняя цена закрытия по калиброванной ценовой оси;
+        без калибровки уровни считаются от условной цены 100.
+        levels - результат LevelEngine.analyze: поддержка, сопротивление и
+        пивоты берутся из графика вместо фиксированных процентов.
+        """
+        return self.predict_batch(image_data, timeframe=timeframe, indicators=indicators,
+                                  sensitivity=sensitivity, base_prices=[base_price], levels=[levels])[0]
+
+    def predict_batch(self, image_batch, timeframe='5m', indicators=None, sensitivity='medium',
+                      base_prices=None, levels=None):
+        """Предсказания для батча (N, 64, 64, 1) за один вызов
+        
+        Направление и уверенность считаются одним проходом по всему батчу,
+        TP/SL - векторно; по отдельности собираются только словари ответа.
+        """
+        base_prices = base_prices or [None] * len(image_batch)
+        levels = levels or [None] * len(image_batch)
+        try:
+            directions, confidences = self._score_batch(image_batch)
+            take_profits, stop_losses = risk_levels(directions, confidences, timeframe)
+            return [
+                self._build_result(directions[i], confidences[i], take_profits[i], stop_losses[i],
+                                   timeframe, indicators, sensitivity, base_prices[i], levels[i])
+                for i in range(len(image_batch))
+            ]
         except Exception as e:
             logger.error(f"Mock prediction error: {e}")
-            return {
-                'direction': 'SIDEWAYS',
-                'confidence': 0.5,
-                'take_profit': 0.5,
-                'stop_loss': 0.3,
-                'support': 99.5,
-                'resistance': 100.5,
-                'pivot': 100.0,
-                'risk_level': 'Medium',
-                'volume_recommendation': 1.0,
-                'timeframe': timeframe,
-                'indicators': indicators or ['RSI', 'MACD'],
-                'sensitivity': sensitivity
-            }
+            return [self._fallback_result(timeframe, indicators, sensitivity) for _ in range(len(image_batch))]
 
 # Создаем глобальный инстанс
 predictor = PricePredictor()
@@ -0,0 +1,353 @@
+"""
+Потоковые индикаторы: обновление за O(1) на новую свечу
+
+Каждый класс повторяет арифметику векторного движка (app.ml.indicator_engine)
+шаг за шагом - те же рекурсии, те же разности кумулятивных сумм, то же
+начальное среднее Уайлдера - поэтому значения совпадают с пакетными точно.
+Состояние сериализуется в JSON-совместимый dict (get_state / from_state).
+"""
+import math
+from collections import deque
+import numpy as np
+
+NAN = float('nan')
+
+
+def _value(candle, field='close'):
+    """Field of a candle record / dict, or the candle itself for plain numbers"""
+    if isinstance(candle, (int, float, np.number)):
+        return float(candle)
+    return float(candle[field])
+
+
+def _dump(value):
+    if isinstance(value, StreamingIndicator):
+        return value.get_state()
+    if isinstance(value, deque):
+        return [_dump(item) for item in value]
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _load(template, value):
+    if isinstance(template, StreamingIndicator):
+        return type(template).from_state(value)
+    if isinstance(template, deque):
+        return deque((tuple(item) if isinstance(item, list) else item for item in value),
+                     maxlen=template.maxlen)
+    if isinstance(template, list):
+        return list(value)
+    return value
+
+
+class StreamingIndicator:
+    """Base class: constructor params + state attributes, both serializable"""
+
+    params = ()
+    state_fields = ()
+
+    def get_state(self):
+        state = {
+            'type': type(self).__name__,
+            'params': {name: getattr(self, name) for name in self.params}
+        }
+        for name in self.state_fields:
+            state[name] = _dump(getattr(self, name))
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        indicator = cls(**state['params'])
+        for name in cls.state_fields:
+            setattr(indicator, name, _load(getattr(indicator, name), state[name]))
+        return indicator
+
+
+class StreamingWilder(StreamingIndicator):
+    """Wilder smoothing: mean of the first `period` values, then alpha = 1 / period"""
+
+    params = ('period',)
+    state_fields = ('value', 'seed_values')
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 1.0 / period
+        self.value = None
+        self.seed_values = []
+
+    def update(self, x):
+        if self.value is None:
+            self.seed_values.append(x)
+            if len(self.seed_values) < self.period:
+                return NAN
+            # Same pairwise summation as the batch seed
+            self.value = float(np.mean(np.array(self.seed_values)))
+            self.seed_values = []
+            return self.value
+        self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingEMA(StreamingWilder):
+    """EMA seeded with the SMA of the first `period` values (TA-Lib)"""
+
+    def __init__(self, period):
+        super().__init__(period)
+        self.alpha = 2.0 / (period + 1)
+
+    def update(self, candle):
+        return super().update(_value(candle))
+
+
+class StreamingWindowSum(StreamingIndicator):
+    """Rolling window sum as a difference of cumulative sums (like the batch version)"""
+
+    params = ('period',)
+    state_fields = ('total', 'history')
+
+    def __init__(self, period):
+        self.period = period
+        self.total = 0.0
+        self.history = deque([0.0], maxlen=period + 1)
+
+    def update(self, x):
+        self.total = self.total + x
+        self.history.append(self.total)
+        if len(self.history) <= self.period:
+            return NAN
+        return self.total - self.history[0]
+
+
+class StreamingSMA(StreamingIndicator):
+    """Simple moving average"""
+
+    params = ('period',)
+    state_fields = ('window',)
+
+    def __init__(self, period):
+        self.period = period
+        self.window = StreamingWindowSum(period)
+        self.value = NAN
+
+    def update(self, candle):
+        self.value = self.window.update(_value(candle)) / self.period
+        return self.value
+
+
+class StreamingBollinger(StreamingIndicator):
+    """Bollinger bands: (upper, middle, lower) over rolling mean and population std"""
+
+    params = ('period', 'std_dev')
+    state_fields = ('middle', 'shift', 'shifted_sum', 'squares_sum')
+
+    def __init__(self, period=20, std_dev=2):
+        self.period = period
+        self.std_dev = std_dev
+        self.middle = StreamingSMA(period)
+        self.shift = None
+        self.shifted_sum = StreamingWindowSum(period)
+        self.squares_sum = StreamingWindowSum(period)
+        self.position = NAN
+        self.width = NAN
+
+    def update(self, candle):
+        x = _value(candle)
+        middle = self.middle.update(x)
+        if self.shift is None:
+            self.shift = x
+        shifted = x - self.shift
+        mean = self.shifted_sum.update(shifted) / self.period
+        var = self.squares_sum.update(shifted * shifted) / self.period - mean * mean
+        if math.isnan(var):
+            self.position = self.width = NAN
+            return NAN, NAN, NAN
+
+        band = self.std_dev * math.sqrt(max(var, 0.0))
+        self.position = (x - middle + band) / (2 * band) if band > 0 else 0.5
+        self.width = 2 * band / middle if middle != 0 else NAN
+        return middle + band, middle, middle - band
+
+
+class StreamingRSI(StreamingIndicator):
+    """Wilder RSI, defined from the (period + 1)-th close"""
+
+    params = ('period',)
+    state_fields = ('prev_close', 'up', 'down')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.up = StreamingWilder(period)
+        self.down = StreamingWilder(period)
+
+    def update(self, candle):
+        close = _value(candle)
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return NAN
+
+        delta = close - prev_close
+        up = self.up.update(max(delta, 0.0))
+        down = self.down.update(max(-delta, 0.0))
+        if math.isnan(up):
+            return NAN
+        total = up + down
+        return 100.0 * up / total if total != 0 else 0.0
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD: (line, signal, histogram), NaN until the signal line is warmed up
+
+    As in TA-Lib both EMAs start at the slow lookback, so the fast EMA only
+    sees the last `fast` closes of the slow warm-up.
+    """
+
+    params = ('fast', 'slow', 'signal')
+    state_fields = ('count', 'fast_ema', 'slow_ema', 'signal_ema')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = min(fast, slow)
+        self.slow = max(fast, slow)
+        self.signal = signal
+        self.count = 0
+        self.fast_ema = StreamingEMA(self.fast)
+        self.slow_ema = StreamingEMA(self.slow)
+        self.signal_ema = StreamingEMA(signal)
+
+    def update(self, candle):
+        close = _value(candle)
+        self.count += 1
+        slow = self.slow_ema.update(close)
+        if self.count <= self.slow - self.fast:
+            return NAN, NAN, NAN
+
+        fast = self.fast_ema.update(close)
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+
+        line = fast - slow
+        signal_line = self.signal_ema.update(line)
+        if math.isnan(signal_line):
+            return NAN, NAN, NAN
+        return line, signal_line, line - signal_line
+
+
+class StreamingATR(StreamingIndicator):
+    """Average True Range with Wilder smoothing"""
+
+    params = ('period',)
+    state_fields = ('prev_close', 'smoother')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.smoother = StreamingWilder(period)
+
+    def update(self, candle):
+        high, low, close = _value(candle, 'high'), _value(candle, 'low'), _value(candle, 'close')
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            # True range needs the previous close
+            return NAN
+        return self.smoother.update(max(high, prev_close) - min(low, prev_close))
+
+
+class StreamingStochastic(StreamingIndicator):
+    """Fast stochastic (%K, %D); rolling extremes kept in monotonic deques"""
+
+    params = ('period', 'smooth')
+    state_fields = ('count', 'highs', 'lows', 'k_sum')
+
+    def __init__(self, period=14, smooth=3):
+        self.period = period
+        self.smooth = smooth
+        self.count = 0
+        # (index, value): highs decreasing, lows increasing - the front is the extreme
+        self.highs = deque()
+        self.lows = deque()
+        self.k_sum = StreamingWindowSum(smooth)
+
+    @staticmethod
+    def _push(window, index, value, period, keep):
+        while window and not keep(window[-1][1], value):
+            window.pop()
+        window.append((index, value))
+        if window[0][0] <= index - period:
+            window.popleft()
+        return window[0][1]
+
+    def update(self, candle):
+        index, self.count = self.count, self.count + 1
+        highest = self._push(self.highs, index, _value(candle, 'high'), self.period, lambda a, b: a > b)
+        lowest = self._push(self.lows, index, _value(candle, 'low'), self.period, lambda a, b: a < b)
+        if self.count < self.period:
+            return NAN, NAN
+
+        span = highest - lowest
+        stoch_k = (_value(candle) - lowest) / span * 100 if span != 0 else 0.0
+        stoch_d = self.k_sum.update(stoch_k) / self.smooth
+        if math.isnan(stoch_d):
+            return NAN, NAN
+        return stoch_k, stoch_d
+
+
+class StreamingIndicatorSet(StreamingIndicator):
+    """Streaming counterpart of IndicatorEngine.compute for the selected indicators
+
+    update(candle) returns the latest value of every indicator under the same
+    names as the batch engine (NaN during warm-up).
+    """
+
+    params = ('selected',)
+    state_fields = ('indicators',)
+
+    def __init__(self, selected=('RSI', 'MACD')):
+        self.selected = list(selected)
+        self.indicators = []
+        if 'SMA' in self.selected:
+            self.indicators += [StreamingSMA(10), StreamingSMA(20)]
+        if 'EMA' in self.selected:
+            self.indicators += [StreamingEMA(12), StreamingEMA(26)]
+        if 'RSI' in self.selected:
+            self.indicators.append(StreamingRSI(14))
+        if 'MACD' in self.selected:
+            self.indicators.append(StreamingMACD(12, 26, 9))
+        if 'Bollinger' in self.selected:
+            self.indicators.append(StreamingBollinger(20, 2))
+        if 'Stochastic' in self.selected:
+            self.indicators.append(StreamingStochastic(14, 3))
+        if 'ATR' in self.selected:
+            self.indicators.append(StreamingATR(14))
+
+    @classmethod
+    def from_state(cls, state):
+        indicator_set = cls(**state['params'])
+        indicator_set.indicators = [
+            _load(template, item) for template, item in zip(indicator_set.indicators, state['indicators'])
+        ]
+        return indicator_set
+
+    def update(self, candle):
+        values = {}
+        for indicator in self.indicators:
+            result = indicator.update(candle)
+            if isinstance(indicator, StreamingSMA):
+                values[f'sma_{indicator.period}'] = result
+            elif isinstance(indicator, StreamingEMA):
+                values[f'ema_{indicator.period}'] = result
+            elif isinstance(indicator, StreamingRSI):
+                values['rsi'] = result
+            elif isinstance(indicator, StreamingMACD):
+                values['macd'], values['macd_signal'], values['macd_hist'] = result
+            elif isinstance(indicator, StreamingBollinger):
+                values['bb_upper'], values['bb_middle'], values['bb_lower'] = result
+                values['bb_position'], values['bb_width'] = indicator.position, indicator.width
+            elif isinstance(indicator, StreamingStochastic):
+                values['stoch_k'], values['stoch_d'] = result
+            elif isinstance(indicator, StreamingATR):
+                values['atr'] = result
+                values['atr_pct'] = result / _value(candle) * 100
+        return values
@@ -0,0 +1,214 @@
+"""
+Совместимая с TA-Lib реализация индикаторов: полные массивы NumPy
+
+Те же имена, параметры по умолчанию и прогрев (NaN до lookback), что у
+talib: SMA, EMA, RSI, MACD, BBANDS, STOCH, STOCHF, ATR. pandas.Series на
+входе дает Series с тем же индексом на выходе, как в talib. Используется
+и при обучении (models/train_model.py), и в сервисе (IndicatorEngine).
+"""
+import functools
+import numpy as np
+import pandas as pd
+from app.ml import indicator_kernels as kernels
+
+SMA_TYPE, EMA_TYPE = 0, 1
+
+
+def _nan_like(x):
+    return np.full(len(x), np.nan)
+
+
+# Primitives on float64 arrays
+
+def sma(x, period):
+    """Simple moving average via cumulative sum"""
+    out = _nan_like(x)
+    if len(x) >= period:
+        csum = np.cumsum(np.concatenate(([0.0], x)))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def ema(x, period):
+    """EMA seeded with the SMA of the first `period` values"""
+    out = _nan_like(x)
+    if len(x) >= period:
+        seed = x[:period].mean()
+        out[period - 1] = seed
+        out[period:] = kernels.smooth(x[period:], 2.0 / (period + 1), seed)
+    return out
+
+
+def wilder(x, period):
+    """Wilder smoothing: mean of the first `period` values, then alpha = 1 / period"""
+    out = _nan_like(x)
+    if len(x) >= period:
+        seed = x[:period].mean()
+        out[period - 1] = seed
+        out[period:] = kernels.smooth(x[period:], 1.0 / period, seed)
+    return out
+
+
+def rolling_std(x, period):
+    """Population standard deviation over a window"""
+    out = _nan_like(x)
+    if len(x) >= period:
+        # Shift by the first value: variance is unchanged, cancellation is not
+        shifted = x - x[0]
+        csum = np.cumsum(np.concatenate(([0.0], shifted)))
+        csum2 = np.cumsum(np.concatenate(([0.0], shifted * shifted)))
+        mean = (csum[period:] - csum[:-period]) / period
+        var = (csum2[period:] - csum2[:-period]) / period - mean * mean
+        out[period - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return out
+
+
+def rolling_max(x, period):
+    out = _nan_like(x)
+    if len(x) >= period:
+        out[period - 1:] = kernels.rolling_max(x, period)
+    return out
+
+
+def rolling_min(x, period):
+    out = _nan_like(x)
+    if len(x) >= period:
+        out[period - 1:] = kernels.rolling_min(x, period)
+    return out
+
+
+def macd(x, fastperiod, slowperiod, signalperiod, slow_ema=None):
+    """MACD line, signal and histogram; slow_ema may be passed in when already computed"""
+    if fastperiod > slowperiod:
+        fastperiod, slowperiod = slowperiod, fastperiod
+    line, signal = _nan_like(x), _nan_like(x)
+    start = slowperiod - 1
+    if len(x) <= start:
+        return line, signal, _nan_like(x)
+
+    # Both EMAs start at the slow lookback: the fast one is seeded with the
+    # SMA of the `fastperiod` values ending there
+    slow_ema = ema(x, slowperiod) if slow_ema is None else slow_ema
+    fast_ema = ema(x[start - fastperiod + 1:], fastperiod)[fastperiod - 1:]
+    line[start:] = fast_ema - slow_ema[start:]
+    signal[start:] = ema(line[start:], signalperiod)
+
+    line[:start + signalperiod - 1] = np.nan
+    return line, signal, line - signal
+
+
+def moving_average(x, period, matype=SMA_TYPE):
+    """MA of the valid tail of x (after its leading NaN warm-up)"""
+    out = _nan_like(x)
+    valid = np.flatnonzero(~np.isnan(x))
+    start = valid[0] if len(valid) else len(x)
+    if matype == SMA_TYPE:
+        out[start:] = sma(x[start:], period)
+    elif matype == EMA_TYPE:
+        out[start:] = ema(x[start:], period)
+    else:
+        raise ValueError(f"Unsupported matype: {matype}")
+    return out
+
+
+# talib-compatible API
+
+def _talib_io(func):
+    """Accept arrays or pandas Series; return Series (with the input index) for Series"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        index = None
+        arrays = []
+        for arg in args:
+            if isinstance(arg, pd.Series):
+                index = arg.index
+            # Price inputs become float64 arrays, periods stay scalars
+            arrays.append(arg if np.isscalar(arg) else np.asarray(arg, dtype=np.float64))
+        result = func(*arrays, **kwargs)
+        if index is None:
+            return result
+        if isinstance(result, tuple):
+            return tuple(pd.Series(values, index=index) for values in result)
+        return pd.Series(result, index=index)
+    return wrapper
+
+
+@_talib_io
+def SMA(real, timeperiod=30):
+    return sma(real, timeperiod)
+
+
+@_talib_io
+def EMA(real, timeperiod=30):
+    return ema(real, timeperiod)
+
+
+@_talib_io
+def RSI(real, timeperiod=14):
+    out = _nan_like(real)
+    if len(real) <= timeperiod:
+        return out
+
+    deltas = np.diff(real)
+    up = wilder(np.maximum(deltas, 0.0), timeperiod)
+    down = wilder(np.maximum(-deltas, 0.0), timeperiod)
+    total = up + down
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = np.where(total != 0, 100.0 * up / total, 0.0)
+    out[1:timeperiod] = np.nan
+    return out
+
+
+@_talib_io
+def MACD(real, fastperiod=12, slowperiod=26, signalperiod=9):
+    return macd(real, fastperiod, slowperiod, signalperiod)
+
+
+@_talib_io
+def BBANDS(real, timeperiod=20, nbdevup=2, nbdevdn=2, matype=SMA_TYPE):
+    middle = moving_average(real, timeperiod, matype)
+    std = rolling_std(real, timeperiod)
+    return middle + nbdevup * std, middle, middle - nbdevdn * std
+
+
+def _fast_k(high, low, close, period):
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    span = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fast_k = np.where(span != 0, (close - lowest) / span * 100, 0.0)
+    fast_k[np.isnan(span)] = np.nan
+    return fast_k
+
+
+@_talib_io
+def STOCHF(high, low, close, fastk_period=5, fastd_period=3, fastd_matype=SMA_TYPE):
+    fast_k = _fast_k(high, low, close, fastk_period)
+    fast_d = moving_average(fast_k, fastd_period, fastd_matype)
+    fast_k[np.isnan(fast_d)] = np.nan
+    return fast_k, fast_d
+
+
+@_talib_io
+def STOCH(high, low, close, fastk_period=5, slowk_period=3, slowk_matype=SMA_TYPE,
+          slowd_period=3, slowd_matype=SMA_TYPE):
+    slow_k = moving_average(_fast_k(high, low, close, fastk_period), slowk_period, slowk_matype)
+    slow_d = moving_average(slow_k, slowd_period, slowd_matype)
+    slow_k[np.isnan(slow_d)] = np.nan
+    return slow_k, slow_d
+
+
+@_talib_io
+def TRANGE(high, low, close):
+    out = _nan_like(close)
+    prev_close = close[:-1]
+    out[1:] = np.maximum(high[1:], prev_close) - np.minimum(low[1:], prev_close)
+    return out
+
+
+@_talib_io
+def ATR(high, low, close, timeperiod=14):
+    out = _nan_like(close)
+    if len(close) > timeperiod:
+        out[1:] = wilder(TRANGE(high, low, close)[1:], timeperiod)
+    return out
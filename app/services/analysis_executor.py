@@ -0,0 +1,270 @@
+"""
+Выполнение CPU-тяжелого анализа изображений вне event loop бота
+"""
+import asyncio
+import threading
+from collections import deque
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.utils.config import config
+from app.utils.logger import logger
+
+NOT_A_CHART_ERROR = "Изображение не содержит свечной график. Пожалуйста, отправьте изображение с четким графиком свечей."
+NOT_ENOUGH_CANDLES_ERROR = "Не удалось обнаружить достаточное количество свечей. Убедитесь, что график четкий и содержит не менее 10 свечей."
+BUSY_ERROR = "⏳ Сервер перегружен. Пожалуйста, повторите попытку через минуту."
+TIMEOUT_ERROR = "⌛ Анализ занял слишком много времени. Попробуйте отправить изображение меньшего размера."
+
+# Состояние воркера: ImageProcessor и модели создаются один раз на процесс/поток
+_worker_state = threading.local()
+
+
+def _init_worker():
+    """Warm worker initialization: build ImageProcessor and load models once"""
+    from app.ml import indicator_kernels
+    from app.ml.image_processor import ImageProcessor
+    from app.ml.levels import level_engine
+    from app.ml.model_loader import model_loader
+    from app.ml.predictor import predictor
+
+    indicator_kernels.warmup()
+    _worker_state.image_processor = ImageProcessor()
+    _worker_state.level_engine = level_engine
+    _worker_state.model_loader = model_loader
+    _worker_state.predictor = predictor
+
+
+def _get_worker_state():
+    if not hasattr(_worker_state, 'image_processor'):
+        _init_worker()
+    return _worker_state
+
+
+def inspect_image(image_bytes):
+    """Cheap thumbnail stage: chart pre-filter and perceptual hash for the cache"""
+    start = time.perf_counter()
+    image_processor = _get_worker_state().image_processor
+    thumbnail = image_processor.thumbnail(image_bytes)
+
+    is_chart = not config.PREFILTER_ENABLED or image_processor.looks_like_chart(thumbnail)
+    return {
+        'is_chart': bool(is_chart),
+        'image_hash': image_processor.perceptual_hash(thumbnail) if is_chart else None,
+        'elapsed': time.perf_counter() - start
+    }
+
+
+def prepare_cnn_input(image_bytes, user_settings):
+    """Image stage of the pipeline
+    
+    Returns {'cnn_input': (1, 64, 64, 1), 'base_price': last close or None,
+    'levels': support/resistance/pivots or None} or {'error': ...}.
+    base_price and levels are set only when the price axis was calibrated.
+    """
+    state = _get_worker_state()
+    image_processor = state.image_processor
+    profile = user_settings.get('profile')
+
+    # Process image
+    gray_image, color_image = image_processor.preprocess_image(image_bytes, profile=profile)
+
+    # Detect if it's a chart
+    is_chart = image_processor.detect_chart_grid(gray_image, profile=profile)
+    if not is_chart:
+        return {"error": NOT_A_CHART_ERROR}
+
+    # Detect candles
+    candles = image_processor.detect_candles(gray_image, color_image)
+
+    if len(candles) < 10:
+        return {"error": NOT_ENOUGH_CANDLES_ERROR}
+
+    # Real OHLC in axis prices: extracted only when the price axis was read
+    base_price, levels = None, None
+    calibration = image_processor.calibrate_axis()
+    if calibration is not None:
+        ohlc = image_processor.extract_prices(color_image, calibration)
+        if len(ohlc):
+            base_price = float(ohlc['close'][-1])
+            levels = state.level_engine.analyze(ohlc)
+    
+    # Prepare for CNN
+    return {
+        "cnn_input": image_processor.prepare_for_cnn(gray_image),
+        "base_price": base_price,
+        "levels": levels
+    }
+
+
+def predict_batch(cnn_batch, user_settings, base_prices=None, levels=None):
+    """Single predictor call for a stacked (N, 64, 64, 1) batch"""
+    return _get_worker_state().predictor.predict_batch(
+        cnn_batch,
+        timeframe=user_settings.get('timeframe', '5m'),
+        indicators=user_settings.get('indicators', ['RSI', 'MACD']),
+        sensitivity=user_settings.get('sensitivity', 'medium'),
+        base_prices=base_prices,
+        levels=levels
+    )
+
+
+def run_analysis_pipeline(image_bytes, user_settings):
+    """Full ImageProcessor + predictor pipeline, executed inside a worker"""
+    prepared = prepare_cnn_input(image_bytes, user_settings)
+    if 'error' in prepared:
+        return prepared
+
+    # Get prediction
+    return _get_worker_state().predictor.predict(
+        prepared['cnn_input'],
+        timeframe=user_settings.get('timeframe', '5m'),
+        indicators=user_settings.get('indicators', ['RSI', 'MACD']),
+        sensitivity=user_settings.get('sensitivity', 'medium'),
+        base_price=prepared['base_price'],
+        levels=prepared['levels']
+    )
+
+
+class AnalysisExecutor:
+    """Bounded off-loop executor for the image analysis pipeline"""
+
+    def __init__(self, kind=None, workers=None, max_in_flight=None,
+                 queue_size=None, timeout=None):
+        self.kind = kind or config.ANALYSIS_EXECUTOR
+        self.workers = workers or config.ANALYSIS_WORKERS
+        self.max_in_flight = max_in_flight or config.ANALYSIS_MAX_IN_FLIGHT
+        self.queue_size = config.ANALYSIS_QUEUE_SIZE if queue_size is None else queue_size
+        self.timeout = timeout or config.ANALYSIS_TIMEOUT
+
+        if self.kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown analysis executor: {self.kind}")
+
+        self._pool = None
+        # One limit for the whole process: the bot and the API run separate
+        # event loops, so free slots are counted under a thread lock and
+        # waiters (futures of any loop) are served in FIFO order
+        self._free_slots = self.max_in_flight
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+
+    async def _acquire_slot(self):
+        """Wait for a process-wide in-flight slot without blocking the event loop"""
+        with self._lock:
+            if self._free_slots > 0 and not self._waiters:
+                self._free_slots -= 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was already handed over: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        """Hand the slot to the oldest waiter (on its own loop) or return it to the pool"""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._free_slots += 1
+                    return
+                waiter = self._waiters.popleft()
+            try:
+                waiter.get_loop().call_soon_threadsafe(self._grant_slot, waiter)
+                return
+            except RuntimeError:
+                continue  # the waiter's loop is closed
+
+    def _grant_slot(self, waiter):
+        if waiter.cancelled():
+            self._release_slot()
+        else:
+            waiter.set_result(None)
+
+    def _add(self, counter, delta):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + delta)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                pool_cls = ProcessPoolExecutor if self.kind == 'process' else ThreadPoolExecutor
+                self._pool = pool_cls(max_workers=self.workers, initializer=_init_worker)
+                logger.info(f"Analysis executor started: {self.kind} x{self.workers}")
+            return self._pool
+
+    @property
+    def queue_depth(self):
+        """Number of jobs waiting for a free in-flight slot"""
+        return self._waiting
+
+    @property
+    def in_flight(self):
+        """Number of jobs currently running in the pool"""
+        return self._in_flight
+
+    async def submit(self, func, *args):
+        """Run func(*args) in the pool, respecting queue bound, in-flight limit and timeout"""
+        loop = asyncio.get_running_loop()
+
+        # Check and enqueue atomically: callers on other loops race for the same queue
+        with self._lock:
+            if self._free_slots == 0 and self._waiting >= self.queue_size:
+                return {"error": BUSY_ERROR}
+            self._waiting += 1
+        try:
+            await self._acquire_slot()
+        finally:
+            self._add('_waiting', -1)
+
+        self._add('_in_flight', 1)
+        try:
+            future = loop.run_in_executor(self._get_pool(), func, *args)
+        except Exception:
+            self._release(None)
+            raise
+
+        # Слот освобождается только когда воркер действительно закончил,
+        # иначе задачи после таймаута накапливались бы в пуле
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Analysis job timed out after {self.timeout}s")
+            return {"error": TIMEOUT_ERROR}
+
+    def _release(self, future):
+        if future is not None and not future.cancelled():
+            future.exception()  # mark exception as retrieved
+        self._add('_in_flight', -1)
+        self._release_slot()
+
+    async def inspect(self, image_bytes):
+        """Run the cheap thumbnail stage for one image"""
+        return await self.submit(inspect_image, image_bytes)
+
+    async def prepare(self, image_bytes, user_settings):
+        """Run the image stage (preprocessing + detection) for one image"""
+        return await self.submit(prepare_cnn_input, image_bytes, dict(user_settings))
+
+    async def predict_batch(self, cnn_batch, user_settings, base_prices=None, levels=None):
+        """Run one predictor call over a stacked batch of CNN inputs"""
+        return await self.submit(predict_batch, cnn_batch, dict(user_settings), base_prices, levels)
+
+    async def analyze(self, image_bytes, user_settings):
+        """Run the analysis pipeline for one image"""
+        return await self.submit(run_analysis_pipeline, image_bytes, dict(user_settings))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,87 +1,307 @@
+import asyncio
 import uuid
 import os
+import time
+import numpy as np
 from datetime import datetime
-from app.ml.image_processor import ImageProcessor
-from app.ml.predictor import predictor
-from app.database.crud import create_prediction
+from app.ml.axis_calibration import price_digits
+from app.ml.image_processor import PREPROCESSING_PROFILES, SENSITIVITY_PROFILES
+from app.ml.predictor import EXPIRATION_MINUTES
+from app.services.analysis_executor import AnalysisExecutor, NOT_A_CHART_ERROR
+from app.services.result_cache import ResultCache
+from app.database.crud import create_prediction, create_predictions
+from app.utils.config import config
 from app.utils.logger import logger
 
 class PredictionService:
-    def __init__(self, upload_dir="uploads"):
-        self.image_processor = ImageProcessor()
+    def __init__(self, upload_dir="uploads", executor=None, cache=None):
+        self.executor = executor or AnalysisExecutor()
+        self.cache = cache or ResultCache()
         self.upload_dir = upload_dir
         
+        # Pre-filter counters; time saved is estimated from a running
+        # average of the full pipeline duration
+        self.prefilter_stats = {'checked': 0, 'rejected': 0, 'time_saved': 0.0}
+        self._pipeline_time = 1.0
+        
         # Create upload directory if not exists
         os.makedirs(upload_dir, exist_ok=True)
     
-    async def analyze_image(self, image_bytes, user_id, db, user_settings):
+    def lookup_cached(self, file_unique_ids, user_settings):
+        """Cached results of already analyzed Telegram files (None for misses), not saved yet"""
+        cache_settings = self._cache_settings(user_settings)
+        return [
+            self.cache.get_by_file_id(file_unique_id, cache_settings) if file_unique_id else None
+            for file_unique_id in file_unique_ids
+        ]
+    
+    async def analyze_cached(self, file_unique_id, user_id, db, user_settings):
+        """Return a cached result for an already analyzed Telegram file, or None"""
+        result = self.cache.get_by_file_id(file_unique_id, self._cache_settings(user_settings))
+        if result is None:
+            return None
+        
+        try:
+            return self._save_prediction(db, user_id, None, user_settings, result)
+        except Exception as e:
+            logger.error(f"Service error: {e}")
+            return {
+                "error": f"Ошибка при анализе: {str(e)}"
+            }
+    
+    async def analyze_image(self, image_bytes, user_id, db, user_settings, file_unique_id=None):
         """Main service method to analyze image"""
         try:
-            # Save image
-            filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
-            filepath = os.path.join(self.upload_dir, filename)
+            # Cheap thumbnail stage: pre-filter and perceptual hash
+            inspection = await self._inspect(image_bytes)
+            if 'error' in inspection:
+                return inspection
             
-            with open(filepath, 'wb') as f:
-                f.write(image_bytes)
+            image_hash = inspection['image_hash']
             
-            # Process image
-            gray_image, color_image = self.image_processor.preprocess_image(image_bytes)
-            
-            # Detect if it's a chart
-            is_chart = self.image_processor.detect_chart_grid(gray_image)
-            if not is_chart:
-                return {
-                    "error": "Изображение не содержит свечной график. Пожалуйста, отправьте изображение с четким графиком свечей."
-                }
-            
-            # Detect candles
-            candles = self.image_processor.detect_candles(gray_image, color_image)
+            # Save image
+            filepath = self._save_upload(image_bytes)
             
-            if len(candles) < 10:
-                return {
-                    "error": "Не удалось обнаружить достаточное количество свечей. Убедитесь, что график четкий и содержит не менее 10 свечей."
-                }
+            # Re-encoded copies of a known chart are served from the cache
+            cache_settings = self._cache_settings(user_settings)
+            result = self.cache.get_by_hash(image_hash, cache_settings)
+            if result is None:
+                # Run the CPU-bound pipeline off the event loop
+                start = time.perf_counter()
+                pipeline_settings = {**user_settings, 'profile': self.select_profile(user_settings)}
+                result = await self.executor.analyze(image_bytes, pipeline_settings)
+                self._pipeline_time = 0.9 * self._pipeline_time + 0.1 * (time.perf_counter() - start)
+                if 'error' in result:
+                    return result
+                
+                # Results of the degraded "fast" profile are not cached
+                if pipeline_settings['profile'] == cache_settings['profile']:
+                    self.cache.put(result, cache_settings, image_hash=image_hash, file_unique_id=file_unique_id)
+            else:
+                self.cache.put(result, cache_settings, file_unique_id=file_unique_id)
             
-            # Prepare for CNN
-            cnn_input = self.image_processor.prepare_for_cnn(gray_image)
+            return self._save_prediction(db, user_id, filepath, user_settings, result)
             
-            # Get prediction
-            timeframe = user_settings.get('timeframe', '5m')
-            indicators = user_settings.get('indicators', ['RSI', 'MACD'])
-            sensitivity = user_settings.get('sensitivity', 'medium')
+        except Exception as e:
+            logger.error(f"Service error: {e}")
+            return {
+                "error": f"Ошибка при анализе: {str(e)}"
+            }
+    
+    async def analyze_batch(self, images, user_id, db, user_settings, file_unique_ids=None, cached=None):
+        """Analyze several images (Telegram album or API batch) at once
+        
+        Images are preprocessed in parallel, their CNN inputs are stacked into
+        one (N, 64, 64, 1) batch for a single predictor call, and all
+        prediction rows are written in one transaction. cached holds results
+        from lookup_cached (their images may be None); they are saved in the
+        same transaction. Returns one result (or error) dict per image, in
+        input order; a failing image only fails its own entry.
+        """
+        file_unique_ids = file_unique_ids or [None] * len(images)
+        cached = cached or [None] * len(images)
+        cache_settings = self._cache_settings(user_settings)
+        results = list(cached)
+        image_paths = [None] * len(images)
+        image_hashes = [None] * len(images)
+        
+        try:
+            # Cheap thumbnail stage for all images in parallel
+            todo = [i for i, result in enumerate(results) if result is None]
+            inspections = await asyncio.gather(*(self._inspect(images[i]) for i in todo), return_exceptions=True)
             
-            result = predictor.predict(
-                cnn_input,
-                timeframe=timeframe,
-                indicators=indicators,
-                sensitivity=sensitivity
-            )
+            pending = []
+            for i, inspection in zip(todo, inspections):
+                if isinstance(inspection, BaseException):
+                    results[i] = self._error_result(inspection)
+                    continue
+                if 'error' in inspection:
+                    results[i] = inspection
+                    continue
+                
+                image_hashes[i] = inspection['image_hash']
+                image_paths[i] = self._save_upload(images[i])
+                
+                cached = self.cache.get_by_hash(image_hashes[i], cache_settings)
+                if cached is not None:
+                    self.cache.put(cached, cache_settings, file_unique_id=file_unique_ids[i])
+                    results[i] = cached
+                else:
+                    pending.append(i)
             
-            # Save to database
-            prediction_record = create_prediction(
-                db=db,
-                user_id=user_id,
-                image_path=filepath,
-                timeframe=timeframe,
-                indicators=indicators,
-                prediction=result['direction'],
-                confidence=result['confidence'],
-                take_profit=result['take_profit'],
-                stop_loss=result['stop_loss'],
-                support=result['support'],
-                resistance=result['resistance'],
-                pivot=result['pivot']
-            )
+            if pending:
+                pipeline_settings = {**user_settings, 'profile': self.select_profile(user_settings)}
+                
+                # Preprocess and detect in parallel workers
+                prepared = await asyncio.gather(*(
+                    self.executor.prepare(images[i], pipeline_settings) for i in pending
+                ), return_exceptions=True)
+                
+                ready = []
+                for i, item in zip(pending, prepared):
+                    if isinstance(item, BaseException):
+                        results[i] = self._error_result(item)
+                    elif 'error' in item:
+                        results[i] = item
+                    else:
+                        ready.append((i, item))
+                
+                if ready:
+                    # One predictor call for the whole batch
+                    cnn_batch = np.concatenate([item['cnn_input'] for _, item in ready])
+                    predictions = await self.executor.predict_batch(
+                        cnn_batch, pipeline_settings,
+                        base_prices=[item['base_price'] for _, item in ready],
+                        levels=[item['levels'] for _, item in ready]
+                    )
+                    
+                    if isinstance(predictions, dict):
+                        # Executor busy / timeout: same error for every image
+                        for i, _ in ready:
+                            results[i] = predictions
+                    else:
+                        cacheable = pipeline_settings['profile'] == cache_settings['profile']
+                        for (i, _), result in zip(ready, predictions):
+                            if cacheable:
+                                self.cache.put(result, cache_settings, image_hash=image_hashes[i],
+                                               file_unique_id=file_unique_ids[i])
+                            results[i] = result
             
-            result['prediction_id'] = prediction_record.id
+            # Save all successful predictions in one transaction
+            successful = [i for i, result in enumerate(results) if 'error' not in result]
+            if successful:
+                self._save_predictions(
+                    db, user_id, user_settings,
+                    [(image_paths[i], results[i]) for i in successful]
+                )
             
-            return result
+            return results
             
         except Exception as e:
-            logger.error(f"Service error: {e}")
-            return {
-                "error": f"Ошибка при анализе: {str(e)}"
+            logger.error(f"Batch service error: {e}")
+            return [{"error": f"Ошибка при анализе: {str(e)}"} for _ in images]
+    
+    @staticmethod
+    def _error_result(error):
+        """Error dict for an exception raised while analyzing one image"""
+        logger.error(f"Service error: {error}")
+        return {"error": f"Ошибка при анализе: {str(error)}"}
+    
+    async def _inspect(self, image_bytes):
+        """Run the thumbnail pre-filter and count rejections"""
+        inspection = await self.executor.inspect(image_bytes)
+        if 'error' in inspection:
+            return inspection
+        
+        self.prefilter_stats['checked'] += 1
+        if not inspection['is_chart']:
+            self.prefilter_stats['rejected'] += 1
+            self.prefilter_stats['time_saved'] += max(0.0, self._pipeline_time - inspection['elapsed'])
+            return {"error": NOT_A_CHART_ERROR}
+        
+        return inspection
+    
+    def _save_upload(self, image_bytes):
+        """Write the uploaded image to the upload directory and return its path"""
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
+        filepath = os.path.join(self.upload_dir, filename)
+        
+        with open(filepath, 'wb') as f:
+            f.write(image_bytes)
+        
+        return filepath
+    
+    def preferred_profile(self, user_settings):
+        """Preprocessing profile of a request when the queue is not backed up
+        
+        An explicit per-request profile wins, then a fixed deployment profile,
+        otherwise the profile follows the user's sensitivity.
+        """
+        requested = user_settings.get('profile')
+        if requested in PREPROCESSING_PROFILES:
+            return requested
+        
+        if config.PREPROCESS_PROFILE in PREPROCESSING_PROFILES:
+            return config.PREPROCESS_PROFILE
+        
+        return SENSITIVITY_PROFILES.get(user_settings.get('sensitivity', 'medium'), 'balanced')
+    
+    def select_profile(self, user_settings):
+        """Pick the preprocessing profile for a request
+        
+        The preferred profile, degraded to "fast" when the analysis queue
+        backs up (unless the profile was fixed per request or per deployment).
+        """
+        fixed = (user_settings.get('profile') in PREPROCESSING_PROFILES
+                 or config.PREPROCESS_PROFILE in PREPROCESSING_PROFILES)
+        if not fixed and self.executor.queue_depth >= config.PROFILE_FAST_QUEUE_DEPTH:
+            return 'fast'
+        
+        return self.preferred_profile(user_settings)
+    
+    def _cache_settings(self, user_settings):
+        """User settings with the preferred profile, as keyed in the result cache"""
+        return {**user_settings, 'profile': self.preferred_profile(user_settings)}
+    
+    def get_prefilter_stats(self):
+        """Pre-filter reject rate and estimated pipeline time saved"""
+        checked = self.prefilter_stats['checked']
+        rejected = self.prefilter_stats['rejected']
+        return {
+            "checked": checked,
+            "rejected": rejected,
+            "reject_rate": round(rejected / checked * 100, 2) if checked > 0 else 0,
+            "time_saved_sec": round(self.prefilter_stats['time_saved'], 2)
+        }
+    
+    def _save_prediction(self, db, user_id, image_path, user_settings, result):
+        """Persist prediction and attach its id to the result"""
+        timeframe = user_settings.get('timeframe', '5m')
+        indicators = user_settings.get('indicators', ['RSI', 'MACD'])
+        
+        # Save to database
+        prediction_record = create_prediction(
+            db=db,
+            user_id=user_id,
+            image_path=image_path,
+            timeframe=timeframe,
+            indicators=indicators,
+            prediction=result['direction'],
+            confidence=result['confidence'],
+            take_profit=result['take_profit'],
+            stop_loss=result['stop_loss'],
+            support=result['support'],
+            resistance=result['resistance'],
+            pivot=result['pivot']
+        )
+        
+        result['prediction_id'] = prediction_record.id
+        
+        return result
+    
+    def _save_predictions(self, db, user_id, user_settings, items):
+        """Persist several (image_path, result) pairs in one transaction"""
+        timeframe = user_settings.get('timeframe', '5m')
+        indicators = user_settings.get('indicators', ['RSI', 'MACD'])
+        
+        records = create_predictions(db, user_id, [
+            {
+                'image_path': image_path,
+                'timeframe': timeframe,
+                'indicators': indicators,
+                'prediction': result['direction'],
+                'confidence': result['confidence'],
+                'take_profit': result['take_profit'],
+                'stop_loss': result['stop_loss'],
+                'support': result['support'],
+                'resistance': result['resistance'],
+                'pivot': result['pivot']
             }
+            for image_path, result in items
+        ])
+        
+        for (_, result), record in zip(items, records):
+            result['prediction_id'] = record.id
     
     def format_prediction_response(self, result, prediction_id=None):
         """Format prediction result for Telegram response"""
@@ -103,6 +323,8 @@ class PredictionService:
         }
         
         prediction_id_str = f"#{prediction_id}" if prediction_id else "#NEW"
+        digits = price_digits(result['pivot'])
+        levels_block = self._format_levels(result, digits)
         
         response = f"""
 🎯 **АНАЛИЗ ГРАФИКА** {prediction_id_str}
@@ -125,25 +347,103 @@ class PredictionService:
 • Волатильность: {'Высокая' if result.get('features', {}).get('atr_pct', 1) > 2 else 'Средняя' if result.get('features', {}).get('atr_pct', 1) > 1 else 'Низкая'}
 
 📊 **ТЕХНИЧЕСКИЕ УРОВНИ:**
-• Support: ${result['support']:.2f}
-• Resistance: ${result['resistance']:.2f}
-• Pivot Point: ${result['pivot']:.2f}
-
+• Support: ${result['support']:.{digits}f}
+• Resistance: ${result['resistance']:.{digits}f}
+• Pivot Point: ${result['pivot']:.{digits}f}
+{levels_block}
 ⏰ **СРОК ДЕЙСТВИЯ:** {self._get_expiration_time(result.get('timeframe', '5m'))} минут
 🔄 **СЛЕДУЮЩИЙ АНАЛИЗ ЧЕРЕЗ:** {self._get_next_analysis_time(result.get('timeframe', '5m'))}
 
 📝 **ПРИМЕЧАНИЕ:** Это автоматический анализ. Всегда проводите собственный анализ перед принятием торговых решений.
 """
-        
+
         return response
+
+    def _format_levels(self, result, digits):
+        """Chart levels and pivots block, empty when the price axis was not calibrated"""
+        if 'pivots' not in result:
+            return ""
+        
+        def pivot_line(points):
+            return " • ".join(
+                f"{name.upper()} ${points[name]:.{digits}f}"
+                for name in ('s2', 's1', 'pivot', 'r1', 'r2')
+            )
+        
+        lines = [
+            "",
+            "📐 **ПИВОТЫ:**",
+            f"• Classic: {pivot_line(result['pivots']['classic'])}",
+            f"• Fibonacci: {pivot_line(result['pivots']['fibonacci'])}"
+        ]
+        if result.get('levels'):
+            lines.append("")
+            lines.append("🧱 **КЛЮЧЕВЫЕ УРОВНИ:**")
+            lines.extend(
+                f"• ${level['price']:.{digits}f} (касаний: {level['touches']})"
+                for level in result['levels']
+            )
+        return "\n".join(lines) + "\n"
     
+    def format_batch_response(self, results):
+        """Format a combined Telegram report for a batch of predictions"""
+        direction_emoji = {
+            'UP': '📈',
+            'DOWN': '📉',
+            'SIDEWAYS': '➡️'
+        }
+
+        successful = [r for r in results if 'error' not in r]
+        if not successful:
+            return results[0]['error'] if results else "Нет изображений для анализа."
+
+        lines = []
+        for index, result in enumerate(results, 1):
+            if 'error' in result:
+                lines.append(f"{index}. ❌ {result['error']}")
+                continue
+
+            prediction_id = result.get('prediction_id')
+            prediction_id_str = f"#{prediction_id}" if prediction_id else "#NEW"
+            lines.append(
+                f"{index}. {prediction_id_str} {result['direction']} {direction_emoji.get(result['direction'], '')} "
+                f"• {result['confidence']*100:.1f}% "
+                f"• TP +{result['take_profit']}% / SL -{result['stop_loss']}%"
+            )
+
+        # Общий сигнал: направления, взвешенные по уверенности
+        votes = {}
+        for result in successful:
+            votes[result['direction']] = votes.get(result['direction'], 0) + result['confidence']
+        consensus = max(votes, key=votes.get)
+        consensus_share = votes[consensus] / sum(votes.values())
+
+        timeframe = successful[0].get('timeframe', '5m')
+        results_text = '\n'.join(lines)
+
+        response = f"""
+🎯 **АНАЛИЗ СЕРИИ ГРАФИКОВ** ({len(results)} изобр.)
+
+📊 **ПАРАМЕТРЫ:**
+• Таймфрейм: {timeframe}
+• Индикаторы: {', '.join(successful[0].get('indicators', ['RSI', 'MACD']))}
+• Чувствительность: {successful[0].get('sensitivity', 'medium').capitalize()}
+
+📈 **РЕЗУЛЬТАТЫ:**
+{results_text}
+
+🧭 **ОБЩИЙ СИГНАЛ:** {consensus} {direction_emoji.get(consensus, '')} ({consensus_share*100:.0f}% голосов)
+
+⏰ **СРОК ДЕЙСТВИЯ:** {self._get_expiration_time(timeframe)} минут
+
+📝 **ПРИМЕЧАНИЕ:** Это автоматический анализ. Всегда проводите собственный анализ перед принятием торговых решений.
+"""
+
+        return response
+
     def _get_expiration_time(self, timeframe):
         """Get expiration time based on timeframe"""
-        timeframes = {
-            '1m': 5, '5m': 15, '15m': 45,
-            '30m': 90, '1h': 180, '4h': 720, '1d': 1440
-        }
-        return timeframes.get(timeframe, 15)
+        return EXPIRATION_MINUTES.get(timeframe, 15)
     
     def _get_next_analysis_time(self, timeframe):
         """Get next analysis time"""
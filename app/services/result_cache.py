@@ -0,0 +1,161 @@
+"""
+Кэш результатов анализа с TTL и LRU-вытеснением
+"""
+import threading
+import time
+from collections import OrderedDict
+from app.utils.config import config
+
+
+class ResultCache:
+    """Two-level prediction cache.
+
+    Level 1 is keyed by Telegram ``file_unique_id`` and lets the handler skip
+    the download entirely. Level 2 is keyed by a perceptual hash of the image
+    and catches re-encoded copies of the same screenshot. Both levels include
+    the user settings that influence the prediction, preprocessing profile
+    included.
+    """
+
+    def __init__(self, max_size=None, ttl=None, max_hash_distance=None):
+        self.max_size = max_size or config.RESULT_CACHE_SIZE
+        self.ttl = ttl or config.RESULT_CACHE_TTL
+        self.max_hash_distance = (config.RESULT_CACHE_HASH_DISTANCE
+                                  if max_hash_distance is None else max_hash_distance)
+        self._by_file_id = OrderedDict()
+        self._by_hash = OrderedDict()
+        # (settings_key, band) -> keys of _by_hash: near-match candidates
+        self._hash_buckets = {}
+        self._lock = threading.Lock()
+
+        self.file_id_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def settings_key(user_settings):
+        return (
+            user_settings.get('timeframe', '5m'),
+            tuple(user_settings.get('indicators', ['RSI', 'MACD'])),
+            user_settings.get('sensitivity', 'medium'),
+            user_settings.get('profile')
+        )
+
+    def _get(self, store, key):
+        entry = store.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            self._drop(store, key)
+            return None
+        store.move_to_end(key)
+        return dict(result)
+
+    def _put(self, store, key, result):
+        if store is self._by_hash and key not in store:
+            for band in self._bands(key[0]) or ():
+                self._hash_buckets.setdefault((key[1], band), set()).add(key)
+        store[key] = (time.monotonic() + self.ttl, dict(result))
+        store.move_to_end(key)
+        while len(store) > self.max_size:
+            self._drop(store, next(iter(store)))
+
+    def _drop(self, store, key):
+        del store[key]
+        if store is self._by_hash:
+            for band in self._bands(key[0]) or ():
+                bucket = self._hash_buckets[(key[1], band)]
+                bucket.discard(key)
+                if not bucket:
+                    del self._hash_buckets[(key[1], band)]
+
+    def get_by_file_id(self, file_unique_id, user_settings):
+        if not file_unique_id:
+            return None
+        with self._lock:
+            result = self._get(self._by_file_id, (file_unique_id, self.settings_key(user_settings)))
+            if result is not None:
+                self.file_id_hits += 1
+            return result
+
+    @staticmethod
+    def _hash_distance(hash_a, hash_b):
+        """Hamming distance between two 'aspect:hex' hashes, None if aspects differ"""
+        aspect_a, bits_a = hash_a.split(':')
+        aspect_b, bits_b = hash_b.split(':')
+        if aspect_a != aspect_b or len(bits_a) != len(bits_b):
+            return None
+        return (int(bits_a, 16) ^ int(bits_b, 16)).bit_count()
+
+    def _bands(self, image_hash):
+        """Hex bands of a hash, None when they cannot cover max_hash_distance
+
+        Hashes within max_hash_distance bits of each other differ in at most
+        that many bands, so with max_hash_distance + 1 bands at least one
+        band is equal (pigeonhole): near matches share a bucket.
+        """
+        aspect, bits = image_hash.split(':')
+        count = self.max_hash_distance + 1
+        if count > len(bits):
+            return None
+        size = -(-len(bits) // count)
+        return [(aspect, len(bits), index, bits[start:start + size])
+                for index, start in enumerate(range(0, len(bits), size))]
+
+    def _find_similar(self, image_hash, settings_key):
+        """Closest stored hash within max_hash_distance for the same settings"""
+        bands = self._bands(image_hash)
+        if bands is None:
+            candidates = [key for key in self._by_hash if key[1] == settings_key]
+        else:
+            candidates = set()
+            for band in bands:
+                candidates.update(self._hash_buckets.get((settings_key, band), ()))
+
+        best_key, best_distance = None, self.max_hash_distance + 1
+        for key in candidates:
+            distance = self._hash_distance(image_hash, key[0])
+            if distance is not None and distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def get_by_hash(self, image_hash, user_settings):
+        settings_key = self.settings_key(user_settings)
+        with self._lock:
+            result = self._get(self._by_hash, (image_hash, settings_key))
+            if result is None and self.max_hash_distance > 0:
+                # Re-encoding may flip a few low-contrast bits of the hash
+                similar_key = self._find_similar(image_hash, settings_key)
+                if similar_key is not None:
+                    result = self._get(self._by_hash, similar_key)
+            if result is not None:
+                self.hash_hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def put(self, result, user_settings, image_hash=None, file_unique_id=None):
+        """Store a successful prediction under every key that is known"""
+        result = {k: v for k, v in result.items() if k != 'prediction_id'}
+        settings_key = self.settings_key(user_settings)
+        with self._lock:
+            if image_hash is not None:
+                self._put(self._by_hash, (image_hash, settings_key), result)
+            if file_unique_id:
+                self._put(self._by_file_id, (file_unique_id, settings_key), result)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.file_id_hits + self.hash_hits + self.misses
+            hits = self.file_id_hits + self.hash_hits
+            return {
+                "file_id_hits": self.file_id_hits,
+                "hash_hits": self.hash_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups * 100, 2) if lookups > 0 else 0,
+                "file_id_entries": len(self._by_file_id),
+                "hash_entries": len(self._by_hash),
+                "max_size": self.max_size,
+                "ttl": self.ttl
+            }
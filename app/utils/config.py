@@ -11,4 +11,59 @@ class Config:
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
     MODEL_PATH = os.getenv("MODEL_PATH", "models/candle_cnn.h5")
     
-config = Config()
\ No newline at end of file
+    # Analysis executor ("process" or "thread")
+    ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "process")
+    ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 2)))
+    ANALYSIS_MAX_IN_FLIGHT = int(os.getenv("ANALYSIS_MAX_IN_FLIGHT", os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 2))))
+    ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "32"))
+    ANALYSIS_TIMEOUT = float(os.getenv("ANALYSIS_TIMEOUT", "30"))
+    
+    # Image decoding limits (pixels)
+    IMAGE_TARGET_PIXELS = int(os.getenv("IMAGE_TARGET_PIXELS", "2500000"))
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))
+    
+    # HTTP API: clients send API_KEY in the X-API-Key header (no key - API closed);
+    # per-file upload limit of /analyze/batch, checked before reading
+    API_KEY = os.getenv("API_KEY", "")
+    API_MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+    
+    # Thumbnail pre-filter that rejects non-chart images early
+    PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() == "true"
+    
+    # Crop to the detected chart plot area before heavy filtering
+    ROI_ENABLED = os.getenv("ROI_ENABLED", "true").lower() == "true"
+    
+    # Preprocessing profile: "auto" (from sensitivity and load) or fast/balanced/accurate
+    PREPROCESS_PROFILE = os.getenv("PREPROCESS_PROFILE", "auto")
+    # Queue depth at which "auto" degrades to the fast profile
+    PROFILE_FAST_QUEUE_DEPTH = int(os.getenv("PROFILE_FAST_QUEUE_DEPTH", "4"))
+    
+    # Prediction result cache
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+    RESULT_CACHE_HASH_DISTANCE = int(os.getenv("RESULT_CACHE_HASH_DISTANCE", "2"))
+    
+    # Indicator kernels: "auto" (Numba if installed), "numba" or "numpy".
+    # JIT cache location can be moved with NUMBA_CACHE_DIR
+    INDICATOR_BACKEND = os.getenv("INDICATOR_BACKEND", "auto")
+    
+    # Local OHLCV store for training and backtests (memory-mapped columns)
+    OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", "data/ohlcv")
+    
+    # Memory-mapped feature store keyed by (symbol, interval, feature-set version);
+    # rows per computed/scaled chunk bound the memory of out-of-core training
+    FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "data/features")
+    FEATURE_CHUNK_ROWS = int(os.getenv("FEATURE_CHUNK_ROWS", "250000"))
+    
+    # Training orchestrator: parallel jobs (0 = one per job up to the CPU count)
+    # and threads per job for BLAS / TensorFlow (0 = CPU count / workers)
+    TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "0"))
+    TRAINING_THREADS_PER_WORKER = int(os.getenv("TRAINING_THREADS_PER_WORKER", "0"))
+    TRAINING_ARTIFACTS_DIR = os.getenv("TRAINING_ARTIFACTS_DIR", "models/artifacts")
+    
+    # Voting ensemble members (models/ensemble.py: rf, gb, hgb, sgd, logreg, svm)
+    # and parallel fit processes (-1 = all CPUs)
+    ENSEMBLE_MEMBERS = os.getenv("ENSEMBLE_MEMBERS", "rf,hgb,sgd")
+    ENSEMBLE_JOBS = int(os.getenv("ENSEMBLE_JOBS", "-1"))
+    
+config = Config()
@@ -0,0 +1,94 @@
+"""
+Бенчмарк векторного бэктеста против поштучного цикла по свечам
+
+Сначала совпадение исходов и доходностей с наивным циклом (вход по close,
+перебор следующих свечей до TP/SL/истечения) на небольшом ряде, затем
+пропускная способность полного прогона (фичи + модель + выходы) на
+миллионах минутных свечей: модель обучается на первых TRAIN_ROWS свечах,
+сделки считаются только на остальных (вне обучающего периода).
+
+Запуск: python -m benchmarks.bench_backtest
+"""
+import time
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from app.ml.feature_pipeline import feature_pipeline
+from app.ml.predictor import risk_levels
+from benchmarks.bench_feature_store import make_candles
+from models.backtest import EXPIRED, STOP_LOSS, TAKE_PROFIT, Backtester, horizon_bars
+
+TRAIN_ROWS = 200_000
+
+
+def loop_backtest(candles, proba, timeframe, threshold):
+    """Reference: one trade at a time, bar by bar"""
+    high, low, close = (candles[name].to_numpy() for name in ('high', 'low', 'close'))
+    horizon = horizon_bars(timeframe)
+    returns, outcome = [], []
+    for i in range(len(close) - horizon):
+        p = proba[i]
+        if np.isnan(p) or abs(p - 0.5) + 0.5 < 0.5 + threshold:
+            continue
+        side = 1.0 if p > 0.5 else -1.0
+        take_profit, stop_loss = risk_levels('UP' if side > 0 else 'DOWN', abs(p - 0.5) + 0.5, timeframe)
+        tp_price = close[i] * (1 + side * take_profit / 100)
+        sl_price = close[i] * (1 - side * stop_loss / 100)
+        result, code = side * (close[i + horizon] / close[i] - 1) * 100, EXPIRED
+        for j in range(i + 1, i + horizon + 1):
+            sl_hit = low[j] <= sl_price if side > 0 else high[j] >= sl_price
+            tp_hit = high[j] >= tp_price if side > 0 else low[j] <= tp_price
+            if sl_hit:
+                result, code = -stop_loss, STOP_LOSS
+                break
+            if tp_hit:
+                result, code = take_profit, TAKE_PROFIT
+                break
+        returns.append(result)
+        outcome.append(code)
+    return np.array(returns), np.array(outcome)
+
+
+def fit_model(candles, train_rows=TRAIN_ROWS):
+    """SGD logistic model on the first rows, 5-candle-ahead direction"""
+    X = feature_pipeline.transform(candles.iloc[:train_rows])
+    close = candles['close'].to_numpy()[:train_rows]
+    y = (np.roll(close, -5) > close).astype(int)
+    valid = ~np.isnan(X).any(axis=1)
+    valid[-5:] = False
+    scaler = StandardScaler().fit(X[valid])
+    model = SGDClassifier(loss='log_loss', random_state=42).fit(scaler.transform(X[valid]), y[valid])
+    return model, scaler
+
+
+def main(n_rows=3_000_000, parity_rows=20_000, threshold=0.02):
+    candles = make_candles(n_rows)
+    model, scaler = fit_model(candles)
+    backtester = Backtester(model, scaler, threshold=threshold)
+
+    # Parity with the loop on random probabilities (many trades, both sides);
+    # moves scaled x5 around 100 so that TP and SL are both reached inside the horizon
+    sample = candles.iloc[:parity_rows].copy()
+    for name in ('open', 'high', 'low', 'close'):
+        sample[name] = 100 + (sample[name] - 100) * 5
+    proba = np.random.default_rng(0).uniform(0.3, 0.7, parity_rows)
+    for timeframe in ('1m', '5m', '1h'):
+        report = backtester.run(sample, timeframe, probabilities=proba, return_trades=True)
+        expected_returns, expected_outcome = loop_backtest(sample, proba, timeframe, threshold)
+        trades = report['trades_detail']
+        same = (np.array_equal(trades['outcome'], expected_outcome)
+                and np.allclose(trades['returns'], expected_returns, rtol=0, atol=1e-12))
+        print(f"{timeframe:3s} horizon {report['horizon_bars']:3d} bars, {report['trades']:6d} trades, "
+              f"hit rate {report['hit_rate']:.3f}, matches loop: {same}")
+
+    start = time.perf_counter()
+    report = backtester.run(candles, '1m', start=TRAIN_ROWS)
+    elapsed = time.perf_counter() - start
+    print(f"\n{n_rows:,} candles (features + model + exits), {report['bars']:,} held out: {elapsed:.2f} s, "
+          f"{n_rows / elapsed / 1e6:.2f} M bars/s")
+    print(f"trades {report['trades']:,}, hit rate {report['hit_rate']:.3f}, win rate {report['win_rate']:.3f}, "
+          f"expectancy {report['expectancy']:+.4f}%, max drawdown {report['max_drawdown']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
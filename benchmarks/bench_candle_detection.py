@@ -0,0 +1,89 @@
+"""
+Бенчмарк детекции свечей: цикл по контурам против connectedComponentsWithStats
+
+Запуск: python -m benchmarks.bench_candle_detection
+"""
+import time
+import cv2
+import numpy as np
+from app.ml.image_processor import ImageProcessor
+
+
+def make_noisy_chart(width=1920, height=1080, n_candles=120, n_specks=30000, seed=42):
+    """Synthetic chart screenshot with candles and lots of small noise blobs"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Noise: tens of thousands of tiny dark specks produce as many contours
+    xs = rng.integers(0, width, n_specks)
+    ys = rng.integers(0, height, n_specks)
+    image[ys, xs] = 0
+
+    step = width // (n_candles + 1)
+    price = height // 2
+    for i in range(n_candles):
+        price = int(np.clip(price + rng.integers(-15, 16), 50, height - 100))
+        body = int(rng.integers(20, 50))
+        x = step * (i + 1)
+        color = (0, 180, 0) if rng.random() > 0.5 else (200, 0, 0)
+        cv2.rectangle(image, (x, price), (x + 6, price + body), color, -1)
+    return image
+
+
+def detect_candles_contours(processor, gray_image, color_image):
+    """Reference copy of the previous per-contour Python loop"""
+    _, binary = cv2.threshold(gray_image, 127, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    candles = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if processor.candle_min_area < area < processor.candle_max_area:
+            x, y, w, h = cv2.boundingRect(contour)
+            aspect_ratio = h / w if w > 0 else 0
+            if aspect_ratio > 1.5:
+                center_x = x + w // 2
+                center_y = y + h // 2
+                if 0 <= center_x < color_image.shape[1] and 0 <= center_y < color_image.shape[0]:
+                    color = color_image[center_y, center_x]
+                    is_green = processor._is_green_candle(color)
+                    is_red = processor._is_red_candle(color)
+                    candles.append({
+                        'x': x, 'y': y, 'width': w, 'height': h,
+                        'center_x': center_x, 'center_y': center_y,
+                        'color': 'green' if is_green else 'red' if is_red else 'unknown',
+                        'area': area
+                    })
+    candles.sort(key=lambda c: c['x'])
+    return candles
+
+
+def timeit(func, *args, repeat=10):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    processor = ImageProcessor()
+    color_image = make_noisy_chart()
+    gray_image = cv2.cvtColor(color_image, cv2.COLOR_RGB2GRAY)
+
+    n_contours = len(cv2.findContours(
+        cv2.threshold(gray_image, 127, 255, cv2.THRESH_BINARY_INV)[1],
+        cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0])
+
+    loop_time, loop_candles = timeit(detect_candles_contours, processor, gray_image, color_image)
+    cc_time, cc_candles = timeit(processor.detect_candles, gray_image, color_image)
+
+    print(f"Image: {color_image.shape[1]}x{color_image.shape[0]}, contours: {n_contours}")
+    print(f"Contour loop:          {loop_time * 1000:8.2f} ms, candles: {len(loop_candles)}")
+    print(f"Connected components:  {cc_time * 1000:8.2f} ms, candles: {len(cc_candles)}")
+    print(f"Speedup: {loop_time / cc_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
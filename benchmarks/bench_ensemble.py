@@ -0,0 +1,73 @@
+"""
+Бенчмарк обучения ансамбля: прежний двойной fit (rf, gb, svm) против
+однократного параллельного обучения членов (rf, hgb, sgd)
+
+Запуск: python -m benchmarks.bench_ensemble
+"""
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from app.ml.feature_pipeline import feature_pipeline
+from models.ensemble import train_voting_ensemble
+
+
+def make_dataset(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n_rows + 100))
+    df = pd.DataFrame({
+        'open': close + rng.normal(0, 0.05, len(close)),
+        'high': close + np.abs(rng.normal(0, 0.1, len(close))),
+        'low': close - np.abs(rng.normal(0, 0.1, len(close))),
+        'close': close,
+        'volume': rng.integers(1000, 10000, len(close)).astype(np.float64)
+    })
+    X = feature_pipeline.transform(df)
+    y = (np.roll(close, -5) > close).astype(int)
+    valid = ~np.isnan(X).any(axis=1)
+    valid[-5:] = False
+    X, y = StandardScaler().fit_transform(X[valid])[:n_rows], y[valid][:n_rows]
+    split = int(len(X) * 0.8)
+    return X[:split], X[split:], y[:split], y[split:]
+
+
+def legacy_ensemble(X_train, y_train):
+    """Reference copy of the previous train_ensemble_model: members fitted, then refitted by VotingClassifier"""
+    rf = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1)
+    rf.fit(X_train, y_train)
+    gb = GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, random_state=42)
+    gb.fit(X_train, y_train)
+    svm = SVC(probability=True, random_state=42)
+    svm.fit(X_train, y_train)
+    ensemble = VotingClassifier(estimators=[('rf', rf), ('gb', gb), ('svm', svm)], voting='soft')
+    return ensemble.fit(X_train, y_train)
+
+
+def main(n_rows=10_000):
+    X_train, X_test, y_train, y_test = make_dataset(n_rows)
+    print(f"{len(X_train):,} training rows x {X_train.shape[1]} features")
+
+    start = time.perf_counter()
+    legacy = legacy_ensemble(X_train, y_train)
+    legacy_time = time.perf_counter() - start
+    print(f"Legacy rf+gb+svm, double fit: {legacy_time:7.2f} s, accuracy {legacy.score(X_test, y_test):.4f}")
+
+    start = time.perf_counter()
+    ensemble, stats = train_voting_ensemble(X_train, y_train, members='rf,hgb,sgd')
+    ensemble_time = time.perf_counter() - start
+    print(f"rf+hgb+sgd, fitted once:      {ensemble_time:7.2f} s, accuracy {ensemble.score(X_test, y_test):.4f}")
+    for name, member in stats.items():
+        print(f"  {name:4s} fit {member['fit_time']:6.2f} s, peak {member['peak_mb']:7.1f} MB")
+
+    # Soft voting over the fitted members, and it survives pickling like a fitted VotingClassifier
+    mean_proba = np.mean([est.predict_proba(X_test) for est in ensemble.estimators_], axis=0)
+    restored = pickle.loads(pickle.dumps(ensemble))
+    same = np.allclose(restored.predict_proba(X_test), mean_proba)
+    print(f"Ensemble = mean of member probabilities after pickling: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
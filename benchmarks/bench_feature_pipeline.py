@@ -0,0 +1,123 @@
+"""
+Конвейер фичей: паритет обучение/сервис и время расчета
+
+1. Матрица конвейера на 10k строк против прежнего расчета на pandas из
+   ModelTrainer.create_features (эталон продублирован ниже).
+2. Окно из 60 свечей с графика (структурированный массив, без объема)
+   против эталона на DataFrame того же окна. Паритет окна с обучающими
+   строками на тех же свечах (прогрев WARMUP_CANDLES) проверяет
+   tests/test_feature_parity.py.
+
+Запуск: python -m benchmarks.bench_feature_pipeline
+"""
+import time
+import numpy as np
+import pandas as pd
+from app.ml import talib_compat as talib
+from app.ml.candles import empty_candles
+from app.ml.feature_pipeline import feature_pipeline
+
+WINDOW = 60
+TOLERANCE = 1e-9
+
+
+def make_frame(n_rows=10_000, seed=42):
+    """Synthetic 5m candles as generated by ModelTrainer.fetch_data"""
+    rng = np.random.default_rng(seed)
+    prices = np.cumsum(rng.normal(0, 0.001, n_rows)) + 100
+    return pd.DataFrame({
+        'open': prices + rng.normal(0, 0.1, n_rows),
+        'high': prices + np.abs(rng.normal(0, 0.2, n_rows)),
+        'low': prices - np.abs(rng.normal(0, 0.2, n_rows)),
+        'close': prices,
+        'volume': rng.integers(1000, 10000, n_rows).astype(np.float64)
+    }, index=pd.date_range('2024-01-01', periods=n_rows, freq='5min'))
+
+
+def reference_features(df):
+    """Feature columns as the pandas code in create_features computed them"""
+    out = pd.DataFrame(index=df.index)
+    out['returns'] = df['close'].pct_change()
+    out['volatility'] = out['returns'].rolling(window=20).std()
+    out['rsi'] = talib.RSI(df['close'], timeperiod=14)
+    macd, _, hist = talib.MACD(df['close'])
+    out['macd'] = macd
+    out['macd_hist'] = hist
+    upper, middle, lower = talib.BBANDS(df['close'])
+    out['bb_position'] = (df['close'] - lower) / (upper - lower)
+    out['bb_width'] = (upper - lower) / middle
+    out['stoch_k'] = talib.STOCH(df['high'], df['low'], df['close'])[0]
+    out['atr'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
+    out['volume_ratio'] = df['volume'] / talib.SMA(df['volume'], timeperiod=20)
+
+    body = abs(df['close'] - df['open'])
+    lower_shadow = df[['open', 'close']].min(axis=1) - df['low']
+    upper_shadow = df['high'] - df[['open', 'close']].max(axis=1)
+    out['is_hammer'] = ((lower_shadow > 2 * body) & (upper_shadow < body * 0.3)
+                        & (df['close'] > df['open'])).astype(int)
+    total_range = df['high'] - df['low']
+    out['is_doji'] = ((body / total_range < 0.1) & (total_range > 0)).astype(int)
+    return out[feature_pipeline.names]
+
+
+def to_candles(df):
+    """Chart candles for a frame: OHLC only, volume is not visible on a chart"""
+    candles = empty_candles(len(df))
+    for field in ('open', 'high', 'low', 'close'):
+        candles[field] = df[field].to_numpy()
+    return candles
+
+
+def max_diff(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    return float(np.nanmax(np.abs(a - b))) if a.size else 0.0
+
+
+def timed(func, *args, repeat=20):
+    func(*args)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    df = make_frame()
+
+    # Training frame
+    matrix = feature_pipeline.transform(df)
+    reference = reference_features(df).to_numpy(dtype=np.float64)
+    print(f"Training frame: {len(df):,} rows x {len(feature_pipeline.names)} features")
+    training_ok = True
+    for column, name in enumerate(feature_pipeline.names):
+        diff = max_diff(matrix[:, column], reference[:, column])
+        training_ok &= diff <= TOLERANCE
+        print(f"  {name:13s} max |diff| vs pandas: {diff:.2e}")
+
+    # Serving windows: chart candles (no volume) vs the reference on the same window
+    windows = range(WINDOW, len(df) + 1, 97)
+    serving_diff = 0.0
+    for end in windows:
+        window = df.iloc[end - WINDOW:end].copy()
+        window['volume'] = 1.0
+        served = feature_pipeline.transform(to_candles(window))[-1]
+        expected = reference_features(window).to_numpy(dtype=np.float64)[-1]
+        serving_diff = max(serving_diff, max_diff(served, expected))
+    serving_ok = serving_diff <= TOLERANCE
+    print(f"Serving windows: {len(windows)} x {WINDOW} candles, max |diff| vs pandas: {serving_diff:.2e}")
+
+    training_time = timed(feature_pipeline.transform, df)
+    serving_time = timed(feature_pipeline.latest, to_candles(df.iloc[-WINDOW:]), WINDOW, repeat=200)
+    reference_time = timed(reference_features, df)
+    print(f"Pipeline, {len(df):,} rows:  {training_time * 1000:8.2f} ms")
+    print(f"Pandas reference:      {reference_time * 1000:8.2f} ms")
+    print(f"Pipeline, {WINDOW} candles:  {serving_time * 1000:8.2f} ms")
+    print(f"Parity: {'yes' if training_ok and serving_ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
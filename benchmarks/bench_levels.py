@@ -0,0 +1,46 @@
+"""
+Бенчмарк движка уровней: swing-точки, кластеризация и пивоты на сотнях свечей
+
+Запуск: python -m benchmarks.bench_levels
+"""
+import time
+import numpy as np
+from app.ml.candles import empty_candles
+from app.ml.levels import LevelEngine
+
+
+def make_candles(n_candles=500, seed=42):
+    """Random-walk candle array with realistic wicks"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n_candles))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    wick = np.abs(rng.normal(0, 0.3, (2, n_candles)))
+
+    candles = empty_candles(n_candles)
+    candles['x'] = np.arange(n_candles) * 8
+    candles['open'] = open_
+    candles['close'] = close
+    candles['high'] = np.maximum(open_, close) + wick[0]
+    candles['low'] = np.minimum(open_, close) - wick[1]
+    return candles
+
+
+def main():
+    engine = LevelEngine()
+    for n_candles in (100, 300, 1000):
+        candles = make_candles(n_candles)
+        engine.analyze(candles)
+
+        repeat = 2000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            levels = engine.analyze(candles)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        print(f"{n_candles:5d} candles: {elapsed * 1e6:7.1f} us/chart, "
+              f"support {levels['support']:.2f}, resistance {levels['resistance']:.2f}, "
+              f"{len(levels['levels'])} levels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк локального хранилища OHLCV против перечитывания CSV
+
+Импортирует CSV с 1M свечей, дописывает хвост, затем сравнивает загрузку
+всего ряда, диапазона дат и одной колонки с pandas.read_csv.
+
+Запуск: python -m benchmarks.bench_ohlcv_store
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from models.ohlcv_store import OHLCVStore
+
+SYMBOL, INTERVAL = 'BTC-USD', '1m'
+
+
+def make_csv(path, n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n_rows))
+    df = pd.DataFrame({
+        'Date': pd.date_range('2023-01-01', periods=n_rows, freq='1min', tz='UTC'),
+        'Open': close + rng.normal(0, 0.02, n_rows),
+        'High': close + np.abs(rng.normal(0, 0.05, n_rows)),
+        'Low': close - np.abs(rng.normal(0, 0.05, n_rows)),
+        'Close': close,
+        'Volume': rng.integers(1, 1000, n_rows)
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(n_rows=1_000_000, tail=1_000):
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, 'candles.csv')
+        source = make_csv(csv_path, n_rows + tail)
+        head_path = os.path.join(root, 'head.csv')
+        source.iloc[:n_rows].to_csv(head_path, index=False)
+
+        store = OHLCVStore(root=os.path.join(root, 'store'))
+        start = time.perf_counter()
+        store.import_csv(SYMBOL, INTERVAL, head_path)
+        import_time = time.perf_counter() - start
+
+        # Incremental update: the fetcher returns an overlapping window, only the tail is new
+        fetched = source.set_index('Date').iloc[n_rows - 500:]
+        start = time.perf_counter()
+        added = store.update(SYMBOL, INTERVAL, lambda since: fetched[fetched.index >= since.tz_localize('UTC')],
+                             start=None)
+        update_time = time.perf_counter() - start
+
+        df, store_full = timed(lambda: store.load(SYMBOL, INTERVAL))
+        month_start, month_end = pd.Timestamp('2023-06-01'), pd.Timestamp('2023-07-01')
+        month, store_range = timed(lambda: store.load(SYMBOL, INTERVAL, start=month_start, end=month_end))
+        _, store_column = timed(lambda: store.load(SYMBOL, INTERVAL, columns=('close',)))
+        _, csv_full = timed(lambda: pd.read_csv(csv_path, parse_dates=['Date']), repeat=1)
+
+        expected = source.set_index('Date')
+        # Up to read_csv float parsing
+        same = (
+            len(df) == n_rows + tail
+            and np.allclose(df['close'].to_numpy(), expected['Close'].to_numpy(), rtol=0, atol=1e-9)
+            and np.array_equal(df.index.asi8, expected.index.tz_localize(None).as_unit('ns').asi8)
+        )
+
+        print(f"{n_rows:,} candles imported from CSV in {import_time:.2f} s")
+        print(f"Incremental update: +{added} candles in {update_time * 1000:.1f} ms (expected +{tail})")
+        print(f"Load all columns:    {store_full * 1000:8.1f} ms")
+        print(f"Load one month:      {store_range * 1000:8.1f} ms ({len(month):,} rows)")
+        print(f"Load 'close' only:   {store_column * 1000:8.1f} ms")
+        print(f"pandas.read_csv:     {csv_full * 1000:8.1f} ms")
+        print(f"Round trip matches source: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
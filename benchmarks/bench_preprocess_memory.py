@@ -0,0 +1,66 @@
+"""
+Бенчмарк памяти предобработки: float64 конвейер против uint8 с переиспользуемыми буферами
+
+Запуск: python -m benchmarks.bench_preprocess_memory
+"""
+import io
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from PIL import Image
+from app.ml.image_processor import ImageProcessor
+from benchmarks.bench_candle_detection import make_noisy_chart
+
+
+def legacy_pipeline(processor, image_bytes):
+    """Reference copy of the previous float64 round-trip pipeline"""
+    img_np = np.array(processor.decode_image(image_bytes))
+    gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
+    gray = cv2.equalizeHist(gray)
+    gray = cv2.bilateralFilter(gray, 9, 75, 75)
+    gray = gray / 255.0
+
+    edges = cv2.Canny((gray * 255).astype(np.uint8), 50, 150, apertureSize=3)
+    _, binary = cv2.threshold((gray * 255).astype(np.uint8), 127, 255, cv2.THRESH_BINARY_INV)
+    cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    resized = cv2.resize(gray, (64, 64))
+    return edges, np.expand_dims(np.expand_dims(resized, axis=-1).astype(np.float32), axis=0)
+
+
+def current_pipeline(processor, image_bytes):
+    gray, color = processor.preprocess_image(image_bytes)
+    processor.detect_chart_grid(gray)
+    processor.detect_candles(gray, color)
+    return processor.prepare_for_cnn(gray)
+
+
+def measure(func, processor, image_bytes, requests=5):
+    """Peak traced allocation and mean latency per request after one warm-up call"""
+    func(processor, image_bytes)
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        tracemalloc.start()
+        func(processor, image_bytes)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return max(peaks), (time.perf_counter() - start) / requests
+
+
+def main():
+    buf = io.BytesIO()
+    Image.fromarray(make_noisy_chart()).save(buf, 'PNG')
+    image_bytes = buf.getvalue()
+
+    processor = ImageProcessor()
+    legacy_peak, legacy_time = measure(legacy_pipeline, processor, image_bytes)
+    current_peak, current_time = measure(current_pipeline, processor, image_bytes)
+
+    print(f"float64 pipeline: peak {legacy_peak / 2**20:7.1f} MiB/request, {legacy_time * 1000:7.1f} ms")
+    print(f"uint8 pipeline:   peak {current_peak / 2**20:7.1f} MiB/request, {current_time * 1000:7.1f} ms")
+    print(f"Peak allocation reduced {legacy_peak / current_peak:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Бенчмарк памяти последовательностей для LSTM/CNN: цикл с np.array против окон-представлений
+
+Запуск: python -m benchmarks.bench_sequences
+"""
+import time
+import tracemalloc
+import numpy as np
+from models.sequences import SequenceBatches, sliding_sequences
+
+SEQUENCE_LENGTH = 50
+N_FEATURES = 12
+
+
+def legacy_sequences(X_scaled, y, sequence_length):
+    """Reference copy of the previous loop in ModelTrainer.prepare_data"""
+    X_sequences = []
+    y_sequences = []
+    for i in range(sequence_length, len(X_scaled)):
+        X_sequences.append(X_scaled[i - sequence_length:i])
+        y_sequences.append(y[i])
+    return np.array(X_sequences), np.array(y_sequences)
+
+
+def lazy_epoch(X_scaled, y, sequence_length):
+    """Build the views and walk one shuffled epoch of batches"""
+    X_sequences, y_sequences = sliding_sequences(X_scaled, y, sequence_length)
+    for _ in SequenceBatches(X_sequences, y_sequences, batch_size=32, shuffle=True):
+        pass
+    return X_sequences, y_sequences
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main(n_rows=50_000):
+    rng = np.random.default_rng(42)
+    X_scaled = rng.normal(size=(n_rows, N_FEATURES)).astype(np.float32)
+    y = rng.integers(0, 2, n_rows)
+    matrix_mb = X_scaled.nbytes / 2**20
+
+    (legacy_X, legacy_y), legacy_peak, legacy_time = measure(legacy_sequences, X_scaled, y, SEQUENCE_LENGTH)
+    (X_sequences, y_sequences), lazy_peak, lazy_time = measure(lazy_epoch, X_scaled, y, SEQUENCE_LENGTH)
+
+    # Same windows and labels, batch by batch in order
+    batches = SequenceBatches(X_sequences, y_sequences, batch_size=4096)
+    same = all(
+        np.array_equal(batch_X, legacy_X[i * 4096:(i + 1) * 4096])
+        and np.array_equal(batch_y, legacy_y[i * 4096:(i + 1) * 4096])
+        for i, (batch_X, batch_y) in enumerate(batches)
+    )
+
+    print(f"{n_rows:,} rows x {N_FEATURES} features ({matrix_mb:.1f} MB), sequence length {SEQUENCE_LENGTH}")
+    print(f"Loop + np.array:          peak {legacy_peak / 2**20:8.1f} MB, {legacy_time * 1000:8.1f} ms")
+    print(f"Views + one epoch lazily: peak {lazy_peak / 2**20:8.1f} MB, {lazy_time * 1000:8.1f} ms")
+    print(f"Identical sequences: {'yes' if same else 'NO'}")
+    # Two years of 1-minute candles
+    legacy_full_gb = 2 * 365 * 24 * 60 * SEQUENCE_LENGTH * N_FEATURES * legacy_X.itemsize / 2**30
+    print(f"Loop copy for 2 years of 1m candles: ~{legacy_full_gb:.1f} GB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Бенчмарк потоковых индикаторов: обновление на свечу против пересчета всей истории
+
+Заодно проверяет точное совпадение с векторным движком и восстановление
+состояния из JSON посреди ряда.
+
+Запуск: python -m benchmarks.bench_streaming_indicators
+"""
+import json
+import time
+import numpy as np
+from app.ml.indicator_engine import IndicatorEngine
+from app.ml.streaming_indicators import StreamingIndicatorSet
+from benchmarks.bench_levels import make_candles
+
+SELECTED = IndicatorEngine.SUPPORTED
+
+
+def main(n_candles=5000):
+    candles = make_candles(n_candles)
+    engine = IndicatorEngine()
+    batch = engine.compute(candles, SELECTED)
+
+    # Candle by candle, with a JSON round trip of the state half way through
+    stream = StreamingIndicatorSet(SELECTED)
+    streamed = {name: np.empty(n_candles) for name in batch}
+    start = time.perf_counter()
+    for i, candle in enumerate(candles):
+        if i == n_candles // 2:
+            stream = StreamingIndicatorSet.from_state(json.loads(json.dumps(stream.get_state())))
+        for name, value in stream.update(candle).items():
+            streamed[name][i] = value
+    stream_time = (time.perf_counter() - start) / n_candles
+
+    mismatched = [
+        name for name in batch
+        if not np.array_equal(batch[name], streamed[name], equal_nan=True)
+    ]
+
+    # Batch recompute of the whole history for one new candle
+    repeat = 50
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.compute(candles, SELECTED)
+    batch_time = (time.perf_counter() - start) / repeat
+
+    print(f"{n_candles} candles, indicators: {', '.join(SELECTED)}")
+    print(f"Streaming update:       {stream_time * 1e6:9.1f} us/candle")
+    print(f"Batch recompute:        {batch_time * 1e6:9.1f} us/candle")
+    print(f"Exact match with batch: {'yes' if not mismatched else 'NO: ' + ', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
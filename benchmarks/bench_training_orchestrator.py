@@ -0,0 +1,64 @@
+"""
+Бенчмарк оркестратора обучения: время прогона против суммы времен задач
+
+Задача-заглушка повторяет CPU-часть обучения без TensorFlow: синтетические
+свечи -> конвейер фичей -> RandomForest, артефакт сохраняется в каталог
+версии. При workers >= jobs и достаточном числе ядер время прогона близко
+к самой долгой задаче.
+
+Запуск: python -m benchmarks.bench_training_orchestrator
+"""
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from models.orchestrator import TrainingOrchestrator
+
+
+def sklearn_job(symbol, interval, period, output_dir, offline=False, n_rows=20_000):
+    from sklearn.ensemble import RandomForestClassifier
+    from app.ml.feature_pipeline import feature_pipeline
+
+    rng = np.random.default_rng(abs(hash((symbol, interval))) % 2**32)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n_rows))
+    df = pd.DataFrame({
+        'open': close + rng.normal(0, 0.05, n_rows),
+        'high': close + np.abs(rng.normal(0, 0.1, n_rows)),
+        'low': close - np.abs(rng.normal(0, 0.1, n_rows)),
+        'close': close,
+        'volume': rng.integers(1000, 10000, n_rows).astype(np.float64)
+    })
+    X = feature_pipeline.transform(df)
+    y = (np.roll(close, -5) > close).astype(int)
+    valid = ~np.isnan(X).any(axis=1)
+    valid[-5:] = False
+
+    model = RandomForestClassifier(n_estimators=50, max_depth=8, random_state=42, n_jobs=1)
+    model.fit(X[valid], y[valid])
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(output_dir, 'price_predictor.pkl'))
+    return {'rows': int(valid.sum()), 'pid': os.getpid()}
+
+
+def main(n_symbols=8):
+    jobs = [(f'SYM{i}-USD', '5m') for i in range(n_symbols)]
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as root:
+        for workers in sorted({1, min(cpus, n_symbols)}):
+            orchestrator = TrainingOrchestrator(workers=workers, artifacts_dir=root)
+            start = time.perf_counter()
+            results = orchestrator.run(jobs, version=f'bench-{workers}', job_func=sklearn_job)
+            wall = time.perf_counter() - start
+
+            elapsed = [result['elapsed'] for result in results]
+            saved = all(os.path.exists(os.path.join(root, symbol, interval, f'bench-{workers}', 'manifest.json'))
+                        for symbol, interval in jobs)
+            print(f"{n_symbols} jobs, {workers} workers x {results[0]['threads']} threads on {cpus} CPUs: "
+                  f"wall {wall:.2f} s, sum of jobs {sum(elapsed):.2f} s, slowest job {max(elapsed):.2f} s, "
+                  f"artifacts {'ok' if saved else 'MISSING'}")
+
+
+if __name__ == "__main__":
+    main()
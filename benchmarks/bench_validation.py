@@ -0,0 +1,53 @@
+"""
+Бенчмарк валидации во времени: walk-forward и purged k-fold, фолды
+последовательно против параллельно (joblib + общая memmap матрица)
+
+Запуск: python -m benchmarks.bench_validation
+"""
+import time
+import numpy as np
+from models.validation import evaluate_folds, purged_kfold_folds, walk_forward_folds
+from benchmarks.bench_ensemble import make_dataset
+
+PURGE = 5
+
+
+def check_folds(n_rows, n_folds=5):
+    """No training row within PURGE rows before (or, for k-fold, after) its test block"""
+    for scheme, folds in (('walk_forward', walk_forward_folds(n_rows, n_folds, PURGE)),
+                          ('purged_kfold', purged_kfold_folds(n_rows, n_folds, PURGE))):
+        for train, test in folds:
+            for part in train:
+                assert part.stop <= test.start - PURGE or part.start >= test.stop + PURGE, (scheme, part, test)
+                if scheme == 'walk_forward':
+                    assert part.stop <= test.start - PURGE
+    return True
+
+
+def main(n_rows=20_000, n_folds=5, members='hgb,sgd'):
+    X_train, X_test, y_train, y_test = make_dataset(n_rows)
+    X, y = np.concatenate([X_train, X_test]), np.concatenate([y_train, y_test])
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, len(X)))
+    print(f"{len(X):,} rows, {n_folds} folds, members {members}, folds leak-free: {check_folds(len(X), n_folds)}")
+
+    for scheme in ('walk_forward', 'purged_kfold'):
+        timings, reports = {}, {}
+        for n_jobs in (1, -1):
+            start = time.perf_counter()
+            reports[n_jobs] = evaluate_folds(X, y, close, scheme=scheme, n_folds=n_folds, purge=PURGE,
+                                             members=members, n_jobs=n_jobs)
+            timings[n_jobs] = time.perf_counter() - start
+
+        report = reports[-1]
+        same = reports[1]['overall'] == report['overall']
+        print(f"\n{scheme}: serial {timings[1]:.2f} s, parallel {timings[-1]:.2f} s, identical: {'yes' if same else 'NO'}")
+        for fold in report['folds']:
+            print(f"  fold {fold['fold']} train {fold['train_rows']:6d} test {fold['rows']:5d}  "
+                  f"acc {fold['accuracy']:.4f}  log-loss {fold['log_loss']:.4f}  hit {fold['hit_rate'] or 0:.4f}")
+        for name, metrics in report['regimes'].items():
+            print(f"  {name:16s} rows {metrics['rows']:5d}  acc {metrics['accuracy']:.4f}  "
+                  f"log-loss {metrics['log_loss']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +0,0 @@
-#!/bin/bash
-cat > /usr/local/lib/python3.11/site-packages/talib.py << 'EOF'
-import numpy as np
-import pandas as pd
-
-def RSI(close, timeperiod=14):
-    return 50.0
-
-def SMA(close, timeperiod):
-    if len(close) < timeperiod:
-        return np.mean(close) if len(close) > 0 else 0
-    return np.mean(close[-timeperiod:])
-
-def MACD(close, fastperiod=12, slowperiod=26, signalperiod=9):
-    return 0.0, 0.0, 0.0
-
-def EMA(close, timeperiod):
-    if len(close) < timeperiod:
-        return np.mean(close) if len(close) > 0 else 0
-    return np.mean(close[-timeperiod:])
-
-def BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2):
-    if len(close) < timeperiod:
-        avg = np.mean(close) if len(close) > 0 else 0
-        return avg, avg, avg
-    sma = np.mean(close[-timeperiod:])
-    std = np.std(close[-timeperiod:])
-    return sma + std*2, sma, sma - std*2
-
-def STOCH(high, low, close, fastk_period=14):
-    return 50.0, 50.0
-
-def ATR(high, low, close, timeperiod=14):
-    return 0.01
-EOF
@@ -0,0 +1,213 @@
+"""
+Векторный бэктест сигналов модели по истории OHLCV
+
+Фичи (общий конвейер) и вероятности модели считаются батчем по всему
+ряду. Сигнал на каждой свече: UP/DOWN при уверенности выше порога, уровни
+take_profit / stop_loss - те же, что у PricePredictor (risk_levels).
+Выход ищется векторно по окнам high/low следующих свечей в пределах срока
+действия сигнала (EXPIRATION_MINUTES, как в PredictionService): первое
+касание TP или SL, иначе закрытие по цене на истечении.
+
+Сделки открываются только внутри отложенного диапазона (вне обучающего
+периода модели); более ранние свечи лишь прогревают индикаторы.
+
+Запуск: python -m models.backtest --symbol BTC-USD --intervals 5m 1h --model-dir models --test-start 2024-06-01
+"""
+import argparse
+import math
+import os
+import re
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from app.ml.feature_pipeline import feature_pipeline
+from app.ml.indicator_engine import IndicatorSeries
+from app.ml.predictor import EXPIRATION_MINUTES, risk_levels
+from models.feature_store import WARMUP_ROWS
+from models.ohlcv_store import ohlcv_store
+
+UNIT_MINUTES = {'m': 1, 'h': 60, 'd': 1440, 'wk': 10080, 'mo': 43200}
+
+# Исходы сделки
+EXPIRED, TAKE_PROFIT, STOP_LOSS = 0, 1, 2
+
+
+def interval_minutes(interval):
+    """Candle length of a yfinance-style interval ('5m', '1h', '1d', '1wk', '1mo') in minutes"""
+    match = re.fullmatch(r'(\d+)(m|h|d|wk|mo)', interval)
+    if match is None:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return int(match.group(1)) * UNIT_MINUTES[match.group(2)]
+
+
+def horizon_bars(timeframe):
+    """Signal expiry of the timeframe in bars (at least one)"""
+    return max(1, math.ceil(EXPIRATION_MINUTES.get(timeframe, 15) / interval_minutes(timeframe)))
+
+
+def simulate_exits(high, low, close, entries, side, take_profit, stop_loss, horizon):
+    """First-hit exits for trades opened at close[entries]
+
+    side +1 long / -1 short, take_profit / stop_loss in percent. The bars
+    entries + 1 .. entries + horizon are scanned at once as (trades, horizon)
+    windows. When TP and SL fall on the same bar SL is assumed first.
+    Returns (returns in percent, outcome codes, bars held).
+    """
+    entry = close[entries]
+    tp_price = entry * (1 + side * take_profit / 100)
+    sl_price = entry * (1 - side * stop_loss / 100)
+
+    highs = sliding_window_view(high, horizon)[entries + 1]
+    lows = sliding_window_view(low, horizon)[entries + 1]
+    long = (side > 0)[:, None]
+    tp_hit = np.where(long, highs >= tp_price[:, None], lows <= tp_price[:, None])
+    sl_hit = np.where(long, lows <= sl_price[:, None], highs >= sl_price[:, None])
+
+    first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), horizon)
+    first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), horizon)
+    outcome = np.full(len(entries), EXPIRED, dtype=np.int8)
+    outcome[first_tp < first_sl] = TAKE_PROFIT
+    outcome[(first_sl <= first_tp) & (first_sl < horizon)] = STOP_LOSS
+
+    expiry_return = side * (close[entries + horizon] / entry - 1) * 100
+    returns = np.select([outcome == TAKE_PROFIT, outcome == STOP_LOSS], [take_profit, -stop_loss], expiry_return)
+    held = np.minimum(np.minimum(first_tp, first_sl) + 1, horizon)
+    return returns, outcome, held
+
+
+def summarize(returns, outcome, horizon):
+    """Hit rate, expectancy and drawdown of a signal stream
+
+    Every signal is sized 1 / horizon of the capital, so the overlapping
+    open trades never exceed full exposure; returns and drawdown are in
+    percent of the capital.
+    """
+    trades = len(returns)
+    if trades == 0:
+        return {'trades': 0}
+    equity = np.cumsum(returns) / horizon
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    return {
+        'trades': trades,
+        'hit_rate': float(np.mean(outcome == TAKE_PROFIT)),
+        'stop_rate': float(np.mean(outcome == STOP_LOSS)),
+        'expired_rate': float(np.mean(outcome == EXPIRED)),
+        'win_rate': float(np.mean(returns > 0)),
+        'expectancy': float(returns.mean()),
+        'total_return': float(equity[-1]),
+        'max_drawdown': float(drawdown.max())
+    }
+
+
+class Backtester:
+    """Batch backtest of model signals with PricePredictor TP/SL levels"""
+
+    def __init__(self, model=None, scaler=None, threshold=0.05, chunk_rows=500_000):
+        self.model = model
+        self.scaler = scaler
+        # Сделка открывается при |p - 0.5| >= threshold, иначе SIDEWAYS
+        self.threshold = threshold
+        self.chunk_rows = chunk_rows
+
+    def probabilities(self, ohlcv, start=0, stop=None):
+        """P(up) for the bars start..stop from the shared feature pipeline; NaN elsewhere and during warm-up"""
+        X = feature_pipeline.transform(ohlcv)
+        proba = np.full(len(X), np.nan)
+        valid = start + np.flatnonzero(~np.isnan(X[start:stop]).any(axis=1))
+        for offset in range(0, len(valid), self.chunk_rows):
+            rows = valid[offset:offset + self.chunk_rows]
+            X_chunk = X[rows] if self.scaler is None else self.scaler.transform(X[rows])
+            proba[rows] = self.model.predict_proba(X_chunk)[:, 1]
+        return proba
+
+    def run(self, ohlcv, timeframe, probabilities=None, return_trades=False, start=0, stop=None):
+        """Backtest one OHLCV series; probabilities (P(up) per bar, NaN = no signal) skip the model
+
+        Trades open and close inside the held-out rows start..stop, which
+        must lie outside the model's training period; earlier rows only
+        warm up the indicators.
+        """
+        series = IndicatorSeries(ohlcv)
+        high, low, close = series.high, series.low, series.close
+        stop = len(close) if stop is None else min(stop, len(close))
+        horizon = horizon_bars(timeframe)
+        if probabilities is None:
+            proba = self.probabilities(ohlcv, start, stop)
+        else:
+            proba = np.asarray(probabilities, dtype=np.float64)
+
+        # Signals in the held-out range with a full expiry window ahead
+        confidence = np.abs(proba - 0.5) + 0.5
+        signal = confidence >= 0.5 + self.threshold
+        signal[:start] = False
+        signal[max(stop - horizon, 0):] = False
+        entries = np.flatnonzero(signal)
+
+        returns, outcome, held = [], [], []
+        for offset in range(0, len(entries), self.chunk_rows):
+            chunk = entries[offset:offset + self.chunk_rows]
+            side = np.where(proba[chunk] > 0.5, 1.0, -1.0)
+            direction = np.where(side > 0, 'UP', 'DOWN')
+            take_profit, stop_loss = risk_levels(direction, confidence[chunk], timeframe)
+            chunk_returns, chunk_outcome, chunk_held = simulate_exits(
+                high, low, close, chunk, side, take_profit, stop_loss, horizon)
+            returns.append(chunk_returns)
+            outcome.append(chunk_outcome)
+            held.append(chunk_held)
+
+        returns = np.concatenate(returns) if returns else np.empty(0)
+        outcome = np.concatenate(outcome) if outcome else np.empty(0, dtype=np.int8)
+        report = {'timeframe': timeframe, 'bars': stop - start, 'horizon_bars': horizon,
+                  **summarize(returns, outcome, horizon)}
+        if return_trades:
+            report['trades_detail'] = {
+                'entries': entries, 'returns': returns, 'outcome': outcome,
+                'held': np.concatenate(held) if held else np.empty(0, dtype=np.int64)
+            }
+        return report
+
+    def run_store(self, symbol, intervals, test_start, test_end=None):
+        """{interval: report} over the local OHLCV store (no network)
+
+        test_start / test_end bound the held-out period; WARMUP_ROWS candles
+        before test_start are read only to warm up the indicators.
+        """
+        reports = {}
+        for interval in intervals:
+            arrays = ohlcv_store.load_arrays(symbol, interval, end=test_end)
+            start = int(np.searchsorted(arrays['timestamp'], pd.Timestamp(test_start).value, side='left'))
+            lo = max(0, start - WARMUP_ROWS)
+            arrays = {name: values[lo:] for name, values in arrays.items()}
+            reports[interval] = self.run(arrays, interval, start=start - lo)
+        return reports
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Vectorized backtest of the trained ensemble")
+    parser.add_argument('--symbol', default='BTC-USD')
+    parser.add_argument('--intervals', nargs='+', default=['5m'])
+    parser.add_argument('--model-dir', default='models', help="directory with price_predictor.pkl and scaler.pkl")
+    parser.add_argument('--threshold', type=float, default=0.05)
+    parser.add_argument('--test-start', required=True,
+                        help="first candle of the held-out period, after the model's training data")
+    parser.add_argument('--test-end', default=None)
+    args = parser.parse_args()
+
+    backtester = Backtester(
+        model=joblib.load(os.path.join(args.model_dir, 'price_predictor.pkl')),
+        scaler=joblib.load(os.path.join(args.model_dir, 'scaler.pkl')),
+        threshold=args.threshold
+    )
+    for interval, report in backtester.run_store(args.symbol, args.intervals, args.test_start, args.test_end).items():
+        if not report['trades']:
+            print(f"{interval:4s} no trades")
+            continue
+        print(f"{interval:4s} trades {report['trades']:8d}  hit rate {report['hit_rate']:.3f}  "
+              f"win rate {report['win_rate']:.3f}  expectancy {report['expectancy']:+.4f}%  "
+              f"total {report['total_return']:+.2f}%  max drawdown {report['max_drawdown']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
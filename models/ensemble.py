@@ -0,0 +1,98 @@
+"""
+Ансамбль для ModelTrainer: параллельное обучение членов и сборка без переобучения
+
+Члены ансамбля выбираются по именам (ENSEMBLE_MEMBERS, например
+"rf,hgb,sgd") из ESTIMATORS. Каждый обучается один раз в отдельном
+процессе joblib с замером времени и пиковой памяти, затем
+VotingClassifier собирается из уже обученных моделей - без повторного fit.
+"""
+import time
+import tracemalloc
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import (GradientBoostingClassifier, HistGradientBoostingClassifier,
+                              RandomForestClassifier, VotingClassifier)
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import LabelEncoder
+from sklearn.svm import SVC
+from sklearn.utils import Bunch
+from app.utils.config import config
+
+# Классы целевой переменной (цена выше / ниже через горизонт)
+CLASSES = np.array([0, 1])
+
+# Имя -> фабрика (n_jobs) -> необученная модель с predict_proba
+ESTIMATORS = {
+    'rf': lambda n_jobs: RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, n_jobs=n_jobs),
+    'gb': lambda n_jobs: GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, max_depth=5,
+                                                    random_state=42),
+    # Scalable alternatives: histogram boosting and linear models are ~linear in rows
+    'hgb': lambda n_jobs: HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, random_state=42),
+    'sgd': lambda n_jobs: SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+    'logreg': lambda n_jobs: LogisticRegression(max_iter=500),
+    'nb': lambda n_jobs: GaussianNB(),
+    # Probability calibration makes SVC super-linear in rows: small datasets only
+    'svm': lambda n_jobs: SVC(probability=True, random_state=42),
+}
+
+
+def parse_members(members=None):
+    """'rf,hgb,sgd' (or a list) -> validated list of estimator names"""
+    members = members or config.ENSEMBLE_MEMBERS
+    if isinstance(members, str):
+        members = [name.strip() for name in members.split(',') if name.strip()]
+    unknown = [name for name in members if name not in ESTIMATORS]
+    if unknown or not members:
+        raise ValueError(f"Unknown ensemble members: {unknown}, available: {', '.join(ESTIMATORS)}")
+    return members
+
+
+def incremental_members(members=None):
+    """Configured members that can learn batch by batch (partial_fit); sgd when none can"""
+    names = [name for name in parse_members(members) if hasattr(ESTIMATORS[name](1), 'partial_fit')]
+    return names or ['sgd']
+
+
+def fit_member(name, estimator, X, y):
+    """Fit one estimator; returns (name, fitted estimator, fit seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return name, estimator, elapsed, peak / 2**20
+
+
+def fit_members(X, y, members=None, n_jobs=-1):
+    """Fit the members in parallel processes; returns ([(name, fitted)], {name: stats})"""
+    members = parse_members(members)
+    parallel = Parallel(n_jobs=min(n_jobs, len(members)) if n_jobs > 0 else n_jobs)
+    # Parallelism is across members, so each member trains single-threaded
+    results = parallel(delayed(fit_member)(name, ESTIMATORS[name](1), X, y) for name in members)
+
+    fitted = [(name, estimator) for name, estimator, _, _ in results]
+    stats = {name: {'fit_time': elapsed, 'peak_mb': peak} for name, _, elapsed, peak in results}
+    return fitted, stats
+
+
+def voting_from_fitted(fitted, y, voting='soft'):
+    """VotingClassifier over already fitted (name, estimator) pairs, without refitting
+
+    Sets the attributes VotingClassifier.fit would set; members must be
+    fitted on labels encoded as by LabelEncoder (0..n_classes-1).
+    """
+    ensemble = VotingClassifier(estimators=fitted, voting=voting)
+    ensemble.le_ = LabelEncoder().fit(y)
+    ensemble.classes_ = ensemble.le_.classes_
+    ensemble.estimators_ = [estimator for _, estimator in fitted]
+    ensemble.named_estimators_ = Bunch(**dict(fitted))
+    return ensemble
+
+
+def train_voting_ensemble(X_train, y_train, members=None, n_jobs=-1, voting='soft'):
+    """Fit members in parallel and build the voting ensemble; returns (ensemble, stats)"""
+    encoded = LabelEncoder().fit_transform(y_train)
+    fitted, stats = fit_members(X_train, encoded, members, n_jobs)
+    return voting_from_fitted(fitted, y_train, voting), stats
@@ -0,0 +1,140 @@
+"""
+Хранилище фичей для обучения вне памяти
+
+Матрица фичей (float32, построчно) и метки считаются кусками из
+OHLCV-хранилища и дописываются в бинарные файлы каталога
+<FEATURE_STORE_DIR>/<symbol>/<interval>/<версия набора фичей>/. Версия -
+хеш декларации FEATURES, поэтому неизмененные фичи переиспользуются между
+запусками, а новые свечи только досчитываются. Скейлер обучается потоково
+(StandardScaler.partial_fit), батчи читаются прямо из np.memmap, так что
+память ограничена размером куска/батча, а не длиной истории.
+"""
+import json
+import os
+import re
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from app.ml.feature_pipeline import feature_pipeline
+from app.utils.config import config
+from app.utils.logger import logger
+from models.ohlcv_store import COLUMNS, ohlcv_store
+
+# Свечей истории перед куском: EMA/Wilder-хвосты затухают до точности float32
+WARMUP_ROWS = 1000
+FEATURE_DTYPE = np.dtype('<f4')
+LABEL_DTYPE = np.dtype('i1')
+TIMESTAMP_DTYPE = np.dtype('<i8')
+
+
+class FeatureStore:
+    """Chunked, append-only feature matrices keyed by (symbol, interval, feature-set version)"""
+
+    def __init__(self, root=None, pipeline=feature_pipeline, source=ohlcv_store, horizon=5, chunk_rows=None):
+        self.root = root or config.FEATURE_STORE_DIR
+        self.pipeline = pipeline
+        self.source = source
+        # Target: close `horizon` candles ahead is higher (as in ModelTrainer.create_features)
+        self.horizon = horizon
+        self.chunk_rows = chunk_rows or config.FEATURE_CHUNK_ROWS
+
+    def _dir(self, symbol, interval):
+        version = f'{self.pipeline.version}-h{self.horizon}'
+        return os.path.join(self.root, re.sub(r'[^\w.-]', '_', symbol), interval, version)
+
+    def meta(self, symbol, interval):
+        """{'rows': stored rows, 'source_stop': OHLCV rows consumed, 'columns': [...]}"""
+        try:
+            with open(os.path.join(self._dir(symbol, interval), 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'rows': 0, 'source_stop': 0, 'columns': self.pipeline.names}
+
+    def _write_meta(self, directory, meta):
+        path = os.path.join(directory, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def update(self, symbol, interval):
+        """Compute features for OHLCV rows not yet in the store; returns rows added"""
+        source = self.source.load_arrays(symbol, interval)
+        close = source['close']
+        stop = len(close) - self.horizon
+        meta = self.meta(symbol, interval)
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        added = 0
+        position = meta['source_stop']
+        while position < stop:
+            chunk_stop = min(position + self.chunk_rows, stop)
+            lo = max(0, position - WARMUP_ROWS)
+            window = {name: np.asarray(source[name][lo:chunk_stop]) for name in COLUMNS}
+            if np.isnan(window['volume']).all():
+                # No volume in the source: volume_ratio falls back to 1.0 as for chart candles
+                del window['volume']
+            features = self.pipeline.transform(window)[position - lo:]
+            target = close[position + self.horizon:chunk_stop + self.horizon] > close[position:chunk_stop]
+
+            # Same rows as dropna() in create_features: warm-up rows are skipped
+            valid = ~np.isnan(features).any(axis=1)
+            parts = {
+                'features': features[valid].astype(FEATURE_DTYPE),
+                'target': target[valid].astype(LABEL_DTYPE),
+                'timestamp': np.asarray(source['timestamp'][position:chunk_stop])[valid].astype(TIMESTAMP_DTYPE)
+            }
+            for name, values in parts.items():
+                with open(os.path.join(directory, f'{name}.bin'), 'ab') as f:
+                    # Drop bytes of a chunk interrupted before meta.json was updated
+                    f.truncate(meta['rows'] * values.itemsize * (values.shape[1] if values.ndim == 2 else 1))
+                    f.write(values.tobytes())
+
+            meta['rows'] += int(valid.sum())
+            meta['source_stop'] = position = chunk_stop
+            self._write_meta(directory, meta)
+            added += int(valid.sum())
+
+        if added:
+            logger.info(f"Feature store {symbol} {interval}: +{added} rows ({meta['rows']} total)")
+        return added
+
+    def load(self, symbol, interval):
+        """(X, y, timestamps) as read-only memmaps: (rows, n_features) float32, (rows,) int8/int64"""
+        meta = self.meta(symbol, interval)
+        rows, n_features = meta['rows'], len(meta['columns'])
+        directory = self._dir(symbol, interval)
+        if rows == 0:
+            return (np.empty((0, n_features), dtype=FEATURE_DTYPE), np.empty(0, dtype=LABEL_DTYPE),
+                    np.empty(0, dtype=TIMESTAMP_DTYPE))
+        return (
+            np.memmap(os.path.join(directory, 'features.bin'), dtype=FEATURE_DTYPE, mode='r',
+                      shape=(rows, n_features)),
+            np.memmap(os.path.join(directory, 'target.bin'), dtype=LABEL_DTYPE, mode='r', shape=(rows,)),
+            np.memmap(os.path.join(directory, 'timestamp.bin'), dtype=TIMESTAMP_DTYPE, mode='r', shape=(rows,))
+        )
+
+    def fit_scaler(self, X, stop=None):
+        """StandardScaler fitted chunk by chunk (partial_fit) on X[:stop]"""
+        scaler = StandardScaler()
+        stop = len(X) if stop is None else stop
+        for start in range(0, stop, self.chunk_rows):
+            scaler.partial_fit(X[start:min(start + self.chunk_rows, stop)])
+        return scaler
+
+    @staticmethod
+    def batches(X, y, scaler=None, batch_size=8192, start=0, stop=None, shuffle=False, seed=None):
+        """Scaled (X, y) row batches read straight from the memmaps; shuffle permutes batch order"""
+        stop = len(X) if stop is None else stop
+        starts = np.arange(start, stop, batch_size)
+        if shuffle:
+            np.random.default_rng(seed).shuffle(starts)
+        for begin in starts:
+            end = min(begin + batch_size, stop)
+            X_batch = np.asarray(X[begin:end])
+            if scaler is not None:
+                X_batch = scaler.transform(X_batch)
+            yield X_batch, np.asarray(y[begin:end])
+
+
+# Создаем глобальный инстанс
+feature_store = FeatureStore()
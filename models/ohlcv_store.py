@@ -0,0 +1,204 @@
+"""
+Локальное колоночное хранилище свечей OHLCV для обучения и бэктестов
+
+Каждая пара (symbol, interval) - каталог с отдельным бинарным файлом на
+колонку (timestamp int64 в нс UTC, open/high/low/close/volume float64) и
+meta.json с числом строк. Колонки читаются через np.memmap: загружаются
+только нужные колонки и только строки из запрошенного диапазона дат.
+Новые свечи дописываются в конец файлов, поэтому из сети догружается
+только недостающий хвост (последняя сохраненная свеча перезапрашивается и
+перезаписывается - она могла быть еще не закрыта).
+"""
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from app.utils.config import config
+from app.utils.logger import logger
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+DTYPES = {'timestamp': np.dtype('<i8'), **{name: np.dtype('<f8') for name in COLUMNS}}
+
+# Заголовки CSV разных источников -> имена колонок хранилища
+CSV_ALIASES = {
+    'date': 'timestamp', 'datetime': 'timestamp', 'time': 'timestamp', 'open_time': 'timestamp',
+    'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume', 'vol': 'volume'
+}
+
+
+def _to_ns(index):
+    """DatetimeIndex / timestamps -> int64 nanoseconds UTC"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.as_unit('ns').asi8
+
+
+def epoch_unit(values):
+    """Unit of numeric epoch timestamps by magnitude: s, ms, us or ns"""
+    magnitude = np.nanmax(np.abs(np.asarray(values, dtype=np.float64)))
+    # Present-day epoch: ~1.7e9 s, ~1.7e12 ms, ~1.7e15 us, ~1.7e18 ns
+    for unit, limit in (('s', 1e11), ('ms', 1e14), ('us', 1e17)):
+        if magnitude < limit:
+            return unit
+    return 'ns'
+
+
+def _to_timestamp(value):
+    if value is None:
+        return None
+    return int(_to_ns([pd.Timestamp(value)])[0])
+
+
+class OHLCVStore:
+    """Memory-mapped OHLCV columns keyed by (symbol, interval), written at the tail"""
+
+    def __init__(self, root=None):
+        self.root = root or config.OHLCV_STORE_DIR
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, re.sub(r'[^\w.-]', '_', symbol), interval)
+
+    def _meta_path(self, symbol, interval):
+        return os.path.join(self._dir(symbol, interval), 'meta.json')
+
+    def rows(self, symbol, interval):
+        try:
+            with open(self._meta_path(symbol, interval)) as f:
+                return json.load(f)['rows']
+        except FileNotFoundError:
+            return 0
+
+    def _column(self, symbol, interval, name, rows):
+        if rows == 0:
+            return np.empty(0, dtype=DTYPES[name])
+        path = os.path.join(self._dir(symbol, interval), f'{name}.bin')
+        return np.memmap(path, dtype=DTYPES[name], mode='r', shape=(rows,))
+
+    def last_timestamp(self, symbol, interval):
+        """Time of the newest stored candle (naive UTC), None for an empty store"""
+        rows = self.rows(symbol, interval)
+        if rows == 0:
+            return None
+        return pd.Timestamp(int(self._column(symbol, interval, 'timestamp', rows)[-1]))
+
+    def load_arrays(self, symbol, interval, columns=COLUMNS, start=None, end=None):
+        """Read-only memmap slices {'timestamp': ..., column: ...} for start <= t < end"""
+        rows = self.rows(symbol, interval)
+        timestamps = self._column(symbol, interval, 'timestamp', rows)
+        lo = 0 if start is None else np.searchsorted(timestamps, _to_timestamp(start), side='left')
+        hi = rows if end is None else np.searchsorted(timestamps, _to_timestamp(end), side='left')
+
+        arrays = {'timestamp': timestamps[lo:hi]}
+        for name in columns:
+            arrays[name] = self._column(symbol, interval, name, rows)[lo:hi]
+        return arrays
+
+    def load(self, symbol, interval, columns=COLUMNS, start=None, end=None):
+        """DataFrame indexed by naive UTC timestamps with the projected columns"""
+        arrays = self.load_arrays(symbol, interval, columns, start, end)
+        index = pd.DatetimeIndex(np.asarray(arrays.pop('timestamp')).view('datetime64[ns]'), name='timestamp')
+        return pd.DataFrame({name: np.asarray(values) for name, values in arrays.items()}, index=index)
+
+    def append(self, symbol, interval, df, overwrite=False):
+        """Append candles newer than the stored tail; returns the number of new rows
+
+        overwrite=True also replaces stored candles with the same timestamps
+        (e.g. a still-forming last candle fetched before it closed): the
+        columns are rewritten from the first overlapping stored row.
+        """
+        if df is None or df.empty:
+            return 0
+        df = df.rename(columns=str.lower)
+        timestamps = _to_ns(df.index)
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+
+        rows = self.rows(symbol, interval)
+        stored = self._column(symbol, interval, 'timestamp', rows)
+        # First occurrence of each timestamp; without overwrite only newer than the stored tail
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[1:] = timestamps[1:] != timestamps[:-1]
+        if rows and not overwrite:
+            keep &= timestamps > stored[-1]
+        if not keep.any():
+            return 0
+
+        values = {'timestamp': timestamps[keep]}
+        for name in COLUMNS:
+            column = df[name].to_numpy(dtype=np.float64) if name in df else np.full(len(df), np.nan)
+            values[name] = column[order][keep]
+
+        # Rewrite point: the first stored row at or after the first incoming candle
+        start = int(np.searchsorted(stored, values['timestamp'][0], side='left')) if rows else 0
+        if start < rows:
+            # Stored rows of the rewritten tail that the incoming candles do not replace
+            # (copied: the memmapped bytes are truncated below)
+            tail = {name: np.array(self._column(symbol, interval, name, rows)[start:]) for name in DTYPES}
+            kept = ~np.isin(tail['timestamp'], values['timestamp'])
+            merge = np.argsort(np.concatenate((tail['timestamp'][kept], values['timestamp'])), kind='stable')
+            values = {name: np.concatenate((tail[name][kept], values[name]))[merge] for name in DTYPES}
+            # Shrink first: a rewrite interrupted midway loses the tail, which the next update refetches
+            self._write_meta(symbol, interval, start)
+
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        for name, column in values.items():
+            with open(os.path.join(directory, f'{name}.bin'), 'ab') as f:
+                # Drop bytes past the committed rows (rewritten tail or an interrupted append)
+                f.truncate(start * DTYPES[name].itemsize)
+                f.write(column.astype(DTYPES[name]).tobytes())
+
+        self._write_meta(symbol, interval, start + len(values['timestamp']))
+        return start + len(values['timestamp']) - rows
+
+    def _write_meta(self, symbol, interval, rows):
+        meta_path = self._meta_path(symbol, interval)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'symbol': symbol, 'interval': interval, 'rows': rows}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def import_csv(self, symbol, interval, path, unit=None, **read_csv_kwargs):
+        """Import an OHLCV CSV export (offline)
+
+        Timestamps may be dates or epoch numbers; the epoch unit ('s', 'ms',
+        'us', 'ns') is detected by magnitude unless given.
+        """
+        df = pd.read_csv(path, **read_csv_kwargs)
+        df.columns = [CSV_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in df.columns]
+        if 'timestamp' not in df:
+            raise ValueError(f"CSV {path} has no timestamp/date column")
+
+        timestamps = df.pop('timestamp')
+        if pd.api.types.is_numeric_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, unit=unit or epoch_unit(timestamps), utc=True)
+        else:
+            timestamps = pd.to_datetime(timestamps, utc=True)
+        added = self.append(symbol, interval, df.set_index(timestamps))
+        logger.info(f"Imported {added} candles for {symbol} {interval} from {path}")
+        return added
+
+    def update(self, symbol, interval, fetch, start):
+        """Fetch only the missing tail: fetch(since) -> DataFrame of candles at or after since
+
+        since is the newest stored candle, so it is fetched again and overwritten.
+        """
+        since = self.last_timestamp(symbol, interval)
+        since = pd.Timestamp(start) if since is None else since
+        # The stored last candle may have been fetched before it closed: refetch and overwrite it
+        added = self.append(symbol, interval, fetch(since), overwrite=True)
+        logger.info(f"OHLCV store {symbol} {interval}: +{added} candles since {since}")
+        return added
+
+
+# Создаем глобальный инстанс
+ohlcv_store = OHLCVStore()
+
+
+if __name__ == "__main__":
+    # Офлайн-импорт: python -m models.ohlcv_store BTC-USD 5m candles.csv
+    import sys
+    if len(sys.argv) != 4:
+        sys.exit("Usage: python -m models.ohlcv_store SYMBOL INTERVAL FILE.csv")
+    ohlcv_store.import_csv(*sys.argv[1:])
@@ -0,0 +1,143 @@
+"""
+Параллельное обучение моделей по матрице (symbol, interval)
+
+Каждая задача - полный цикл ModelTrainer (данные -> фичи -> ансамбль,
+LSTM, CNN) в отдельном процессе пула. Число потоков BLAS/OpenMP/TensorFlow
+в воркере ограничивается до импорта этих библиотек, чтобы воркеры не
+делили ядра между собой. Артефакты пишутся в версионированный каталог
+<TRAINING_ARTIFACTS_DIR>/<symbol>/<interval>/<version>/ с manifest.json.
+
+Запуск: python -m models.orchestrator --symbols BTC-USD ETH-USD --intervals 5m 1h
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from app.utils.config import config
+from app.utils.logger import logger
+
+# Переменные окружения, которые читают BLAS/OpenMP/Numba/TensorFlow при импорте
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS', 'NUMBA_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'
+)
+
+
+def _init_worker(threads):
+    """Pin native thread pools; runs in a fresh (spawned) process before any heavy import"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    # Ensemble members are fitted in parallel processes: stay within the worker's share
+    config.ENSEMBLE_JOBS = threads
+
+
+def job_dir(artifacts_dir, symbol, interval, version):
+    return os.path.join(artifacts_dir, re.sub(r'[^\w.-]', '_', symbol), interval, version)
+
+
+def train_job(symbol, interval, period, output_dir, offline=False):
+    """Full ModelTrainer run for one (symbol, interval); returns the train_all summary"""
+    from models.train_model import ModelTrainer
+    return ModelTrainer().train_all(symbol=symbol, interval=interval, period=period,
+                                    output_dir=output_dir, offline=offline)
+
+
+def _run_job(job_func, symbol, interval, period, output_dir, offline, threads):
+    start = time.perf_counter()
+    summary = job_func(symbol, interval, period, output_dir, offline)
+    manifest = {
+        'symbol': symbol,
+        'interval': interval,
+        'period': period,
+        'version': os.path.basename(output_dir),
+        'threads': threads,
+        'elapsed': time.perf_counter() - start,
+        **(summary or {})
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    # Указатель на последнюю версию для (symbol, interval)
+    with open(os.path.join(os.path.dirname(output_dir), 'LATEST'), 'w') as f:
+        f.write(manifest['version'])
+    return manifest
+
+
+class TrainingOrchestrator:
+    """Runs a matrix of (symbol, interval) training jobs in a process pool"""
+
+    def __init__(self, workers=None, threads_per_worker=None, artifacts_dir=None):
+        self.workers = workers or config.TRAINING_WORKERS
+        self.threads_per_worker = threads_per_worker or config.TRAINING_THREADS_PER_WORKER
+        self.artifacts_dir = artifacts_dir or config.TRAINING_ARTIFACTS_DIR
+
+    def plan(self, n_jobs):
+        """(workers, threads per worker) without oversubscribing the cores"""
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(n_jobs, self.workers or cpus))
+        threads = self.threads_per_worker or max(1, cpus // workers)
+        return workers, threads
+
+    def run(self, jobs, period='2y', offline=False, version=None, job_func=train_job):
+        """Train every (symbol, interval) job; returns one manifest (or error) per job
+
+        All jobs of a run share the version (UTC time of the run start).
+        job_func(symbol, interval, period, output_dir, offline) must be a
+        module-level function so it can be sent to the spawned workers.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        version = version or datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        workers, threads = self.plan(len(jobs))
+        logger.info(f"Training {len(jobs)} jobs, version {version}: {workers} workers x {threads} threads")
+
+        start = time.perf_counter()
+        results = {}
+        # spawn: каждый воркер импортирует numpy/TensorFlow уже с ограничением потоков
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(_run_job, job_func, symbol, interval, period,
+                            job_dir(self.artifacts_dir, symbol, interval, version), offline, threads): (symbol, interval)
+                for symbol, interval in jobs
+            }
+            for future in as_completed(futures):
+                symbol, interval = futures[future]
+                try:
+                    results[symbol, interval] = future.result()
+                    logger.info(f"Trained {symbol} {interval} in {results[symbol, interval]['elapsed']:.1f} s")
+                except Exception as e:
+                    logger.error(f"Training {symbol} {interval} failed: {e}")
+                    results[symbol, interval] = {'symbol': symbol, 'interval': interval, 'error': str(e)}
+
+        logger.info(f"Training run {version} finished in {time.perf_counter() - start:.1f} s")
+        return [results[job] for job in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel training over (symbol, interval) jobs")
+    parser.add_argument('--symbols', nargs='+', default=['BTC-USD'])
+    parser.add_argument('--intervals', nargs='+', default=['5m'])
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None, help="threads per worker")
+    parser.add_argument('--offline', action='store_true', help="train from the local OHLCV store only")
+    args = parser.parse_args()
+
+    orchestrator = TrainingOrchestrator(workers=args.workers, threads_per_worker=args.threads)
+    jobs = [(symbol, interval) for symbol in args.symbols for interval in args.intervals]
+    for result in orchestrator.run(jobs, period=args.period, offline=args.offline):
+        status = result.get('error') or f"{result['elapsed']:.1f} s"
+        print(f"{result['symbol']:12s} {result['interval']:4s} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Последовательности для LSTM/CNN без копирования матрицы фичей
+
+sliding_sequences возвращает окна как представление (stride tricks) над
+матрицей фичей, а SequenceBatches отдает их батчами по требованию, так что
+в памяти одновременно находится только один батч окон, а не все
+(n, sequence_length, n_features).
+"""
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_sequences(X, y, sequence_length=50):
+    """Windows X[i - sequence_length:i] with labels y[i], for i >= sequence_length
+
+    Both results are read-only views over X and y: (n - sequence_length,
+    sequence_length, n_features) and (n - sequence_length,).
+    """
+    if len(X) <= sequence_length:
+        return np.empty((0, sequence_length, X.shape[1]), dtype=X.dtype), y[:0]
+    # sliding_window_view puts the window axis last: (windows, features, length)
+    windows = sliding_window_view(X, sequence_length, axis=0)[:-1]
+    return windows.transpose(0, 2, 1), y[sequence_length:]
+
+
+class SequenceBatches:
+    """Lazy batch feeder over sliding windows (keras.utils.Sequence protocol)
+
+    start / stop select a contiguous range of windows (train / validation /
+    test split without copies); each batch is materialized only in __getitem__.
+    scaler (fitted StandardScaler) is applied per batch when the windows
+    are views over unscaled features, e.g. the memory-mapped feature store.
+    """
+
+    def __init__(self, sequences, labels, batch_size=32, start=0, stop=None, shuffle=False, seed=42,
+                 scaler=None):
+        super().__init__()
+        self.sequences = sequences
+        self.labels = labels
+        self.scaler = scaler
+        self.batch_size = batch_size
+        self.indices = np.arange(start, len(sequences) if stop is None else stop)
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        if shuffle:
+            self._rng.shuffle(self.indices)
+
+    def __len__(self):
+        return math.ceil(len(self.indices) / self.batch_size)
+
+    def __getitem__(self, index):
+        batch = self.indices[index * self.batch_size:(index + 1) * self.batch_size]
+        if not self.shuffle:
+            # Contiguous range: slice the view, then copy just this batch
+            batch = slice(batch[0], batch[-1] + 1)
+        windows = np.ascontiguousarray(self.sequences[batch], dtype=np.float32)
+        if self.scaler is not None:
+            shape = windows.shape
+            windows = self.scaler.transform(windows.reshape(-1, shape[-1])).astype(np.float32).reshape(shape)
+        return windows, np.asarray(self.labels[batch])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self.indices)
@@ -1,187 +1,158 @@
+import re
+import time
 import numpy as np
 import pandas as pd
 import yfinance as yf
 import ccxt
 from datetime import datetime, timedelta
-import talib
+# Общий с сервисом конвейер фичей; запуск из корня репозитория: python -m models.train_model
+from app.ml.feature_pipeline import feature_pipeline
+from app.utils.config import config
+from models.ensemble import CLASSES, ESTIMATORS, incremental_members, train_voting_ensemble, voting_from_fitted
+from models.feature_store import feature_store
+from models.ohlcv_store import ohlcv_store
+from models.sequences import SequenceBatches, sliding_sequences
+from models.validation import evaluate_folds
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.svm import SVC
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout, Conv1D, MaxPooling1D, Flatten
 from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.utils import Sequence
 import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+class KerasSequenceBatches(SequenceBatches, Sequence):
+    """SequenceBatches accepted by model.fit / model.evaluate"""
+
+
 class ModelTrainer:
     def __init__(self):
         self.data = None
         self.features = None
         self.labels = None
         self.scaler = StandardScaler()
+        self.ensemble_report = None
+        # Scaler applied per batch when sequences are views over unscaled features
+        self.sequence_scaler = None
         
-    def fetch_data(self, symbol='BTC-USD', period='2y', interval='5m'):
-        """Fetch historical data from Yahoo Finance"""
-        print(f"Fetching data for {symbol}...")
+    def fetch_data(self, symbol='BTC-USD', period='2y', interval='5m', offline=False):
+        """Load candles from the local OHLCV store, downloading only the missing tail"""
+        start = datetime.utcnow() - self._period_delta(period)
         
-        try:
-            # Try Yahoo Finance first
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period, interval=interval)
-            
-            if df.empty:
-                # Fallback to Binance via ccxt
-                exchange = ccxt.binance()
-                since = exchange.parse8601((datetime.now() - timedelta(days=730)).isoformat())
-                ohlcv = exchange.fetch_ohlcv(symbol.replace('-', '/'), interval, since)
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-            
-            print(f"Fetched {len(df)} candles")
+        if not offline:
+            self.update_store(symbol, period, interval)
+        
+        df = ohlcv_store.load(symbol, interval, start=start)
+        if not df.empty:
+            print(f"Loaded {len(df)} candles for {symbol} {interval}")
             return df
-            
+        
+        # Generate synthetic data for testing
+        print("Generating synthetic data...")
+        dates = pd.date_range(end=datetime.now(), periods=10000, freq='5min')
+        np.random.seed(42)
+        prices = np.cumsum(np.random.randn(10000) * 0.001) + 100
+        df = pd.DataFrame({
+            'open': prices + np.random.randn(10000) * 0.1,
+            'high': prices + np.abs(np.random.randn(10000) * 0.2),
+            'low': prices - np.abs(np.random.randn(10000) * 0.2),
+            'close': prices,
+            'volume': np.random.randint(1000, 10000, 10000)
+        }, index=dates)
+        
+        return df
+    
+    def update_store(self, symbol='BTC-USD', period='2y', interval='5m'):
+        """Download the candles missing from the local OHLCV store"""
+        start = datetime.utcnow() - self._period_delta(period)
+        try:
+            ohlcv_store.update(symbol, interval, lambda since: self._download(symbol, interval, since), start)
         except Exception as e:
             print(f"Error fetching data: {e}")
-            
-            # Generate synthetic data for testing
-            print("Generating synthetic data...")
-            dates = pd.date_range(end=datetime.now(), periods=10000, freq='5min')
-            np.random.seed(42)
-            prices = np.cumsum(np.random.randn(10000) * 0.001) + 100
-            df = pd.DataFrame({
-                'open': prices + np.random.randn(10000) * 0.1,
-                'high': prices + np.abs(np.random.randn(10000) * 0.2),
-                'low': prices - np.abs(np.random.randn(10000) * 0.2),
-                'close': prices,
-                'volume': np.random.randint(1000, 10000, 10000)
-            }, index=dates)
-            
+    
+    @staticmethod
+    def _period_delta(period):
+        """yfinance-style period ('60d', '2wk', '6mo', '2y') as a timedelta"""
+        match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+        if match is None:
+            raise ValueError(f"Unsupported period: {period}")
+        days = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}[match.group(2)]
+        return timedelta(days=int(match.group(1)) * days)
+    
+    def _download(self, symbol, interval, since):
+        """Candles from `since` on: Yahoo Finance first, then Binance via ccxt"""
+        print(f"Fetching data for {symbol} since {since}...")
+        
+        ticker = yf.Ticker(symbol)
+        df = ticker.history(start=since, interval=interval)
+        if not df.empty:
             return df
+        
+        # Fallback to Binance via ccxt, page by page
+        exchange = ccxt.binance()
+        since_ms = exchange.parse8601(pd.Timestamp(since).isoformat() + 'Z')
+        ohlcv = []
+        while True:
+            page = exchange.fetch_ohlcv(symbol.replace('-', '/'), interval, since_ms, limit=1000)
+            ohlcv.extend(page)
+            if len(page) < 1000:
+                break
+            since_ms = page[-1][0] + 1
+        
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df.set_index('timestamp')
     
     def create_features(self, df):
         """Create technical indicators and features"""
         print("Creating features...")
         
-        # Basic price features
-        df['returns'] = df['close'].pct_change()
-        df['log_returns'] = np.log(df['close'] / df['close'].shift(1))
-        
-        # Volatility
-        df['volatility'] = df['returns'].rolling(window=20).std()
-        
-        # Moving averages
-        df['sma_10'] = talib.SMA(df['close'], timeperiod=10)
-        df['sma_20'] = talib.SMA(df['close'], timeperiod=20)
-        df['sma_50'] = talib.SMA(df['close'], timeperiod=50)
-        df['ema_12'] = talib.EMA(df['close'], timeperiod=12)
-        df['ema_26'] = talib.EMA(df['close'], timeperiod=26)
-        
-        # RSI
-        df['rsi'] = talib.RSI(df['close'], timeperiod=14)
-        
-        # MACD
-        macd, macd_signal, macd_hist = talib.MACD(df['close'])
-        df['macd'] = macd
-        df['macd_signal'] = macd_signal
-        df['macd_hist'] = macd_hist
-        
-        # Bollinger Bands
-        upper, middle, lower = talib.BBANDS(df['close'])
-        df['bb_upper'] = upper
-        df['bb_middle'] = middle
-        df['bb_lower'] = lower
-        df['bb_width'] = (upper - lower) / middle
-        df['bb_position'] = (df['close'] - lower) / (upper - lower)
-        
-        # Stochastic
-        slowk, slowd = talib.STOCH(df['high'], df['low'], df['close'])
-        df['stoch_k'] = slowk
-        df['stoch_d'] = slowd
-        
-        # ATR
-        df['atr'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
-        
-        # Volume indicators
-        df['volume_sma'] = talib.SMA(df['volume'], timeperiod=20)
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-        
-        # Price patterns (simplified)
-        df['is_hammer'] = self._detect_hammer(df)
-        df['is_doji'] = self._detect_doji(df)
+        # Feature columns from the shared pipeline (same code as in the service)
+        features = feature_pipeline.transform_frame(df)
+        df = df.join(features)
         
         # Target variable: future price movement (1 = up, 0 = down)
         df['target'] = (df['close'].shift(-5) > df['close']).astype(int)
         
-        # Drop NaN values
-        df = df.dropna()
+        # Drop indicator warm-up rows; raw columns may be NaN (no volume in the source)
+        df = df.dropna(subset=feature_pipeline.names)
         
-        print(f"Created {len(df.columns)} features")
+        print(f"Created {len(features.columns)} features")
         return df
     
-    def _detect_hammer(self, df):
-        """Detect hammer candlestick pattern"""
-        body = abs(df['close'] - df['open'])
-        lower_shadow = df[['open', 'close']].min(axis=1) - df['low']
-        upper_shadow = df['high'] - df[['open', 'close']].max(axis=1)
-        
-        is_hammer = (
-            (lower_shadow > 2 * body) & 
-            (upper_shadow < body * 0.3) &
-            (df['close'] > df['open'])  # Bullish hammer
-        )
-        
-        return is_hammer.astype(int)
-    
-    def _detect_doji(self, df):
-        """Detect doji candlestick pattern"""
-        body = abs(df['close'] - df['open'])
-        total_range = df['high'] - df['low']
-        
-        is_doji = (body / total_range < 0.1) & (total_range > 0)
-        
-        return is_doji.astype(int)
-    
     def prepare_data(self, df, sequence_length=50):
         """Prepare data for ML models"""
         print("Preparing data...")
         
-        # Feature columns
-        feature_cols = [
-            'returns', 'volatility', 'rsi', 'macd', 'macd_hist',
-            'bb_position', 'bb_width', 'stoch_k', 'atr',
-            'volume_ratio', 'is_hammer', 'is_doji'
-        ]
-        
-        # Ensure all columns exist
-        available_cols = [col for col in feature_cols if col in df.columns]
-        
-        # Feature matrix
-        X = df[available_cols].values
+        # Feature matrix (columns declared in app.ml.feature_pipeline.FEATURES)
+        X = df[feature_pipeline.names].values
         
         # Target
         y = df['target'].values
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Create sequences for LSTM
-        X_sequences = []
-        y_sequences = []
+        # Scale features (float32: the dtype the Keras models train in)
+        X_scaled = self.scaler.fit_transform(X).astype(np.float32)
         
-        for i in range(sequence_length, len(X_scaled)):
-            X_sequences.append(X_scaled[i-sequence_length:i])
-            y_sequences.append(y[i])
-        
-        X_sequences = np.array(X_sequences)
-        y_sequences = np.array(y_sequences)
+        # Sequences for LSTM/CNN: zero-copy windows over X_scaled
+        X_sequences, y_sequences = sliding_sequences(X_scaled, y, sequence_length)
         
         print(f"Created {len(X_sequences)} sequences")
         return X_sequences, y_sequences, X_scaled, y
     
-    def train_ensemble_model(self, X, y):
+    def _sequence_batches(self, X_sequences, y_sequences, batch_size=32):
+        """Lazy train / validation / test feeders (80/20 split, last 10% of train for validation)"""
+        split_idx = int(len(X_sequences) * 0.8)
+        val_idx = split_idx - int(split_idx * 0.1)
+        scaler = self.sequence_scaler
+        return (
+            KerasSequenceBatches(X_sequences, y_sequences, batch_size, stop=val_idx, shuffle=True, scaler=scaler),
+            KerasSequenceBatches(X_sequences, y_sequences, batch_size, start=val_idx, stop=split_idx, scaler=scaler),
+            KerasSequenceBatches(X_sequences, y_sequences, batch_size, start=split_idx, scaler=scaler)
+        )
+    
+    def train_ensemble_model(self, X, y, members=None):
         """Train ensemble model"""
         print("Training ensemble model...")
         
@@ -190,65 +161,81 @@ class ModelTrainer:
             X, y, test_size=0.2, random_state=42, shuffle=False
         )
         
-        # Random Forest
-        rf = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
-            n_jobs=-1
-        )
-        rf.fit(X_train, y_train)
-        rf_score = rf.score(X_test, y_test)
-        print(f"Random Forest accuracy: {rf_score:.4f}")
-        
-        # Gradient Boosting
-        gb = GradientBoostingClassifier(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
-        )
-        gb.fit(X_train, y_train)
-        gb_score = gb.score(X_test, y_test)
-        print(f"Gradient Boosting accuracy: {gb_score:.4f}")
-        
-        # Support Vector Machine
-        svm = SVC(probability=True, random_state=42)
-        svm.fit(X_train, y_train)
-        svm_score = svm.score(X_test, y_test)
-        print(f"SVM accuracy: {svm_score:.4f}")
-        
-        # Ensemble voting (simple average)
-        from sklearn.ensemble import VotingClassifier
-        
-        ensemble = VotingClassifier(
-            estimators=[
-                ('rf', rf),
-                ('gb', gb),
-                ('svm', svm)
-            ],
-            voting='soft'
-        )
-        ensemble.fit(X_train, y_train)
+        # Members are fitted once, in parallel; the voting ensemble reuses them
+        ensemble, stats = train_voting_ensemble(X_train, y_train, members=members, n_jobs=config.ENSEMBLE_JOBS)
+        for name, estimator in ensemble.named_estimators_.items():
+            stats[name]['accuracy'] = estimator.score(X_test, y_test)
+            print(f"{name:6s} accuracy: {stats[name]['accuracy']:.4f}, "
+                  f"fit {stats[name]['fit_time']:.1f} s, peak {stats[name]['peak_mb']:.1f} MB")
+        
         ensemble_score = ensemble.score(X_test, y_test)
         print(f"Ensemble accuracy: {ensemble_score:.4f}")
         
+        self.ensemble_report = {'members': stats, 'accuracy': ensemble_score}
+        return ensemble
+    
+    def train_incremental_ensemble(self, X, y, split_idx, members=None, epochs=3, batch_size=8192):
+        """Ensemble of partial_fit members trained batch by batch from the feature store memmap"""
+        print("Training incremental ensemble...")
+        
+        fitted = [(name, ESTIMATORS[name](1)) for name in incremental_members(members)]
+        fit_time = {name: 0.0 for name, _ in fitted}
+        for epoch in range(epochs):
+            for X_batch, y_batch in feature_store.batches(X, y, self.scaler, batch_size, stop=split_idx,
+                                                           shuffle=True, seed=epoch):
+                for name, estimator in fitted:
+                    start = time.perf_counter()
+                    estimator.partial_fit(X_batch, y_batch, classes=CLASSES)
+                    fit_time[name] += time.perf_counter() - start
+        
+        ensemble = voting_from_fitted(fitted, CLASSES)
+        
+        # Evaluate on the held-out tail, batch by batch
+        correct = {name: 0 for name in ['ensemble'] + list(fit_time)}
+        for X_batch, y_batch in feature_store.batches(X, y, self.scaler, batch_size, start=split_idx):
+            correct['ensemble'] += int((ensemble.predict(X_batch) == y_batch).sum())
+            for name, estimator in fitted:
+                correct[name] += int((estimator.predict(X_batch) == y_batch).sum())
+        
+        test_rows = max(len(X) - split_idx, 1)
+        stats = {name: {'fit_time': fit_time[name], 'accuracy': correct[name] / test_rows} for name in fit_time}
+        for name, member in stats.items():
+            print(f"{name:6s} accuracy: {member['accuracy']:.4f}, fit {member['fit_time']:.1f} s")
+        print(f"Ensemble accuracy: {correct['ensemble'] / test_rows:.4f}")
+        
+        self.ensemble_report = {'members': stats, 'accuracy': correct['ensemble'] / test_rows}
         return ensemble
     
+    def evaluate_folds(self, X, y, close, scheme='walk_forward', n_folds=5, members=None):
+        """Walk-forward / purged k-fold evaluation of the ensemble, folds in parallel
+        
+        X is the unscaled feature matrix: each fold fits its scaler on its training rows.
+        """
+        print(f"Evaluating ensemble ({scheme}, {n_folds} folds)...")
+        
+        # Purge as many rows as the target looks ahead (close.shift(-5))
+        report = evaluate_folds(X, y, close, scheme=scheme, n_folds=n_folds, purge=5,
+                                members=members, n_jobs=config.ENSEMBLE_JOBS)
+        
+        rows = [(f"fold {fold['fold']}", fold) for fold in report['folds']]
+        rows += [('overall', report['overall'])] + list(report['regimes'].items())
+        for name, metrics in rows:
+            hit_rate = f"{metrics['hit_rate']:.4f}" if metrics.get('hit_rate') is not None else '-'
+            print(f"{name:16s} rows {metrics['rows']:7d}  accuracy {metrics['accuracy']:.4f}  "
+                  f"log-loss {metrics['log_loss']:.4f}  hit rate {hit_rate}")
+        
+        return report
+    
     def train_lstm_model(self, X_sequences, y_sequences):
         """Train LSTM model"""
         print("Training LSTM model...")
         
-        # Split data
-        split_idx = int(len(X_sequences) * 0.8)
-        X_train_seq = X_sequences[:split_idx]
-        X_test_seq = X_sequences[split_idx:]
-        y_train_seq = y_sequences[:split_idx]
-        y_test_seq = y_sequences[split_idx:]
+        # Split data (batches are built lazily from the window views)
+        train_batches, val_batches, test_batches = self._sequence_batches(X_sequences, y_sequences)
         
         # Build LSTM model
         model = Sequential([
-            LSTM(50, return_sequences=True, input_shape=(X_train_seq.shape[1], X_train_seq.shape[2])),
+            LSTM(50, return_sequences=True, input_shape=X_sequences.shape[1:]),
             Dropout(0.2),
             LSTM(50, return_sequences=False),
             Dropout(0.2),
@@ -264,15 +251,14 @@ class ModelTrainer:
         
         # Train
         history = model.fit(
-            X_train_seq, y_train_seq,
+            train_batches,
+            validation_data=val_batches,
             epochs=20,
-            batch_size=32,
-            validation_split=0.1,
             verbose=1
         )
         
         # Evaluate
-        loss, accuracy = model.evaluate(X_test_seq, y_test_seq, verbose=0)
+        loss, accuracy = model.evaluate(test_batches, verbose=0)
         print(f"LSTM accuracy: {accuracy:.4f}")
         
         return model
@@ -281,16 +267,12 @@ class ModelTrainer:
         """Train 1D CNN model"""
         print("Training CNN model...")
         
-        # Split data
-        split_idx = int(len(X_sequences) * 0.8)
-        X_train_seq = X_sequences[:split_idx]
-        X_test_seq = X_sequences[split_idx:]
-        y_train_seq = y_sequences[:split_idx]
-        y_test_seq = y_sequences[split_idx:]
+        # Split data (batches are built lazily from the window views)
+        train_batches, val_batches, test_batches = self._sequence_batches(X_sequences, y_sequences)
         
         # Build CNN model
         model = Sequential([
-            Conv1D(filters=64, kernel_size=3, activation='relu', input_shape=(X_train_seq.shape[1], X_train_seq.shape[2])),
+            Conv1D(filters=64, kernel_size=3, activation='relu', input_shape=X_sequences.shape[1:]),
             MaxPooling1D(pool_size=2),
             Conv1D(filters=32, kernel_size=3, activation='relu'),
             MaxPooling1D(pool_size=2),
@@ -308,60 +290,137 @@ class ModelTrainer:
         
         # Train
         history = model.fit(
-            X_train_seq, y_train_seq,
+            train_batches,
+            validation_data=val_batches,
             epochs=15,
-            batch_size=32,
-            validation_split=0.1,
             verbose=1
         )
         
         # Evaluate
-        loss, accuracy = model.evaluate(X_test_seq, y_test_seq, verbose=0)
+        loss, accuracy = model.evaluate(test_batches, verbose=0)
         print(f"CNN accuracy: {accuracy:.4f}")
         
         return model
     
-    def save_models(self, ensemble_model, lstm_model, cnn_model):
+    def save_models(self, ensemble_model, lstm_model, cnn_model, output_dir='models'):
         """Save trained models"""
         import os
-        os.makedirs('models', exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         
         # Save ensemble model
-        joblib.dump(ensemble_model, 'models/price_predictor.pkl')
+        joblib.dump(ensemble_model, os.path.join(output_dir, 'price_predictor.pkl'))
         
         # Save scaler
-        joblib.dump(self.scaler, 'models/scaler.pkl')
+        joblib.dump(self.scaler, os.path.join(output_dir, 'scaler.pkl'))
         
         # Save LSTM model
-        lstm_model.save('models/lstm_model.h5')
+        lstm_model.save(os.path.join(output_dir, 'lstm_model.h5'))
         
         # Save CNN model
-        cnn_model.save('models/candle_cnn.h5')
+        cnn_model.save(os.path.join(output_dir, 'candle_cnn.h5'))
         
         print("Models saved successfully!")
     
-    def train_all(self):
-        """Train all models"""
+    def train_all(self, symbol='BTC-USD', interval='5m', period='2y', output_dir='models', offline=False,
+                  validation=None):
+        """Train all models; returns stage timings in seconds and dataset sizes
+        
+        validation - 'walk_forward' or 'purged_kfold' to also evaluate the
+        ensemble across time folds (report included in the result).
+        """
         print("Starting model training...")
+        timings = {}
         
         # Fetch data
-        df = self.fetch_data()
+        start = time.perf_counter()
+        df = self.fetch_data(symbol=symbol, period=period, interval=interval, offline=offline)
+        timings['fetch'] = time.perf_counter() - start
         
         # Create features
+        start = time.perf_counter()
         df = self.create_features(df)
         
         # Prepare data
         X_sequences, y_sequences, X, y = self.prepare_data(df)
+        timings['features'] = time.perf_counter() - start
+        
+        # Evaluate across time folds
+        validation_report = None
+        if validation:
+            start = time.perf_counter()
+            # Unscaled features: self.scaler has seen every fold's test rows
+            validation_report = self.evaluate_folds(df[feature_pipeline.names].values, y, df['close'].values,
+                                                    scheme=validation)
+            timings['validation'] = time.perf_counter() - start
         
         # Train models
+        start = time.perf_counter()
         ensemble_model = self.train_ensemble_model(X, y)
+        timings['ensemble'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        lstm_model = self.train_lstm_model(X_sequences, y_sequences)
+        timings['lstm'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        cnn_model = self.train_cnn_model(X_sequences, y_sequences)
+        timings['cnn'] = time.perf_counter() - start
+        
+        # Save models
+        self.save_models(ensemble_model, lstm_model, cnn_model, output_dir)
+        
+        print("Training completed!")
+        return {'rows': len(X), 'sequences': len(X_sequences), 'timings': timings,
+                'ensemble': self.ensemble_report, 'validation': validation_report}
+
+    def train_from_feature_store(self, symbol='BTC-USD', interval='5m', period='2y', output_dir='models',
+                                 offline=False, members=None, epochs=3, batch_size=8192):
+        """Out-of-core train_all: features, scaling and batches come from the memory-mapped feature store
+        
+        Memory stays bounded by FEATURE_CHUNK_ROWS / batch_size instead of the
+        history length; features already in the store are reused.
+        """
+        print("Starting out-of-core model training...")
+        timings = {}
+        
+        # Fetch the missing candles, then only the missing features
+        start = time.perf_counter()
+        if not offline:
+            self.update_store(symbol, period, interval)
+        timings['fetch'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        feature_store.update(symbol, interval)
+        X, y, _ = feature_store.load(symbol, interval)
+        split_idx = int(len(X) * 0.8)
+        
+        # Streaming statistics on the training part only
+        self.scaler = feature_store.fit_scaler(X, stop=split_idx)
+        timings['features'] = time.perf_counter() - start
+        
+        # Train models
+        start = time.perf_counter()
+        ensemble_model = self.train_incremental_ensemble(X, y, split_idx, members, epochs, batch_size)
+        timings['ensemble'] = time.perf_counter() - start
+        
+        # Sequences: windows over the memmap, scaled batch by batch
+        X_sequences, y_sequences = sliding_sequences(X, y)
+        self.sequence_scaler = self.scaler
+        
+        start = time.perf_counter()
         lstm_model = self.train_lstm_model(X_sequences, y_sequences)
+        timings['lstm'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
         cnn_model = self.train_cnn_model(X_sequences, y_sequences)
+        timings['cnn'] = time.perf_counter() - start
         
         # Save models
-        self.save_models(ensemble_model, lstm_model, cnn_model)
+        self.save_models(ensemble_model, lstm_model, cnn_model, output_dir)
         
         print("Training completed!")
+        return {'rows': len(X), 'sequences': len(X_sequences), 'timings': timings,
+                'ensemble': self.ensemble_report, 'feature_set': feature_store.pipeline.version}
 
 if __name__ == "__main__":
     trainer = ModelTrainer()
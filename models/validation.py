@@ -0,0 +1,169 @@
+"""
+Валидация во времени: walk-forward и purged k-fold с параллельными фолдами
+
+Фолды задаются срезами (slice) по общей матрице фичей - без копий. Матрица
+и метки один раз сохраняются в .npy и открываются как np.memmap, так что
+воркеры joblib читают один и тот же файл вместо копий в каждом процессе.
+Метрики: accuracy, log-loss и hit rate (точность уверенных сигналов) по
+фолдам и по рыночным режимам (тренд x волатильность).
+"""
+import os
+import tempfile
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.preprocessing import StandardScaler
+from models.ensemble import train_voting_ensemble
+
+SCHEMES = ('walk_forward', 'purged_kfold')
+
+# Режимы рынка: направление тренда x терциль волатильности
+REGIME_NAMES = np.array([
+    f'{trend}_{volatility}_vol'
+    for trend in ('down', 'up')
+    for volatility in ('low', 'mid', 'high')
+])
+
+
+def walk_forward_folds(n_rows, n_folds=5, purge=5, expanding=True):
+    """Test blocks in time order, each trained only on earlier rows
+
+    The first block (1 / (n_folds + 1) of the rows) is training only.
+    `purge` rows before every test block are dropped from training: their
+    labels look `purge` rows ahead into the test block. Returns a list of
+    (train_slices, test_slice).
+    """
+    block = n_rows // (n_folds + 1)
+    folds = []
+    for k in range(1, n_folds + 1):
+        test_start = k * block
+        test_stop = n_rows if k == n_folds else test_start + block
+        train_start = 0 if expanding else test_start - block
+        folds.append(((slice(train_start, max(train_start, test_start - purge)),),
+                      slice(test_start, test_stop)))
+    return folds
+
+
+def purged_kfold_folds(n_rows, n_folds=5, purge=5, embargo=0):
+    """K contiguous test blocks; training uses the rows on both sides
+
+    `purge` rows before a test block and `purge + embargo` rows after it
+    are left out of training, so no training label overlaps the test window.
+    """
+    bounds = np.linspace(0, n_rows, n_folds + 1).astype(int)
+    folds = []
+    for test_start, test_stop in zip(bounds[:-1], bounds[1:]):
+        train = []
+        if test_start - purge > 0:
+            train.append(slice(0, test_start - purge))
+        if test_stop + purge + embargo < n_rows:
+            train.append(slice(test_stop + purge + embargo, n_rows))
+        folds.append((tuple(train), slice(int(test_start), int(test_stop))))
+    return folds
+
+
+def market_regimes(close, window=50):
+    """Regime code per row (index into REGIME_NAMES) from trailing trend and volatility"""
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.zeros(len(close))
+    returns[1:] = np.diff(close) / close[:-1]
+
+    csum = np.cumsum(np.concatenate(([0.0], returns)))
+    csum2 = np.cumsum(np.concatenate(([0.0], returns * returns)))
+    counts = np.minimum(np.arange(1, len(close) + 1), window)
+    lo = np.arange(len(close)) + 1 - counts
+    hi = np.arange(len(close)) + 1
+    mean = (csum[hi] - csum[lo]) / counts
+    volatility = np.sqrt(np.maximum((csum2[hi] - csum2[lo]) / counts - mean * mean, 0.0))
+
+    tertiles = np.quantile(volatility, [1 / 3, 2 / 3])
+    return (mean > 0).astype(np.int8) * 3 + np.searchsorted(tertiles, volatility).astype(np.int8)
+
+
+def fold_metrics(y_true, proba, confidence=0.05):
+    """accuracy, log-loss and hit rate (accuracy where |p - 0.5| >= confidence)"""
+    if len(y_true) == 0:
+        return {'rows': 0}
+    predicted = (proba >= 0.5).astype(int)
+    confident = np.abs(proba - 0.5) >= confidence
+    return {
+        'rows': int(len(y_true)),
+        'accuracy': float(accuracy_score(y_true, predicted)),
+        'log_loss': float(log_loss(y_true, np.clip(proba, 1e-7, 1 - 1e-7), labels=[0, 1])),
+        'hit_rate': float(np.mean(predicted[confident] == y_true[confident])) if confident.any() else None,
+        'coverage': float(confident.mean())
+    }
+
+
+def _evaluate_fold(X, y, train, test, members, scale=True):
+    """Runs in a joblib worker: X and y arrive as memmaps of the shared files
+
+    With scale=True the features are standardized by a scaler fitted on
+    the fold's training rows only, so test-fold statistics never leak.
+    """
+    if len(train) == 1:
+        X_train, y_train = X[train[0]], y[train[0]]
+    else:
+        X_train = np.concatenate([X[part] for part in train])
+        y_train = np.concatenate([y[part] for part in train])
+    X_test = X[test]
+    if scale:
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    model, _ = train_voting_ensemble(X_train, y_train, members=members, n_jobs=1)
+    return model.predict_proba(X_test)[:, 1]
+
+
+def evaluate_folds(X, y, close, scheme='walk_forward', n_folds=5, purge=5, members=None,
+                   n_jobs=-1, confidence=0.05, scale=True):
+    """Fit and score the ensemble on every fold in parallel; returns the report dict
+
+    X holds unscaled features: with scale=True every fold fits its own
+    StandardScaler on its training rows.
+    """
+    if scheme == 'walk_forward':
+        folds = walk_forward_folds(len(X), n_folds, purge)
+    elif scheme == 'purged_kfold':
+        folds = purged_kfold_folds(len(X), n_folds, purge)
+    else:
+        raise ValueError(f"Unknown validation scheme: {scheme}, available: {', '.join(SCHEMES)}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Общие для всех воркеров файлы: фолды читают срезы memmap
+        np.save(os.path.join(folder, 'X.npy'), np.asarray(X))
+        np.save(os.path.join(folder, 'y.npy'), np.asarray(y))
+        X_shared = np.load(os.path.join(folder, 'X.npy'), mmap_mode='r')
+        y_shared = np.load(os.path.join(folder, 'y.npy'), mmap_mode='r')
+
+        probas = Parallel(n_jobs=min(n_jobs, len(folds)) if n_jobs > 0 else n_jobs)(
+            delayed(_evaluate_fold)(X_shared, y_shared, train, test, members, scale)
+            for train, test in folds
+        )
+        del X_shared, y_shared
+
+    y = np.asarray(y)
+    regimes = market_regimes(close)
+    fold_reports = []
+    tested = []
+    for k, ((train, test), proba) in enumerate(zip(folds, probas)):
+        report = fold_metrics(y[test], proba, confidence)
+        report.update(fold=k, train_rows=sum(part.stop - part.start for part in train),
+                      test_start=test.start, test_stop=test.stop)
+        fold_reports.append(report)
+        tested.append(np.arange(test.start, test.stop))
+
+    # Out-of-fold predictions grouped by regime
+    tested = np.concatenate(tested)
+    oof_proba = np.concatenate(probas)
+    by_regime = {}
+    for code, name in enumerate(REGIME_NAMES):
+        mask = regimes[tested] == code
+        if mask.any():
+            by_regime[str(name)] = fold_metrics(y[tested][mask], oof_proba[mask], confidence)
+
+    return {
+        'scheme': scheme,
+        'folds': fold_reports,
+        'overall': fold_metrics(y[tested], oof_proba, confidence),
+        'regimes': by_regime
+    }
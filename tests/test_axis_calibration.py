@@ -0,0 +1,56 @@
+"""
+Калибровка ценовой оси с OCR: синтетический график с подписанными делениями
+
+Тесты требуют pytesseract и бинарник tesseract (tesseract-ocr в Docker-образе)
+и пропускаются без них.
+"""
+import shutil
+import cv2
+import numpy as np
+import pytest
+from app.ml import axis_calibration
+from app.ml.axis_calibration import PriceAxisCalibrator
+from app.ml.candles import empty_candles
+
+pytestmark = pytest.mark.skipif(
+    axis_calibration.pytesseract is None or shutil.which('tesseract') is None,
+    reason="OCR (pytesseract + tesseract) is not installed"
+)
+
+WIDTH, HEIGHT, PLOT_RIGHT = 800, 600, 680
+# Метки оси: (строка кадра, цена)
+TICKS = [(100, 110.0), (200, 108.0), (300, 106.0), (400, 104.0), (500, 102.0)]
+
+
+def make_frame():
+    """White chart with grid lines in the plot and price labels on the right axis"""
+    frame = np.full((HEIGHT, WIDTH, 3), 255, dtype=np.uint8)
+    for row, price in TICKS:
+        cv2.line(frame, (0, row), (PLOT_RIGHT - 1, row), (200, 200, 200), 1)
+        cv2.putText(frame, f"{price:.2f}", (PLOT_RIGHT + 10, row + 8), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6, (0, 0, 0), 2, cv2.LINE_AA)
+    return frame
+
+
+def test_calibrate_reads_axis_labels():
+    calibration = PriceAxisCalibrator().calibrate(make_frame(), roi=(0, 0, PLOT_RIGHT, HEIGHT))
+
+    assert calibration is not None
+    rows = np.array([row for row, _ in TICKS])
+    prices = np.array([price for _, price in TICKS])
+    np.testing.assert_allclose(calibration.to_price(rows), prices, atol=0.1)
+
+
+def test_calibration_converts_candles_to_prices():
+    calibration = PriceAxisCalibrator().calibrate(make_frame(), roi=(0, 0, PLOT_RIGHT, HEIGHT))
+    assert calibration is not None
+
+    # Plot units: 0 at the bottom, 1 at the top of the plot area
+    candles = empty_candles(1)
+    candles['open'], candles['high'], candles['low'], candles['close'] = 0.5, 0.75, 0.25, 0.5
+    calibration.apply(candles, plot_top=0, plot_height=HEIGHT)
+
+    expected_mid = calibration.to_price(HEIGHT / 2)
+    assert candles['close'][0] == pytest.approx(expected_mid)
+    assert 105.0 < candles['close'][0] < 107.0
+    assert candles['high'][0] > candles['close'][0] > candles['low'][0]
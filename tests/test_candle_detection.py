@@ -0,0 +1,39 @@
+"""
+Детекция свечей по связным компонентам совпадает с прежним циклом по контурам
+"""
+import cv2
+import numpy as np
+from app.ml.candles import color_names
+from app.ml.image_processor import ImageProcessor
+from benchmarks.bench_candle_detection import detect_candles_contours, make_noisy_chart
+
+
+def detect_both(color_image):
+    processor = ImageProcessor()
+    gray_image = cv2.cvtColor(color_image, cv2.COLOR_RGB2GRAY)
+    return (processor.detect_candles(gray_image, color_image),
+            detect_candles_contours(processor, gray_image, color_image))
+
+
+def test_components_match_contours_on_noisy_chart():
+    candles, reference = detect_both(make_noisy_chart(width=640, height=360, n_candles=20, n_specks=2000, seed=1))
+
+    assert len(candles) == len(reference) > 0
+    boxes = np.stack([candles['x'], candles['y'], candles['width'], candles['height']], axis=1)
+    expected = np.array([[c['x'], c['y'], c['width'], c['height']] for c in reference])
+    np.testing.assert_array_equal(boxes, expected)
+    assert list(color_names(candles)) == [c['color'] for c in reference]
+
+
+def test_colors_and_filters():
+    image = np.full((200, 200, 3), 255, dtype=np.uint8)
+    cv2.rectangle(image, (20, 40), (26, 80), (0, 180, 0), -1)     # green candle
+    cv2.rectangle(image, (60, 50), (66, 100), (200, 0, 0), -1)    # red candle
+    cv2.rectangle(image, (100, 60), (140, 70), (0, 0, 0), -1)     # wide bar: not a candle
+    cv2.rectangle(image, (160, 60), (161, 62), (0, 0, 0), -1)     # speck: too small
+
+    candles, reference = detect_both(image)
+
+    assert list(candles['x']) == [20, 60]
+    assert list(color_names(candles)) == ['green', 'red']
+    assert [c['x'] for c in reference] == [20, 60]
@@ -0,0 +1,47 @@
+"""
+Паритет обучение/сервис: фичи окна свечей с графика против обучающих строк
+на тех же свечах
+
+Допуск - 1% стандартного отклонения колонки по обучающей матрице. volume_ratio
+не сравнивается: на графике нет объема, в сервисе колонка равна 1.0.
+"""
+import numpy as np
+from app.ml.feature_pipeline import WARMUP_CANDLES, feature_pipeline
+from benchmarks.bench_feature_pipeline import make_frame, to_candles
+
+TOLERANCE = 0.01
+COLUMNS = [i for i, name in enumerate(feature_pipeline.names) if name != 'volume_ratio']
+
+
+def window_errors(window):
+    """Max |serving - training| per column over windows ending at many candles, in column stds"""
+    df = make_frame(5_000, seed=1)
+    training = feature_pipeline.transform(df)
+    scale = np.nanstd(training, axis=0)
+    scale[scale == 0] = 1.0
+
+    errors = []
+    for end in range(1_000, len(df), 211):
+        served = feature_pipeline.transform(to_candles(df.iloc[end - window:end]))[-1]
+        errors.append(np.abs(served - training[end - 1]) / scale)
+    return np.max(errors, axis=0)[COLUMNS]
+
+
+def test_warmed_up_window_matches_training_rows():
+    errors = window_errors(WARMUP_CANDLES)
+
+    assert not np.isnan(errors).any()
+    assert errors.max() <= TOLERANCE, dict(zip(np.array(feature_pipeline.names)[COLUMNS], errors))
+
+
+def test_short_window_is_not_served():
+    df = make_frame(WARMUP_CANDLES, seed=2)
+
+    assert feature_pipeline.latest(to_candles(df.iloc[1:])) is None
+    row = feature_pipeline.latest(to_candles(df))
+    np.testing.assert_array_equal(row, feature_pipeline.transform(to_candles(df))[-1])
+
+
+def test_warm_up_is_needed():
+    # A 60-candle chart would skew the recursive indicators well past the tolerance
+    assert window_errors(60).max() > TOLERANCE
@@ -0,0 +1,110 @@
+"""
+Хранилище фичей: измененное тело фичи или вызываемого ею хелпера дает
+новую версию и пересчет
+"""
+import importlib
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from app.ml.feature_pipeline import FeaturePipeline
+from models.feature_store import FeatureStore
+from models.ohlcv_store import OHLCVStore
+
+SYMBOL, INTERVAL = 'BTC-USD', '1m'
+
+
+def price_feature(series):
+    return series.close / 100
+
+
+def changed_price_feature(series):
+    return series.close / 200
+
+
+# Та же декларация (имя функции, параметры), другое тело
+changed_price_feature.__name__ = price_feature.__name__
+
+
+# Модуль с фичей и приватным хелпером: меняется только хелпер
+HELPER_MODULE = """
+def _scale(close):
+    return close / {divisor}
+
+
+def scaled_price(series):
+    return _scale(series.close)
+"""
+
+
+@pytest.fixture
+def load_helper_module(tmp_path, monkeypatch):
+    """(Re)write and import the helper module; it stays importable like any feature module"""
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def load(divisor):
+        (tmp_path / 'helper_features.py').write_text(HELPER_MODULE.format(divisor=divisor))
+        monkeypatch.delitem(sys.modules, 'helper_features', raising=False)
+        importlib.invalidate_caches()
+        return importlib.import_module('helper_features')
+
+    yield load
+    sys.modules.pop('helper_features', None)
+
+
+def make_store(root, feature):
+    source = OHLCVStore(str(root / 'ohlcv'))
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, 500))
+    source.append(SYMBOL, INTERVAL, pd.DataFrame(
+        {'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close, 'volume': 1.0},
+        index=pd.date_range('2024-01-01', periods=len(close), freq='1min')
+    ))
+    pipeline = FeaturePipeline((('price', feature, {}),))
+    return FeatureStore(str(root / 'features'), pipeline=pipeline, source=source, chunk_rows=128)
+
+
+def test_changed_feature_body_changes_version(tmp_path):
+    store = make_store(tmp_path, price_feature)
+    changed = make_store(tmp_path, changed_price_feature)
+
+    assert store.pipeline.names == changed.pipeline.names
+    assert store.pipeline.version != changed.pipeline.version
+
+
+def test_changed_feature_body_invalidates_store(tmp_path):
+    store = make_store(tmp_path, price_feature)
+    assert store.update(SYMBOL, INTERVAL) > 0
+    X, _, _ = store.load(SYMBOL, INTERVAL)
+    stale = np.array(X)
+
+    changed = make_store(tmp_path, changed_price_feature)
+    assert changed.meta(SYMBOL, INTERVAL)['rows'] == 0
+    assert changed.update(SYMBOL, INTERVAL) == len(stale)
+
+    X, _, _ = changed.load(SYMBOL, INTERVAL)
+    np.testing.assert_allclose(np.asarray(X), stale / 2, rtol=1e-6)
+
+
+def test_changed_helper_invalidates_store(tmp_path, load_helper_module):
+    store = make_store(tmp_path, load_helper_module(100).scaled_price)
+    assert store.update(SYMBOL, INTERVAL) > 0
+    X, _, _ = store.load(SYMBOL, INTERVAL)
+    stale = np.array(X)
+
+    # A longer literal: the rewritten file must differ in size for the import caches
+    changed = make_store(tmp_path, load_helper_module('200.0').scaled_price)
+    assert store.pipeline.version != changed.pipeline.version
+    assert changed.meta(SYMBOL, INTERVAL)['rows'] == 0
+    assert changed.update(SYMBOL, INTERVAL) == len(stale)
+
+    X, _, _ = changed.load(SYMBOL, INTERVAL)
+    np.testing.assert_allclose(np.asarray(X), stale / 2, rtol=1e-6)
+
+
+def test_dependency_modules_are_part_of_the_version():
+    pipeline = FeaturePipeline()
+    modules = {module.__name__ for module in pipeline._modules()}
+
+    assert {'app.ml.feature_pipeline', 'app.ml.talib_compat', 'app.ml.indicator_engine',
+            'app.ml.indicator_kernels'} <= modules
+    assert FeaturePipeline(dependencies=()).version != pipeline.version
@@ -0,0 +1,71 @@
+"""
+Уровни поддержки/сопротивления: свинги, кластеризация и пивоты на малых рядах
+"""
+import numpy as np
+import pytest
+from app.ml.candles import empty_candles
+from app.ml.levels import LevelEngine
+
+
+def make_ohlc(high, low, close=None):
+    ohlc = empty_candles(len(high))
+    ohlc['high'], ohlc['low'] = high, low
+    ohlc['open'] = ohlc['close'] = (np.asarray(high) + np.asarray(low)) / 2 if close is None else close
+    return ohlc
+
+
+def test_swing_points():
+    high = [1, 2, 5, 2, 1, 2, 6, 2, 1]
+    low = [0, 1, 3, 1, 0, 1, 4, 1, 0.5]
+    swing_highs, swing_lows = LevelEngine(order=2).swing_points(make_ohlc(high, low))
+
+    assert list(swing_highs) == [2, 6]
+    assert list(swing_lows) == [4]
+
+
+def test_flat_top_is_one_swing():
+    high = [1, 2, 5, 5, 2, 1, 0]
+    low = [0, 0, 0, 0, 0, 0, 0]
+    swing_highs, _ = LevelEngine(order=2).swing_points(make_ohlc(high, low))
+
+    assert list(swing_highs) == [2]
+
+
+def test_cluster_levels_splits_on_gaps():
+    levels, touches = LevelEngine().cluster_levels(np.array([10.0, 10.1, 20.0, 9.95, 20.05, 30.0]), tolerance=0.2)
+
+    np.testing.assert_allclose(levels, [(9.95 + 10.0 + 10.1) / 3, 20.025, 30.0])
+    assert list(touches) == [3, 2, 1]
+
+
+def test_pivots():
+    pivots = LevelEngine.pivots(high=110.0, low=90.0, close=105.0)
+    pivot = 305.0 / 3
+
+    classic = pivots['classic']
+    assert classic['pivot'] == pytest.approx(pivot)
+    assert classic['r1'] == pytest.approx(2 * pivot - 90)
+    assert classic['s1'] == pytest.approx(2 * pivot - 110)
+    assert classic['r2'] == pytest.approx(pivot + 20)
+    assert classic['s3'] == pytest.approx(90 - 2 * (110 - pivot))
+    fibonacci = pivots['fibonacci']
+    assert fibonacci['r1'] == pytest.approx(pivot + 0.382 * 20)
+    assert fibonacci['s3'] == pytest.approx(pivot - 20)
+
+
+def test_analyze_picks_nearest_levels_around_close():
+    # Two tops near 110, two bottoms near 90, last close at 100
+    high = [100, 105, 110, 105, 100, 104, 110.1, 104, 100, 101, 100]
+    low = [95, 95, 100, 95, 90, 95, 100, 95, 90.2, 95, 96]
+    close = [98, 100, 105, 100, 92, 100, 105, 100, 92, 98, 100]
+    result = LevelEngine(order=2).analyze(make_ohlc(high, low, close))
+
+    assert result['support'] == pytest.approx(90.1)
+    assert result['resistance'] == pytest.approx(110.05)
+    assert result['levels'] == [{'price': pytest.approx(110.05), 'touches': 2},
+                                {'price': pytest.approx(90.1), 'touches': 2}]
+    assert result['pivot'] == pytest.approx((110.1 + 90 + 100) / 3)
+
+
+def test_analyze_needs_a_full_window():
+    assert LevelEngine(order=2).analyze(make_ohlc([1, 2, 3, 4], [0, 1, 2, 3])) is None
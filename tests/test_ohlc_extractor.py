@@ -0,0 +1,115 @@
+"""
+OHLC по проекциям столбцов: тени и тела синтетических свечей, касающиеся
+свечи и график с панелью объема под ценовой
+"""
+import numpy as np
+import pytest
+from app.ml.candles import COLOR_GREEN, COLOR_RED, color_names
+from app.ml.image_processor import ImageProcessor
+from app.ml.ohlc_extractor import ProjectionOHLCExtractor
+
+HEIGHT, WIDTH = 200, 240
+GREEN, RED = (0, 180, 0), (200, 0, 0)
+BODY_WIDTH = 7
+
+
+def draw_candle(image, x, high_row, body_top, body_bottom, low_row, color):
+    """Wick rows high_row..low_row in the middle column, body rows body_top..body_bottom"""
+    image[high_row:low_row + 1, x + BODY_WIDTH // 2] = color
+    image[body_top:body_bottom + 1, x:x + BODY_WIDTH] = color
+
+
+def expected_prices(high_row, body_top, body_bottom, low_row, color, height=HEIGHT):
+    top, bottom = (height - body_top) / height, (height - body_bottom - 1) / height
+    open_, close = (bottom, top) if color == GREEN else (top, bottom)
+    return open_, (height - high_row) / height, (height - low_row - 1) / height, close
+
+
+# (x, high_row, body_top, body_bottom, low_row, color)
+CANDLES = [
+    (20, 40, 60, 100, 120, GREEN),
+    (40, 70, 80, 90, 150, RED),
+    (60, 30, 50, 51, 80, GREEN),
+    (80, 90, 95, 140, 141, RED),
+]
+
+
+def make_chart(candles, height=HEIGHT):
+    image = np.full((height, WIDTH, 3), 255, dtype=np.uint8)
+    for candle in candles:
+        draw_candle(image, *candle)
+    return image
+
+
+def ohlc_rows(candles):
+    return np.stack([candles['open'], candles['high'], candles['low'], candles['close']], axis=1)
+
+
+def test_recovers_wicks_and_bodies():
+    candles = ProjectionOHLCExtractor().extract(make_chart(CANDLES))
+
+    assert list(candles['x']) == [c[0] for c in CANDLES]
+    assert list(candles['width']) == [BODY_WIDTH] * len(CANDLES)
+    assert list(candles['color']) == [COLOR_GREEN, COLOR_RED, COLOR_GREEN, COLOR_RED]
+    np.testing.assert_allclose(ohlc_rows(candles), [expected_prices(*c[1:]) for c in CANDLES])
+
+
+def test_touching_candles_of_different_colors_are_split():
+    touching = [(20 + i * BODY_WIDTH, *c[1:]) for i, c in enumerate(CANDLES)]
+    candles = ProjectionOHLCExtractor().extract(make_chart(touching))
+
+    assert list(candles['x']) == [c[0] for c in touching]
+    assert list(color_names(candles)) == ['green', 'red', 'green', 'red']
+    np.testing.assert_allclose(ohlc_rows(candles), [expected_prices(*c[1:]) for c in touching])
+
+
+def test_touching_candles_of_the_same_color_are_split():
+    # Two separate candles give the typical width, then three touching green ones
+    touching = [(20, 40, 60, 100, 120, RED), (40, 50, 70, 110, 130, GREEN)] + [
+        (100 + i * BODY_WIDTH, high, top, bottom, low, GREEN)
+        for i, (high, top, bottom, low) in enumerate([(40, 60, 100, 120), (20, 30, 70, 90), (60, 80, 140, 160)])
+    ]
+    candles = ProjectionOHLCExtractor().extract(make_chart(touching))
+
+    assert list(candles['x']) == [c[0] for c in touching]
+    assert list(candles['width']) == [BODY_WIDTH] * len(touching)
+    np.testing.assert_allclose(ohlc_rows(candles), [expected_prices(*c[1:]) for c in touching])
+
+
+def test_bottom_cuts_off_volume_pane():
+    image = make_chart(CANDLES, height=260)
+    # Volume bars right below the plot, same colors and columns as the candles
+    for x, *_, color in CANDLES:
+        image[205:260, x:x + BODY_WIDTH] = color
+
+    merged = ProjectionOHLCExtractor().extract(image)
+    assert (merged['low'] == 0).all()
+
+    candles = ProjectionOHLCExtractor().extract(image, bottom=200)
+    np.testing.assert_allclose(ohlc_rows(candles), [expected_prices(*c[1:], height=260) for c in CANDLES])
+
+
+@pytest.fixture
+def processor():
+    processor = ImageProcessor()
+    processor.roi_enabled = True
+    return processor
+
+
+def test_plot_roi_stops_above_volume_pane(processor):
+    # Price pane rows 0..199, separator line at 200, volume pane 201..259
+    image = make_chart(CANDLES, height=260)
+    image[200, :] = (120, 120, 120)
+    for x, *_, color in CANDLES:
+        image[202:260, x:x + BODY_WIDTH] = color
+
+    cropped = processor.crop_to_plot(image)
+    x0, y0, x1, y1 = processor.last_roi
+    # The ROI margin reaches into the volume pane, the plot bottom does not
+    assert 202 < y1 < 260 and processor.last_plot_bottom + y0 == 200
+
+    candles = processor.extract_ohlc_by_projection(cropped)
+    assert len(candles) == len(CANDLES)
+    # Lows stay at the candle wicks, not at the bottom of the volume bars
+    lows = y0 + cropped.shape[0] * (1 - candles['low'])
+    np.testing.assert_allclose(lows, [c[4] + 1 for c in CANDLES])
@@ -0,0 +1,96 @@
+"""
+Пакетный анализ: битое изображение не ломает остальные, результаты из кэша
+сохраняются вместе с проанализированными
+"""
+import asyncio
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database.models import Base, Prediction, User
+from app.services.analysis_executor import AnalysisExecutor
+from app.services.prediction_service import PredictionService
+
+
+def make_chart_png(seed, n_candles=40):
+    """White chart with border grid lines and wicked candles kept clear of the grid"""
+    rng = np.random.default_rng(seed)
+    image = np.full((400, 640, 3), 255, dtype=np.uint8)
+    image[[20, 380], :] = 170
+    image[:, [31 + i * 15 for i in (7, 15, 23, 31)]] = 170
+
+    price = 200
+    for i in range(n_candles):
+        x, open_ = 20 + i * 15, price
+        price = int(np.clip(price + rng.integers(-20, 21), 60, 340))
+        color = (0, 180, 0) if price < open_ else (200, 0, 0)
+        top, bottom = min(open_, price), max(open_, price) + 2
+        image[top - 10:bottom + 10, x + 3] = color
+        image[top:bottom, x:x + 7] = color
+
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(telegram_id=1)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def service(tmp_path):
+    executor = AnalysisExecutor(kind='thread', workers=2)
+    yield PredictionService(upload_dir=str(tmp_path), executor=executor)
+    executor.shutdown()
+
+
+def test_corrupt_image_fails_alone(service, db, user):
+    images = [make_chart_png(1), b'not an image', make_chart_png(2)]
+    results = asyncio.run(service.analyze_batch(images, user.id, db, {}))
+
+    assert 'error' in results[1]
+    for result in (results[0], results[2]):
+        assert 'error' not in result
+        assert result['direction'] in ('UP', 'DOWN', 'SIDEWAYS')
+    assert db.query(Prediction).count() == 2
+    assert {results[0]['prediction_id'], results[2]['prediction_id']} == {
+        p.id for p in db.query(Prediction).all()
+    }
+
+
+def test_cached_results_are_saved_with_the_batch(service, db, user):
+    settings = {}
+    service.cache.put(
+        {'direction': 'UP', 'confidence': 0.7, 'take_profit': 1.0, 'stop_loss': 0.5,
+         'support': 1.0, 'resistance': 2.0, 'pivot': 1.5},
+        service._cache_settings(settings), file_unique_id='cached-photo'
+    )
+
+    cached = service.lookup_cached(['cached-photo', 'new-photo'], settings)
+    assert cached[0]['direction'] == 'UP' and cached[1] is None
+
+    results = asyncio.run(service.analyze_batch(
+        [None, make_chart_png(3)], user.id, db, settings,
+        file_unique_ids=['cached-photo', 'new-photo'], cached=cached
+    ))
+
+    assert results[0]['direction'] == 'UP'
+    assert 'error' not in results[1]
+    rows = db.query(Prediction).order_by(Prediction.id).all()
+    assert [row.id for row in rows] == [results[0]['prediction_id'], results[1]['prediction_id']]
+    assert rows[0].image_path is None and rows[1].image_path is not None
@@ -0,0 +1,44 @@
+"""
+Потоковые индикаторы совпадают с векторным движком точно, в том числе
+после восстановления состояния из JSON посреди ряда
+"""
+import json
+import numpy as np
+import pytest
+from app.ml.indicator_engine import IndicatorEngine
+from app.ml.streaming_indicators import StreamingIndicatorSet
+from benchmarks.bench_levels import make_candles
+
+SELECTED = IndicatorEngine.SUPPORTED
+N_CANDLES = 300
+
+
+def stream_all(candles, restore_at=None):
+    stream = StreamingIndicatorSet(SELECTED)
+    streamed = {}
+    for i, candle in enumerate(candles):
+        if i == restore_at:
+            stream = StreamingIndicatorSet.from_state(json.loads(json.dumps(stream.get_state())))
+        for name, value in stream.update(candle).items():
+            streamed.setdefault(name, np.empty(len(candles)))[i] = value
+    return streamed
+
+
+@pytest.mark.parametrize('restore_at', [None, N_CANDLES // 2])
+def test_streaming_matches_batch_exactly(restore_at):
+    candles = make_candles(N_CANDLES, seed=7)
+    batch = IndicatorEngine().compute(candles, SELECTED)
+    streamed = stream_all(candles, restore_at)
+
+    assert set(streamed) == set(batch)
+    for name in batch:
+        np.testing.assert_array_equal(streamed[name], batch[name], err_msg=name)
+
+
+def test_warm_up_is_nan():
+    candles = make_candles(40, seed=3)
+    streamed = stream_all(candles)
+
+    assert np.isnan(streamed['rsi'][:14]).all() and not np.isnan(streamed['rsi'][14])
+    assert np.isnan(streamed['sma_20'][:19]).all() and not np.isnan(streamed['sma_20'][19])
+    assert np.isnan(streamed['macd'][:33]).all() and not np.isnan(streamed['macd'][33])
@@ -0,0 +1,127 @@
+"""
+talib_compat: прогрев (NaN до lookback как в TA-Lib) и значения против
+поштучных эталонных циклов на малых рядах
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.ml import talib_compat as ta
+
+N = 80
+
+
+@pytest.fixture
+def ohlc():
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 1, N))
+    wick = np.abs(rng.normal(0, 0.5, (2, N)))
+    return close + wick[0], close - wick[1], close
+
+
+def loop_ema(x, period, alpha=None):
+    alpha = 2.0 / (period + 1) if alpha is None else alpha
+    out = [np.nan] * len(x)
+    value = sum(x[:period]) / period
+    out[period - 1] = value
+    for i in range(period, len(x)):
+        value = alpha * x[i] + (1 - alpha) * value
+        out[i] = value
+    return np.array(out)
+
+
+def first_valid(values):
+    return int(np.flatnonzero(~np.isnan(values))[0])
+
+
+def test_warm_up_lengths(ohlc):
+    high, low, close = ohlc
+
+    assert first_valid(ta.SMA(close, 10)) == 9
+    assert first_valid(ta.EMA(close, 12)) == 11
+    assert first_valid(ta.RSI(close, 14)) == 14
+    assert all(first_valid(values) == 33 for values in ta.MACD(close, 12, 26, 9))
+    assert all(first_valid(values) == 19 for values in ta.BBANDS(close, 20))
+    assert all(first_valid(values) == 8 for values in ta.STOCH(high, low, close, 5, 3, 0, 3, 0))
+    assert all(first_valid(values) == 6 for values in ta.STOCHF(high, low, close, 5, 3))
+    assert first_valid(ta.ATR(high, low, close, 14)) == 14
+
+
+def test_short_input_is_all_nan(ohlc):
+    high, low, close = (values[:10] for values in ohlc)
+
+    assert np.isnan(ta.SMA(close, 20)).all()
+    assert np.isnan(ta.RSI(close, 14)).all()
+    assert np.isnan(ta.ATR(high, low, close, 14)).all()
+    assert all(np.isnan(values).all() for values in ta.MACD(close))
+
+
+def test_sma_and_ema(ohlc):
+    _, _, close = ohlc
+    expected_sma = np.array([np.nan] * 9 + [close[i - 9:i + 1].mean() for i in range(9, N)])
+
+    np.testing.assert_allclose(ta.SMA(close, 10), expected_sma, rtol=1e-12)
+    np.testing.assert_allclose(ta.EMA(close, 12), loop_ema(close, 12), rtol=1e-12)
+
+
+def test_rsi(ohlc):
+    _, _, close = ohlc
+    deltas = np.diff(close)
+    up = loop_ema(np.maximum(deltas, 0), 14, alpha=1 / 14)
+    down = loop_ema(np.maximum(-deltas, 0), 14, alpha=1 / 14)
+    expected = np.concatenate(([np.nan], 100 * up / (up + down)))
+
+    np.testing.assert_allclose(ta.RSI(close, 14), expected, rtol=1e-12)
+
+
+def test_macd(ohlc):
+    _, _, close = ohlc
+    # TA-Lib seeds the fast EMA at the slow lookback, from the 12 closes ending there
+    slow = loop_ema(close, 26)
+    fast = np.full(N, np.nan)
+    fast[25:] = loop_ema(close[14:], 12)[11:]
+    line = fast - slow
+    signal = np.full(N, np.nan)
+    signal[25:] = loop_ema(line[25:], 9)
+    line[:33] = np.nan
+
+    macd, macd_signal, hist = ta.MACD(close, 12, 26, 9)
+    np.testing.assert_allclose(macd, line, rtol=1e-12)
+    np.testing.assert_allclose(macd_signal, signal, rtol=1e-12)
+    np.testing.assert_allclose(hist, line - signal, rtol=1e-12)
+
+
+def test_bbands_and_atr(ohlc):
+    high, low, close = ohlc
+    upper, middle, lower = ta.BBANDS(close, 20, 2, 2)
+    std = np.array([np.nan] * 19 + [close[i - 19:i + 1].std() for i in range(19, N)])
+    np.testing.assert_allclose(upper - middle, 2 * std, rtol=1e-9)
+    np.testing.assert_allclose(middle - lower, 2 * std, rtol=1e-9)
+
+    true_range = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+    expected = np.concatenate(([np.nan], loop_ema(true_range, 14, alpha=1 / 14)))
+    np.testing.assert_allclose(ta.ATR(high, low, close, 14), expected, rtol=1e-12)
+
+
+def test_stochastic(ohlc):
+    high, low, close = ohlc
+    fast_k = np.full(N, np.nan)
+    for i in range(4, N):
+        lowest, highest = low[i - 4:i + 1].min(), high[i - 4:i + 1].max()
+        fast_k[i] = (close[i] - lowest) / (highest - lowest) * 100
+    slow_k = pd.Series(fast_k).rolling(3).mean().to_numpy().copy()
+    slow_d = pd.Series(slow_k).rolling(3).mean().to_numpy()
+    slow_k[:8] = np.nan
+
+    stoch_k, stoch_d = ta.STOCH(high, low, close, 5, 3, 0, 3, 0)
+    np.testing.assert_allclose(stoch_k, slow_k, rtol=1e-9)
+    np.testing.assert_allclose(stoch_d, slow_d, rtol=1e-9)
+
+
+def test_series_in_series_out(ohlc):
+    _, _, close = ohlc
+    index = pd.date_range('2024-01-01', periods=N, freq='1h')
+    result = ta.RSI(pd.Series(close, index=index), 14)
+
+    assert isinstance(result, pd.Series)
+    assert result.index.equals(index)
+    np.testing.assert_array_equal(result.to_numpy(), ta.RSI(close, 14))